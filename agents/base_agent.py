@@ -1,6 +1,21 @@
+from enum import Enum
+
+
+class ExecutionClass(str, Enum):
+    """How the orchestrator should run an agent without blocking the event loop."""
+    IO = "io"          # blocking I/O in process(): shared thread pool
+    CPU = "cpu"        # CPU-heavy process(): process pool (or thread pool, see core.executors)
+    ASYNC = "async"    # native coroutine aprocess(): awaited directly on the loop
+
+
 class BaseAgent:
+    execution: ExecutionClass = ExecutionClass.IO
+
     def __init__(self, name):
         self.name = name
 
     def process(self, query: str) -> str:
         raise NotImplementedError("Each agent must implement process()")
+
+    async def aprocess(self, query: str) -> str:
+        raise NotImplementedError("Agents declaring ExecutionClass.ASYNC must implement aprocess()")
@@ -1,35 +1,85 @@
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, ExecutionClass
 import chromadb
-from sentence_transformers import SentenceTransformer
+from core.bm25 import BM25Index, reciprocal_rank_fusion
+from core.embeddings import get_embedder
+from utils.logger import logger
 import os
 
+VECTORSTORE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../knowledge_base/knowledge_base/vectorstore"))
+BM25_PATH = os.path.join(VECTORSTORE_PATH, "bm25_index.npz")
+TOP_K = int(os.getenv("STATIC_TOP_K", "3"))
+
+
 class StaticAgent(BaseAgent):
+    # query embedding is micro-batched on the shared embedder; the Chroma query runs in the I/O pool
+    execution = ExecutionClass.ASYNC
+
     def __init__(self):
         super().__init__("Static Agent")
         self.client = chromadb.Client()
         # Load persistent DB (this is the fix!)
-        self.client = chromadb.PersistentClient(
-            path=os.path.abspath(os.path.join(os.path.dirname(__file__), "../knowledge_base/knowledge_base/vectorstore"))
-        )
+        self.client = chromadb.PersistentClient(path=VECTORSTORE_PATH)
         self.collection = self.client.get_or_create_collection(name="aws_static_docs")
 
         print("count: ",self.collection.count())
-        # Load embeddings
-        from sentence_transformers import SentenceTransformer
-        self.embed_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+        # Shared MiniLM embedder (also used by the local router and routing cache)
+        self.embedder = get_embedder()
+        # BM25 index written by knowledge_base.ingest over the same passages
+        self.keywords = None
+        if os.path.exists(BM25_PATH):
+            try:
+                self.keywords = BM25Index.load(BM25_PATH)
+            except Exception as e:
+                logger.warning(f"StaticAgent: BM25 index unreadable, vector search only: {e}")
+        else:
+            logger.warning("StaticAgent: no BM25 index, run `python -m knowledge_base.ingest`")
+        self.lexical_hits = 0
+        self.hybrid_hits = 0
 
     def embed(self, text):
-        return self.embed_model.encode(text).tolist()
+        return self.embedder.embed(text)
 
-    def process(self, query):
-        query_embed = self.embed(query)
+    def _lexical(self, query):
+        """⚡ Exact-term queries (CLI commands, API operations, IAM actions): no embedding at all."""
+        if self.keywords is None:
+            return None
+        hits = self.keywords.exact_match(query, top_k=TOP_K)
+        if not hits:
+            return None
+        self.lexical_hits += 1
+        return self.keywords.text(hits[0][0])
 
+    def _search(self, query, query_embed):
         results = self.collection.query(
             query_embeddings=[query_embed],
-            n_results=3
+            n_results=TOP_K
         )
+        vector_ids = results["ids"][0] if results["ids"] else []
+        documents = dict(zip(vector_ids, results["documents"][0])) if results["documents"] else {}
 
-        if results["documents"]:
-            return results["documents"][0][0]
+        # Hybrid: reciprocal-rank fusion of the dense and BM25 rankings
+        if self.keywords is not None:
+            keyword_ids = [doc_id for doc_id, _ in self.keywords.search(query, top_k=TOP_K)]
+            if keyword_ids:
+                self.hybrid_hits += 1
+                best, _ = reciprocal_rank_fusion([vector_ids, keyword_ids])[0]
+                return documents.get(best) or self.keywords.text(best)
+
+        if vector_ids:
+            return documents[vector_ids[0]]
 
         return "No relevant AWS information found."
+
+    def process(self, query):
+        lexical = self._lexical(query)
+        if lexical is not None:
+            return lexical
+        return self._search(query, self.embed(query))
+
+    async def aprocess(self, query):
+        from core.executors import get_agent_executor
+        lexical = self._lexical(query)
+        if lexical is not None:
+            return lexical
+        query_embed = await self.embedder.aembed(query)
+        return await get_agent_executor().run_io(self._search, query, query_embed)
@@ -1,57 +1,81 @@
 # agents/summary_agent.py
-from .base_agent import BaseAgent
-import os
+from .base_agent import BaseAgent, ExecutionClass
 import json
 import re
+import threading
+import weakref
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Tuple, Optional
 from dotenv import load_dotenv
+from core.monitor_store import get_monitor_store
+from utils.timestamps import parse_user_datetime, to_datetime
+from utils.window_memo import BucketMemo
 
-# date parsing: prefer dateparser for robust natural language parsing; fallback to dateutil
+# Shared LLM client (pooled, concurrency-limited). Tolerate a missing SDK/key.
 try:
-    import dateparser
-    DATEPARSER_AVAILABLE = True
+    from llm.client import get_llm_client
+    LLM_CLIENT_AVAILABLE = True
 except Exception:
-    from dateutil import parser as dateutil_parser  # type: ignore
-    DATEPARSER_AVAILABLE = False
-
-# Gemini client (genai). Use tolerant import & client creation to handle SDK differences.
-try:
-    import genai  # type: ignore
-    GENAI_AVAILABLE = True
-except Exception:
-    genai = None
-    GENAI_AVAILABLE = False
+    get_llm_client = None
+    LLM_CLIENT_AVAILABLE = False
 
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+STATUS_RE = re.compile(r"\b(2\d{2}|3\d{2}|4\d{2}|5\d{2})\b")
+SUCCESS_RE = re.compile(r"\b(success|ok|completed)\b", flags=re.I)
+
+SUMMARY_BUCKET_SECONDS = 3600.0
+# the prompt shows at most 5 log lines and 10 metric samples
+PROMPT_EXAMPLES = 10
+
+# summary key -> metric column
+METRIC_KEYS = {
+    "cpu": "CPU_Usage",
+    "memory": "Memory_Usage",
+    "db_connections": "DB_Connections",
+    "request_rate": "Request_Rate",
+}
+
+# one log memo per store, shared by every SummaryAgent built on it, with a single ingest listener
+_log_memos: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_log_memos_lock = threading.Lock()
+
+
+def _log_memo_for(store) -> BucketMemo:
+    with _log_memos_lock:
+        memo = _log_memos.get(store)
+        if memo is None:
+            memo = BucketMemo(lambda lo, hi: SummaryAgent._log_partial(store.logs.range(lo, hi)),
+                              SummaryAgent._merge_log_partials, bucket_seconds=SUMMARY_BUCKET_SECONDS)
+
+            def on_ingest(source: str, oldest: float):
+                if source == "logs":
+                    memo.invalidate_from(oldest)
+
+            store.on_ingest(on_ingest)
+            _log_memos[store] = memo
+    return memo
 
 
 class SummaryAgent(BaseAgent):
+    # file reads/parsing go to the I/O pool, the LLM call is awaited natively
+    execution = ExecutionClass.ASYNC
+
     def __init__(self, name: str = "Summary Agent"):
         super().__init__(name)
 
-        # File locations (as you provided)
-        self.monitor_log_path = "logs/monitor_logs.log"
-        self.metrics_history_path = "metrics/metrics_history.log"
-        self.log_alerts_path = "storage/log_alerts.json"
-        self.metric_alerts_path = "storage/metric_alerts.json"
+        # Logs, metrics and alert files, tailed into time-sorted indexes (core.monitor_store)
+        self.store = get_monitor_store()
+
+        # per-hour log partials; only the hour new lines land in is recomputed
+        self._log_memo = _log_memo_for(self.store)
 
         # LLM client initialization (tolerant)
         self.llm_client = None
         self.llm_model = "gemini-2.5-flash-lite"
-        if GENAI_AVAILABLE and GEMINI_API_KEY:
+        if LLM_CLIENT_AVAILABLE:
             try:
-                # Preferred modern client
-                try:
-                    self.llm_client = genai.Client(api_key=GEMINI_API_KEY)
-                except Exception:
-                    # Older SDK shape
-                    try:
-                        genai.configure(api_key=GEMINI_API_KEY)  # some installs support this
-                        self.llm_client = genai
-                    except Exception:
-                        self.llm_client = None
+                self.llm_client = get_llm_client()
             except Exception:
                 self.llm_client = None
 
@@ -59,25 +83,8 @@ class SummaryAgent(BaseAgent):
     # Date/time parsing helpers
     # -------------------------
     def _safe_parse_datetime(self, text: str) -> Optional[datetime]:
-        if not text:
-            return None
-        text = str(text).strip()
-        if DATEPARSER_AVAILABLE:
-            try:
-                dt = dateparser.parse(text, settings={"RETURN_AS_TIMEZONE_AWARE": True, "TO_TIMEZONE": "UTC"})
-                return dt
-            except Exception:
-                return None
-        else:
-            try:
-                dt = dateutil_parser.parse(text, fuzzy=True)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                else:
-                    dt = dt.astimezone(timezone.utc)
-                return dt
-            except Exception:
-                return None
+        # user-typed phrases only: strict ISO fast path, dateparser for everything else
+        return parse_user_datetime(text)
 
     def parse_time_range(self, query: str) -> Tuple[datetime, datetime]:
         now = datetime.now(timezone.utc)
@@ -153,146 +160,18 @@ class SummaryAgent(BaseAgent):
         # 4) default: last 24 hours
         return (now - timedelta(days=1)), now
 
-    # -------------------------
-    # File loaders & normalizers
-    # -------------------------
-    def _read_lines_file(self, path: str) -> List[str]:
-        if not os.path.exists(path):
-            return []
-        out = []
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                ln = line.strip()
-                if ln:
-                    out.append(ln)
-        return out
-
-    def _read_json_lines(self, path: str) -> List[Dict]:
-        if not os.path.exists(path):
-            return []
-        rows = []
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    obj = json.loads(line)
-                    if isinstance(obj, dict):
-                        rows.append(obj)
-                    elif isinstance(obj, list):
-                        # if line itself is a list, extend
-                        for el in obj:
-                            if isinstance(el, dict):
-                                rows.append(el)
-                except Exception:
-                    # If file is full JSON array rather than ndjson
-                    try:
-                        f.seek(0)
-                        data = json.load(f)
-                        if isinstance(data, dict):
-                            rows.append(data)
-                        elif isinstance(data, list):
-                            for el in data:
-                                if isinstance(el, dict):
-                                    rows.append(el)
-                        break
-                    except Exception:
-                        # give up on this line
-                        continue
-        return rows
-
-    def _read_alert_file(self, path: str) -> List[Dict]:
-        if not os.path.exists(path):
-            return []
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                data = json.load(f)
-            flat = []
-            if isinstance(data, dict):
-                flat.append(data)
-            elif isinstance(data, list):
-                # flatten nested lists/dicts
-                for item in data:
-                    if isinstance(item, dict):
-                        flat.append(item)
-                    elif isinstance(item, list):
-                        for sub in item:
-                            if isinstance(sub, dict):
-                                flat.append(sub)
-            return flat
-        except Exception:
-            # fallback to line-by-line parse
-            return self._read_json_lines(path)
-
-    # -------------------------
-    # Time-based filters
-    # -------------------------
-    def _filter_logs_by_time(self, lines: List[str], start: datetime, end: datetime) -> List[str]:
-        out = []
-        for ln in lines:
-            # logs begin with a timestamp token — try first token, fallback to ISO regex
-            parts = ln.split()
-            if not parts:
-                continue
-            ts_token = parts[0]
-            ts = self._safe_parse_datetime(ts_token)
-            if ts is None:
-                # attempt to find an ISO-like timestamp in entire line
-                m = re.search(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|\+\d{2}:\d{2})?", ln)
-                if m:
-                    ts = self._safe_parse_datetime(m.group(0))
-            if ts is None:
-                continue
-            if start <= ts <= end:
-                out.append(ln)
-        return out
-
-    def _filter_metrics_by_time(self, rows: List[Dict], start: datetime, end: datetime) -> List[Dict]:
-        out = []
-        for r in rows:
-            ts_str = r.get("timestamp") or r.get("time") or r.get("ts")
-            ts = self._safe_parse_datetime(ts_str) if ts_str else None
-            if ts is None:
-                continue
-            if start <= ts <= end:
-                out.append(r)
-        return out
-
-    def _filter_alerts_by_time(self, alerts: List[Dict], start: datetime, end: datetime) -> List[Dict]:
-        # alerts may already be normalized; ensure it's a flat list of dicts
-        flat = []
-        for a in alerts:
-            if isinstance(a, dict):
-                flat.append(a)
-            elif isinstance(a, list):
-                for sub in a:
-                    if isinstance(sub, dict):
-                        flat.append(sub)
-        out = []
-        for a in flat:
-            ts_str = a.get("timestamp")
-            if not ts_str:
-                continue
-            ts = self._safe_parse_datetime(ts_str)
-            if ts is None:
-                continue
-            if start <= ts <= end:
-                out.append(a)
-        return out
-
     # -------------------------
     # Analysis helpers
     # -------------------------
-    def _analyze_logs(self, logs: List[str]) -> Dict:
-        total = len(logs)
+    @staticmethod
+    def _log_partial(logs: List[str]) -> Dict:
+        # raw counts only, so partials of adjacent time buckets can be merged
         error_count = 0
         warn_count = 0
         status_counts: Dict[str, int] = {}
         examples: List[str] = []
         success_count = 0
 
-        status_re = re.compile(r"\b(2\d{2}|3\d{2}|4\d{2}|5\d{2})\b")
         for ln in logs:
             low = ln.lower()
             if any(k in low for k in ("error", "exception", "traceback", "fatal")):
@@ -301,89 +180,75 @@ class SummaryAgent(BaseAgent):
                     examples.append(ln)
             if "warn" in low or "warning" in low:
                 warn_count += 1
-            m = status_re.search(ln)
+            m = STATUS_RE.search(ln)
             if m:
                 code = m.group(1)
                 status_counts[code] = status_counts.get(code, 0) + 1
                 if code.startswith("2") or code.startswith("3"):
                     success_count += 1
             else:
-                if re.search(r"\b(success|ok|completed)\b", ln, flags=re.I):
+                if SUCCESS_RE.search(ln):
                     success_count += 1
 
+        return {"total": len(logs), "errors": error_count, "warns": warn_count, "successes": success_count,
+                "status_counts": status_counts, "examples": examples}
+
+    @staticmethod
+    def _merge_log_partials(a: Dict, b: Dict) -> Dict:
+        status_counts = dict(a["status_counts"])
+        for code, n in b["status_counts"].items():
+            status_counts[code] = status_counts.get(code, 0) + n
+        return {"total": a["total"] + b["total"], "errors": a["errors"] + b["errors"],
+                "warns": a["warns"] + b["warns"], "successes": a["successes"] + b["successes"],
+                "status_counts": status_counts, "examples": (a["examples"] + b["examples"])[:3]}
+
+    @staticmethod
+    def _log_stats(partial: Dict) -> Dict:
         estimated_success_rate = None
-        denom = success_count + error_count
+        denom = partial["successes"] + partial["errors"]
         if denom > 0:
-            estimated_success_rate = (success_count / denom) * 100.0
+            estimated_success_rate = (partial["successes"] / denom) * 100.0
 
         return {
-            "total_lines": total,
-            "error_count": error_count,
-            "warn_count": warn_count,
-            "status_counts": status_counts,
-            "examples": examples,
+            "total_lines": partial["total"],
+            "error_count": partial["errors"],
+            "warn_count": partial["warns"],
+            "status_counts": partial["status_counts"],
+            "examples": partial["examples"],
             "estimated_success_rate_percent": estimated_success_rate,
         }
 
-    def _analyze_metrics(self, metrics: List[Dict]) -> Dict:
-        import math, statistics
-
-        def numeric_list(key):
-            vals = []
-            for m in metrics:
-                v = m.get(key)
-                if v is None:
-                    continue
-                try:
-                    vals.append(float(v))
-                except Exception:
-                    continue
-            return vals
-
-        cpu = numeric_list("CPU_Usage")
-        memory = numeric_list("Memory_Usage")
-        db_conn = numeric_list("DB_Connections")
-        req_rate = numeric_list("Request_Rate")
-
-        def summarise(vals):
-            if not vals:
-                return None
-            try:
-                return {
-                    "count": len(vals),
-                    "avg": statistics.mean(vals),
-                    "min": min(vals),
-                    "max": max(vals),
-                    "median": statistics.median(vals),
-                }
-            except Exception:
-                return None
-
-        cpu_summary = summarise(cpu)
-        mem_summary = summarise(memory)
-        db_summary = summarise(db_conn)
-        req_summary = summarise(req_rate)
-
-        # simple spike detection using z-score threshold 2.5
-        spikes = []
-        if cpu and len(cpu) >= 3:
-            mean = statistics.mean(cpu)
-            stdev = statistics.pstdev(cpu)
-            if stdev > 0:
-                for i, v in enumerate(cpu):
-                    z = (v - mean) / stdev
-                    if abs(z) >= 2.5:
-                        spikes.append({"index": i, "value": v, "z": z})
-
+    def _analyze_metrics(self, start: datetime, end: datetime) -> Dict:
+        # window stats and z-score spikes straight from the columnar rollups (core.metrics_store)
+        columns = self.store.metric_columns
+        lo, hi = start.timestamp(), end.timestamp()
+
+        summaries = {key: columns.summary(metric, lo, hi) for key, metric in METRIC_KEYS.items()}
+        spikes: Dict[str, Dict] = {}
+        for metric in columns.metrics:
+            found = columns.spikes(metric, lo, hi)
+            if found["count"]:
+                for ex in found["examples"]:
+                    ex["bucket"] = to_datetime(ex["bucket"]).isoformat()
+                spikes[metric] = found
+
+        cpu_spikes = spikes.get("CPU_Usage", {"count": 0, "examples": []})
         return {
-            "cpu": cpu_summary,
-            "memory": mem_summary,
-            "db_connections": db_summary,
-            "request_rate": req_summary,
-            "cpu_spikes_count": len(spikes),
-            "cpu_spike_examples": spikes[:3],
+            **summaries,
+            "spikes": spikes,
+            "cpu_spikes_count": cpu_spikes["count"],
+            "cpu_spike_examples": cpu_spikes["examples"],
         }
 
+    def _window_stats(self, start: datetime, end: datetime) -> Tuple[Dict, Dict]:
+        """
+        (log_stats, metric_stats) for the window. Log stats are composed from per-hour
+        partials (closed hours are computed once; new log lines only invalidate the
+        hour they land in); metric stats come from the store's rollups.
+        """
+        lo, hi = start.timestamp(), end.timestamp()
+        return self._log_stats(self._log_memo.get(lo, hi)), self._analyze_metrics(start, end)
+
     # -------------------------
     # LLM prompt and call
     # -------------------------
@@ -418,30 +283,15 @@ class SummaryAgent(BaseAgent):
         if not self.llm_client:
             return None
         try:
-            # Try common modern interface
-            try:
-                resp = self.llm_client.models.generate_content(model=self.llm_model, contents=prompt)
-                # extract text safely
-                if hasattr(resp, "text"):
-                    return resp.text
-                # try dict-style
-                if isinstance(resp, dict):
-                    cand = resp.get("candidates") or resp.get("outputs")
-                    if cand and isinstance(cand, list) and len(cand) > 0:
-                        first = cand[0]
-                        if isinstance(first, dict):
-                            return first.get("content") or first.get("text") or str(first)
-                        return str(first)
-                    return str(resp)
-            except Exception:
-                # try alternative older interface
-                try:
-                    resp2 = self.llm_client.generate_text(model=self.llm_model, prompt=prompt)
-                    if hasattr(resp2, "text"):
-                        return resp2.text
-                    return str(resp2)
-                except Exception:
-                    return None
+            return self.llm_client.generate_sync(prompt, model=self.llm_model)
+        except Exception:
+            return None
+
+    async def _acall_llm(self, prompt: str) -> Optional[str]:
+        if not self.llm_client:
+            return None
+        try:
+            return await self.llm_client.generate(prompt, model=self.llm_model)
         except Exception:
             return None
 
@@ -449,11 +299,8 @@ class SummaryAgent(BaseAgent):
     # Local deterministic one-paragraph summary fallback
     # -------------------------
     def _local_summary(self, query: str, start: datetime, end: datetime,
-                       logs: List[str], metrics: List[Dict],
+                       log_stats: Dict, metric_stats: Dict,
                        log_alerts: List[Dict], metric_alerts: List[Dict]) -> str:
-        log_stats = self._analyze_logs(logs)
-        metric_stats = self._analyze_metrics(metrics)
-
         parts = [f"Between {start.isoformat()} and {end.isoformat()}"]
 
         if log_stats["total_lines"] == 0:
@@ -475,6 +322,9 @@ class SummaryAgent(BaseAgent):
 
         if metric_stats["cpu_spikes_count"] > 0:
             parts.append(f"{metric_stats['cpu_spikes_count']} CPU spike(s) detected")
+        other = {m: s["count"] for m, s in metric_stats["spikes"].items() if m != "CPU_Usage"}
+        if other:
+            parts.append("other spikes: " + ", ".join(f"{m} x{n}" for m, n in other.items()))
 
         if log_alerts:
             parts.append(f"{len(log_alerts)} log anomaly(ies) forwarded to remediation")
@@ -492,32 +342,32 @@ class SummaryAgent(BaseAgent):
         return paragraph
 
     # -------------------------
-    # Public process() method
+    # Public process() / aprocess() methods
     # -------------------------
-    def process(self, query: str) -> str:
+    def _prepare(self, query: str) -> Dict:
         start, end = self.parse_time_range(query)
 
-        # load raw data
-        raw_logs = self._read_lines_file(self.monitor_log_path)
-        raw_metrics = self._read_json_lines(self.metrics_history_path)
-        raw_log_alerts = self._read_alert_file(self.log_alerts_path)
-        raw_metric_alerts = self._read_alert_file(self.metric_alerts_path)
-
-        # filter by time
-        logs = self._filter_logs_by_time(raw_logs, start, end)
-        metrics = self._filter_metrics_by_time(raw_metrics, start, end)
-        log_alerts = self._filter_alerts_by_time(raw_log_alerts, start, end)
-        metric_alerts = self._filter_alerts_by_time(raw_metric_alerts, start, end)
+        # pick up anything written since the last background tick, then slice the window
+        self.store.poll()
+        window = self.store.window(start, end, limit=PROMPT_EXAMPLES)
+        logs, metrics = window["logs"], window["metrics"]
+        log_alerts, metric_alerts = window["log_alerts"], window["metric_alerts"]
 
-        # compute brief stats for prompt
-        log_stats = self._analyze_logs(logs)
-        metric_stats = self._analyze_metrics(metrics)
+        # compute brief stats for prompt (memoized per window bucket)
+        log_stats, metric_stats = self._window_stats(start, end)
 
         # build LLM prompt
         prompt = self._build_prompt(query, start, end, logs, metrics, log_alerts, metric_alerts, log_stats, metric_stats)
 
-        # call LLM
-        llm_out = self._call_llm(prompt)
+        return {
+            "query": query, "start": start, "end": end,
+            "logs": logs, "metrics": metrics,
+            "log_alerts": log_alerts, "metric_alerts": metric_alerts,
+            "log_stats": log_stats, "metric_stats": metric_stats,
+            "prompt": prompt,
+        }
+
+    def _finalize(self, ctx: Dict, llm_out: Optional[str]) -> str:
         if llm_out:
             # convert multi-line to single paragraph
             lines = [ln.strip() for ln in llm_out.strip().splitlines() if ln.strip()]
@@ -528,4 +378,14 @@ class SummaryAgent(BaseAgent):
             return one_par
 
         # fallback deterministic summary
-        return self._local_summary(query, start, end, logs, metrics, log_alerts, metric_alerts)
+        return self._local_summary(ctx["query"], ctx["start"], ctx["end"], ctx["log_stats"], ctx["metric_stats"],
+                                   ctx["log_alerts"], ctx["metric_alerts"])
+
+    def process(self, query: str) -> str:
+        ctx = self._prepare(query)
+        return self._finalize(ctx, self._call_llm(ctx["prompt"]))
+
+    async def aprocess(self, query: str) -> str:
+        from core.executors import get_agent_executor
+        ctx = await get_agent_executor().run_io(self._prepare, query)
+        return self._finalize(ctx, await self._acall_llm(ctx["prompt"]))
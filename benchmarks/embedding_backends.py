@@ -0,0 +1,108 @@
+"""
+Benchmark the embedding backends: load time, resident memory, throughput, parity.
+
+    python -m benchmarks.embedding_backends [--backends torch onnx-fp32 onnx] [--queries 200]
+
+Each backend runs in a fresh spawned process so memory figures aren't polluted
+by the other backends. Reported per backend:
+    load_s        time to load the model (ONNX exports first if needed)
+    rss_mb        resident memory after loading and warming up
+    qps_single    one query per encode() call, i.e. the per-request cost
+    qps_batch64   texts/sec when encoding batches of 64 (ingestion)
+    min_cos       worst cosine against the torch vectors (parity)
+"""
+import argparse
+import multiprocessing
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from core.onnx_embeddings import PARITY_SENTENCES
+
+QUERIES = [
+    "how do I list s3 buckets", "aws ec2 describe-instances", "iam policy for s3:GetObject",
+    "rotate access keys", "enable cloudtrail in all regions", "lambda timeout configuration",
+    "rds snapshot retention", "vpc flow logs to cloudwatch", "cpu usage last week",
+    "database connections yesterday", "what is a security group", "cloudformation drift detection",
+]
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        import resource  # peak rather than current RSS, close enough after load
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_backend(backend: str, queries: int) -> Dict:
+    from core.embeddings import Embedder
+
+    start = time.perf_counter()
+    model = Embedder(backend=backend).model
+    load_s = time.perf_counter() - start
+    model.encode(QUERIES[:4], normalize_embeddings=True)  # warm-up (allocations, graph init)
+
+    texts = [f"{QUERIES[i % len(QUERIES)]} #{i}" for i in range(queries)]
+    start = time.perf_counter()
+    for text in texts:
+        model.encode([text], normalize_embeddings=True)
+    qps_single = queries / (time.perf_counter() - start)
+
+    batch = (texts * (1 + 512 // len(texts)))[:512]
+    start = time.perf_counter()
+    model.encode(batch, batch_size=64, normalize_embeddings=True)
+    qps_batch = len(batch) / (time.perf_counter() - start)
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "qps_single": round(qps_single, 1),
+        "qps_batch64": round(qps_batch, 1),
+        "vectors": np.asarray(model.encode(PARITY_SENTENCES, normalize_embeddings=True), dtype=np.float32),
+    }
+
+
+def run(backends: List[str], queries: int) -> List[Dict]:
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in backends:
+        with ctx.Pool(1) as pool:
+            try:
+                results.append(pool.apply(_run_backend, (backend, queries)))
+            except Exception as e:
+                print(f"✘ {backend}: {e}")
+
+    reference = next((r["vectors"] for r in results if r["backend"] == "torch"), None)
+    for r in results:
+        vectors = r.pop("vectors")
+        r["min_cos"] = round(float((vectors * reference).sum(axis=1).min()), 4) if reference is not None else None
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx-fp32", "onnx"])
+    parser.add_argument("--queries", type=int, default=200, help="single-query encodes per backend")
+    args = parser.parse_args(argv)
+
+    results = run(args.backends, args.queries)
+    if not results:
+        return
+    cols = ["backend", "load_s", "rss_mb", "qps_single", "qps_batch64", "min_cos"]
+    print(" | ".join(f"{c:>11}" for c in cols))
+    for r in results:
+        print(" | ".join(f"{str(r[c]):>11}" for c in cols))
+    base = next((r for r in results if r["backend"] == "torch"), None)
+    if base:
+        for r in results:
+            if r is not base:
+                print(f"{r['backend']}: {r['qps_single'] / base['qps_single']:.1f}x single-query throughput, "
+                      f"{r['rss_mb'] - base['rss_mb']:+.0f} MB vs torch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the S3 log sync against a local S3 stand-in (LocalStack by default).
+
+    CLOUD_LOGS_ENDPOINT=http://localhost:4566 python -m benchmarks.s3_log_sync [--seed 2500] [--add 100]
+
+--seed uploads that many synthetic log objects under the prefix first (into a
+bucket created if missing). Then it times:
+
+    serial       the previous code path: one list call + get_object per key in turn
+    cold         S3LogSync with an empty cache (paginated listing, concurrent downloads)
+    warm         the same sync again: listing only, nothing downloaded
+    incremental  after uploading --add new objects: only those are downloaded
+
+and checks that every path saw the same records (serial caps at 1000 keys).
+"""
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from orchestrator.cloud_analyzer import BUCKET_NAME, ENDPOINT, PREFIX, S3LogSync
+from utils.aws import get_client
+
+s3 = get_client("s3", endpoint_url=ENDPOINT)
+
+SERVICES = ["auth", "payments", "orders", "search", "gateway"]
+LEVELS = ["INFO"] * 8 + ["WARNING", "ERROR", "CRITICAL"]
+
+
+def seed(n: int, start: int = 0) -> None:
+    try:
+        s3.create_bucket(Bucket=BUCKET_NAME)
+    except Exception:
+        pass  # already exists
+    base = datetime(2025, 12, 1, tzinfo=timezone.utc)
+
+    def put(i: int):
+        record = {
+            "timestamp": (base + timedelta(seconds=30 * i)).isoformat(),
+            "service": random.choice(SERVICES),
+            "log_level": random.choice(LEVELS),
+            "cpu_usage": round(random.uniform(5, 99), 2),
+            "message": f"synthetic event {i}",
+        }
+        s3.put_object(Bucket=BUCKET_NAME, Key=f"{PREFIX}{i:08d}.json", Body=json.dumps(record).encode("utf-8"))
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(put, range(start, start + n)))
+
+
+def serial() -> list:
+    response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=PREFIX)
+    return [json.loads(s3.get_object(Bucket=BUCKET_NAME, Key=obj["Key"])["Body"].read())
+            for obj in response.get("Contents", [])]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(seed_n: int, add: int) -> None:
+    if seed_n:
+        seed(seed_n)
+        print(f"🌱 Seeded {seed_n} objects into s3://{BUCKET_NAME}/{PREFIX}")
+
+    logs, t = _timed(serial)
+    print(f"  serial       {t:8.2f}s  {len(logs)} records (single list call)")
+
+    sync = S3LogSync(cache_path=None, max_age=0)
+    result, t = _timed(sync.sync)
+    print(f"  cold         {t:8.2f}s  {result}")
+    cold_records = len(sync.logs())
+    result, t = _timed(sync.sync)
+    print(f"  warm         {t:8.2f}s  {result}")
+
+    if add:
+        seed(add, start=result["listed"])
+        result, t = _timed(sync.sync)
+        print(f"  incremental  {t:8.2f}s  {result}")
+    # one record per object; the serial path only ever sees the first 1000 keys
+    ok = len(sync.logs()) == result["listed"] and len(logs) == min(cold_records, 1000)
+    print(f"  records: {len(sync.logs())}  {'✔ consistent' if ok else '✘ mismatch'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the S3 log sync against LocalStack.")
+    parser.add_argument("--seed", type=int, default=0, help="objects to upload first")
+    parser.add_argument("--add", type=int, default=100, help="objects to upload before the incremental sync")
+    args = parser.parse_args(argv)
+    run(args.seed, args.add)
+
+
+if __name__ == "__main__":
+    main()
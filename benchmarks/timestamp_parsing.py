@@ -0,0 +1,114 @@
+"""
+Benchmark timestamp parsing on the real monitoring files.
+
+    python -m benchmarks.timestamp_parsing [--repeat 20000]
+
+Samples are the timestamps SummaryAgent's ingester actually parses: the leading
+token of every line in logs/monitor_logs.log, the ``timestamp`` field of
+metrics/metrics_history.log and of both alert files. Each parser is run over
+the same samples (cycled up to --repeat values; dateparser gets fewer because
+it is orders of magnitude slower) and checked against the fast parser's result.
+Cycling repeats values, which flatters the cached variant: in the store only the
+alert stores use it (duplicate alerts repeat timestamps); tailed lines are parsed once.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from itertools import cycle, islice
+from typing import Callable, Dict, List, Optional
+
+from core.alert_store import LOG_ALERTS_PATH, METRIC_ALERTS_PATH, read_legacy
+from core.monitor_store import LOG_PATH, METRICS_PATH
+from utils.timestamps import TimestampParser
+
+
+def load_samples() -> Dict[str, List[str]]:
+    samples: Dict[str, List[str]] = {"logs": [], "metrics": [], "alerts": []}
+    try:
+        with open(LOG_PATH, "r", encoding="utf-8", errors="ignore") as f:
+            samples["logs"] = [ln.split(" ", 1)[0] for ln in f if ln.strip()]
+    except FileNotFoundError:
+        pass
+    try:
+        with open(METRICS_PATH, "r", encoding="utf-8", errors="ignore") as f:
+            samples["metrics"] = [json.loads(ln).get("timestamp") for ln in f if ln.strip()]
+    except FileNotFoundError:
+        pass
+    for path in (LOG_ALERTS_PATH, METRIC_ALERTS_PATH):
+        samples["alerts"] += [a["timestamp"] for a in read_legacy(path) if a.get("timestamp")]
+    return {k: [v for v in vals if v] for k, vals in samples.items() if vals}
+
+
+def _fromisoformat(value: str) -> Optional[float]:
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def _dateparser() -> Optional[Callable]:
+    try:
+        import dateparser
+    except ImportError:
+        return None
+    settings = {"RETURN_AS_TIMEZONE_AWARE": True, "TO_TIMEZONE": "UTC"}
+    return lambda value: dateparser.parse(value, settings=settings).timestamp()
+
+
+def _dateutil() -> Optional[Callable]:
+    try:
+        from dateutil import parser as dateutil_parser
+    except ImportError:
+        return None
+    return lambda value: dateutil_parser.parse(value).timestamp()
+
+
+def _time(fn: Callable, values: List[str]) -> Dict:
+    start = time.perf_counter()
+    out = [fn(v) for v in values]
+    elapsed = time.perf_counter() - start
+    return {"per_sec": len(values) / elapsed, "us": elapsed / len(values) * 1e6, "results": out}
+
+
+def run(repeat: int) -> None:
+    samples = load_samples()
+    if not samples:
+        print("No monitoring files found (run from the repository root).")
+        return
+
+    for source, values in samples.items():
+        fast = TimestampParser(source)
+        reference = [fast.parse(v) for v in values]  # format detected on the first value
+        print(f"\n{source}: {len(values)} lines, format={fast.format}, e.g. {values[0]!r}")
+
+        parsers = [("TimestampParser", TimestampParser(source).parse, repeat),
+                   ("TimestampParser+cache", TimestampParser(source, cache_size=4096).parse, repeat),
+                   ("datetime.fromisoformat", _fromisoformat, repeat)]
+        if _dateutil():
+            parsers.append(("dateutil.parse", _dateutil(), repeat // 10))
+        if _dateparser():
+            parsers.append(("dateparser.parse", _dateparser(), max(len(values), repeat // 100)))
+
+        rows = []
+        for name, fn, n in parsers:
+            result = _time(fn, list(islice(cycle(values), n)))
+            expected = list(islice(cycle(reference), n))
+            agree = all(r is not None and abs(r - e) < 1e-6 for r, e in zip(result["results"], expected))
+            rows.append((name, n, result, agree))
+
+        # speedup relative to the slowest parser measured (dateparser, the previous code path)
+        baseline = min(r["per_sec"] for _, _, r, _ in rows)
+        print(f"  {'parser':<24}{'values':>8}{'parses/s':>14}{'us/parse':>11}{'speedup':>10}  agree")
+        for name, n, result, agree in rows:
+            print(f"  {name:<24}{n:>8}{result['per_sec']:>14,.0f}{result['us']:>11.2f}"
+                  f"{result['per_sec'] / baseline:>9,.0f}x  {'yes' if agree else 'NO'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark timestamp parsers on the monitoring files.")
+    parser.add_argument("--repeat", type=int, default=20000, help="values parsed per fast parser")
+    args = parser.parse_args(argv)
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# core/alert_store.py
+"""
+Append-only, deduplicating alert store.
+
+    storage/log_alerts.jsonl       one alert per line
+    storage/metric_alerts.jsonl
+
+    python -m core.alert_store     # import the legacy JSON array files
+
+Every alert is fingerprinted on (type, metric, timestamp, message), with the
+timestamp normalised to epoch seconds so "...Z" and "...+00:00" spellings of the
+same instant match. An alert whose fingerprint is already stored is dropped
+before it reaches the file. The file is also tailed, so lines appended by other
+processes show up on the next refresh() (and are deduplicated in memory if they
+raced a write from here). Records are kept in a TimeIndex, so a window query is
+O(log n + k).
+"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from utils.tail import FileTailer, TimeIndex
+from utils.timestamps import TimestampParser
+
+LOG_ALERTS_PATH = "storage/log_alerts.jsonl"
+METRIC_ALERTS_PATH = "storage/metric_alerts.jsonl"
+LEGACY_PATHS = {LOG_ALERTS_PATH: "storage/log_alerts.json", METRIC_ALERTS_PATH: "storage/metric_alerts.json"}
+
+Fingerprint = Tuple[str, str, float, str]
+
+
+class AlertStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.index = TimeIndex()
+        self.duplicates = 0
+        self._seen: Set[Fingerprint] = set()
+        self._parser = TimestampParser(os.path.basename(path), cache_size=4096)
+        self._tail = FileTailer(path)
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def fingerprint(self, alert: Dict) -> Optional[Fingerprint]:
+        ts = self._parser.parse(alert.get("timestamp"))
+        if ts is None:
+            return None
+        return (str(alert.get("type", "")), str(alert.get("metric", "")), ts, str(alert.get("message", "")))
+
+    def _ingest(self, alert: Dict) -> bool:
+        fp = self.fingerprint(alert)
+        if fp is None:
+            return False
+        if fp in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(fp)
+        self.index.add(fp[2], alert)
+        return True
+
+    def refresh(self) -> int:
+        """Pick up lines appended to the file since the last refresh."""
+        added = 0
+        with self._lock:
+            for line in self._tail.read_new():
+                try:
+                    alert = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(alert, dict) and self._ingest(alert):
+                    added += 1
+        return added
+
+    def add(self, alerts: Iterable[Dict]) -> int:
+        """Append the alerts not stored yet; returns how many were new."""
+        self.refresh()
+        fresh: List[Dict] = []
+        with self._lock:
+            batch: Set[Fingerprint] = set()
+            for alert in alerts:
+                fp = self.fingerprint(alert)
+                if fp is None:
+                    continue
+                if fp in self._seen or fp in batch:
+                    self.duplicates += 1
+                    continue
+                batch.add(fp)
+                fresh.append(alert)
+            if fresh:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(a, default=str) + "\n" for a in fresh))
+        self.refresh()
+        return len(fresh)
+
+    def range(self, start: float, end: float) -> List[Dict]:
+        return self.index.range(start, end)
+
+    def stats(self) -> Dict:
+        return {"alerts": len(self.index), "duplicates_dropped": self.duplicates}
+
+
+def read_legacy(path: str) -> List[Dict]:
+    """Flat list of alert dicts from a legacy JSON array (nested lists flattened) or JSONL file."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return []
+    try:
+        docs = [json.loads(text)]
+    except ValueError:
+        docs = []
+        for line in text.splitlines():
+            try:
+                docs.append(json.loads(line))
+            except ValueError:
+                continue
+    flat: List[Dict] = []
+    stack = list(reversed(docs))
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            flat.append(item)
+        elif isinstance(item, list):
+            stack.extend(reversed(item))
+    return flat
+
+
+def main():
+    for path, legacy in LEGACY_PATHS.items():
+        alerts = read_legacy(legacy)
+        store = AlertStore(path)
+        added = store.add(alerts)
+        print(f"✔ {legacy}: {len(alerts)} alerts -> {added} new in {path} ({len(store)} stored)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# core/anomaly.py
+"""
+Online anomaly detection for every metric, run as samples are ingested.
+
+Each metric keeps O(1) running state and every new sample is scored against the
+state *before* it is folded in:
+
+    welford   running mean / variance over all history (exact, stable)
+    ewma      exponentially weighted mean / variance (alpha), adapts to drift
+
+A sample whose |z| reaches the metric's threshold becomes an alert shaped like
+the ones the metric alert store already holds:
+
+    {"type": "metric_anomaly", "metric": ..., "value": ..., "zscore": ..., "timestamp": ..., "detector": ...}
+
+Configuration (env):
+    ANOMALY_METHOD       welford | ewma              (default ewma)
+    ANOMALY_Z            default |z| threshold       (default 3.0)
+    ANOMALY_THRESHOLDS   per-metric overrides, "CPU_Usage=2.5,Request_Rate=4"
+    ANOMALY_WARMUP       samples before a metric is scored (default 10)
+    ANOMALY_ALPHA        EWMA smoothing factor       (default 0.1)
+"""
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from utils.timestamps import to_datetime
+
+TIMESTAMP_FIELDS = ("timestamp", "time", "ts")
+
+
+class _Welford:
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+    def update(self, x: float):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def warm(self, values: np.ndarray):
+        """Fold a block of history in at once (Chan et al. parallel combination)."""
+        if not len(values):
+            return
+        n, mean, m2 = len(values), float(values.mean()), float(((values - values.mean()) ** 2).sum())
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+
+class _Ewma:
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.n, self.mean, self.var = 0, 0.0, 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def update(self, x: float):
+        self.n += 1
+        if self.n == 1:
+            self.mean = x
+            return
+        diff = x - self.mean
+        incr = self.alpha * diff
+        self.mean += incr
+        self.var = (1 - self.alpha) * (self.var + diff * incr)
+
+    def warm(self, values: np.ndarray):
+        # older samples carry weight (1 - alpha)^k: replaying the tail that still matters is exact enough
+        keep = int(math.ceil(20 / self.alpha))
+        for x in values[-keep:]:
+            self.update(float(x))
+        self.n += max(len(values) - keep, 0)
+
+
+class AnomalyDetector:
+    def __init__(self, method: str = "ewma", z: float = 3.0, warmup: int = 10, alpha: float = 0.1,
+                 thresholds: Optional[Dict[str, float]] = None):
+        if method not in ("welford", "ewma"):
+            raise ValueError(f"Unknown anomaly method: {method}")
+        self.method = method
+        self.z = z
+        self.warmup = warmup
+        self.alpha = alpha
+        self.thresholds = dict(thresholds or {})
+        self.state: Dict[str, object] = {}
+        self.observed = 0
+        self.flagged = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "AnomalyDetector":
+        thresholds = {}
+        for item in os.getenv("ANOMALY_THRESHOLDS", "").split(","):
+            name, sep, value = item.partition("=")
+            if sep:
+                thresholds[name.strip()] = float(value)
+        return cls(method=os.getenv("ANOMALY_METHOD", "ewma").lower(),
+                   z=float(os.getenv("ANOMALY_Z", "3.0")),
+                   warmup=int(os.getenv("ANOMALY_WARMUP", "10")),
+                   alpha=float(os.getenv("ANOMALY_ALPHA", "0.1")),
+                   thresholds=thresholds)
+
+    def _state(self, metric: str):
+        if metric not in self.state:
+            self.state[metric] = _Welford() if self.method == "welford" else _Ewma(self.alpha)
+        return self.state[metric]
+
+    def threshold(self, metric: str) -> float:
+        return self.thresholds.get(metric, self.z)
+
+    def warm(self, values: Dict[str, np.ndarray]):
+        """Seed the running state from history (e.g. binary segments) without scoring it."""
+        with self._lock:
+            for metric, col in values.items():
+                col = np.asarray(col, dtype=np.float64)
+                self._state(metric).warm(col[~np.isnan(col)])
+
+    def observe(self, points: Iterable[Tuple[float, Dict]], score: bool = True) -> List[Dict]:
+        """
+        Score then fold in time-ordered (epoch seconds, sample dict) points; returns alerts.
+        With ``score=False`` the points only seed the running state (history, not news).
+        """
+        alerts = []
+        with self._lock:
+            for ts, row in points:
+                for metric, value in row.items():
+                    if metric in TIMESTAMP_FIELDS or isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    x = float(value)
+                    st = self._state(metric)
+                    std = st.std
+                    if score and st.n >= self.warmup and std > 0:
+                        z = (x - st.mean) / std
+                        if abs(z) >= self.threshold(metric):
+                            alerts.append({
+                                "type": "metric_anomaly", "metric": metric, "value": x, "zscore": z,
+                                "timestamp": to_datetime(ts).isoformat(), "detector": self.method,
+                            })
+                    st.update(x)
+                    self.observed += 1
+            self.flagged += len(alerts)
+        return alerts
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "method": self.method, "observed": self.observed, "flagged": self.flagged,
+                "metrics": {m: {"n": s.n, "mean": s.mean, "std": s.std, "threshold": self.threshold(m)}
+                            for m, s in self.state.items()},
+            }
@@ -0,0 +1,290 @@
+# core/bm25.py
+"""
+In-process BM25 keyword index over the static knowledge base.
+
+Built by ``knowledge_base.ingest`` over the same passages it embeds into Chroma
+and saved next to the vector store as a single ``.npz`` file: the postings are
+stored in CSR form (``offsets`` into ``post_docs``/``post_tfs``) and the passage
+texts as one UTF-8 blob, so loading is a handful of array reads and lookups need
+neither Chroma nor the embedding model.
+
+The tokenizer keeps AWS identifiers intact: ``describe-instances``,
+``DescribeInstances`` and ``s3:GetObject`` each index under a joined form
+(``describeinstances``, ``s3getobject``) as well as their parts, so a CLI
+command, an API operation name and an IAM action all meet on the same term.
+"""
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from utils.logger import logger
+
+K1 = 1.2
+B = 0.75
+RRF_K = 60
+# BM25F-style title weighting: a passage's opening tokens (record titles,
+# "operation DescribeInstances.", section headings) count LEAD_WEIGHT times
+LEAD_TOKENS = 12
+LEAD_WEIGHT = 3
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:[-_:./][A-Za-z0-9*]+)*")
+_CAMEL_RE = re.compile(r"[A-Z]+[0-9]*(?![a-z])|[A-Z]?[a-z]+[0-9]*|[0-9]+")
+_SPLIT_RE = re.compile(r"[-_:./*]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or show "
+    "tell that the this to use what when where which who why with you".split()
+)
+
+
+def _is_identifier(raw: str) -> bool:
+    """describe-instances, s3:GetObject, DescribeInstances, ec2.describe_instances ..."""
+    if _SPLIT_RE.search(raw):
+        return True
+    return any(c.isupper() for c in raw[1:]) and any(c.islower() for c in raw)
+
+
+def _camel_parts(raw: str) -> List[str]:
+    """CamelCase segments of a compound identifier: GetObject in s3:GetObject."""
+    parts = [p for p in _SPLIT_RE.split(raw) if p]
+    if len(parts) < 2:
+        return []
+    return [p.lower() for p in parts if len(_CAMEL_RE.findall(p)) > 1]
+
+
+def _expand(raw: str) -> List[str]:
+    lower = raw.lower()
+    if not _is_identifier(raw):
+        return [lower]
+    terms = [_SPLIT_RE.sub("", lower)] + _camel_parts(raw)
+    for part in _SPLIT_RE.split(raw):
+        terms.extend(p.lower() for p in _CAMEL_RE.findall(part))
+    return terms
+
+
+def tokenize(text: str) -> List[str]:
+    terms: List[str] = []
+    for raw in _TOKEN_RE.findall(text):
+        terms.extend(t for t in _expand(raw) if t not in _STOPWORDS)
+    return terms
+
+
+# Leading words of CLI commands, API operations and SDK methods: DescribeInstances and
+# describe-instances are operations, DynamoDB, CloudWatch and well-architected are not
+_OPERATION_VERBS = frozenset(
+    "accept add allocate assign associate assume attach authorize batch cancel copy create "
+    "delete deregister describe detach disable disassociate download enable execute export "
+    "get import invoke list modify pass publish put reboot receive register reject release "
+    "remove request reset restore revoke run scan search send set start stop subscribe tag "
+    "terminate test unsubscribe untag update upload validate".split()
+)
+_IAM_ACTION_RE = re.compile(r"[a-z0-9-]+:[A-Z][A-Za-z0-9]*\*?")
+_CLI_COMMAND_RE = re.compile(r"[a-z]+(?:-[a-z0-9]+)+")
+_SDK_METHOD_RE = re.compile(r"(?:[a-z0-9-]+\.)?([a-z]+(?:_[a-z0-9]+)+)")
+_API_OPERATION_RE = re.compile(r"[A-Z][a-z]+(?:[A-Z0-9][a-z0-9]*)+")
+
+
+def _operation(raw: str) -> Optional[List[str]]:
+    """Exact-term candidates if ``raw`` is shaped like an operation, else None."""
+    if _IAM_ACTION_RE.fullmatch(raw):
+        return [_SPLIT_RE.sub("", raw.lower())] + _camel_parts(raw)
+    if _CLI_COMMAND_RE.fullmatch(raw):
+        words = raw.split("-")
+    elif _SDK_METHOD_RE.fullmatch(raw):
+        words = _SDK_METHOD_RE.fullmatch(raw).group(1).split("_")
+        if "." in raw and words[0] in _OPERATION_VERBS:
+            # ec2.describe_instances: the service-qualified form, then the bare operation
+            return [_SPLIT_RE.sub("", raw.lower()), "".join(words)]
+    elif _API_OPERATION_RE.fullmatch(raw):
+        words = [w.lower() for w in _CAMEL_RE.findall(raw)]
+    else:
+        return None
+    if words[0] not in _OPERATION_VERBS:
+        return None
+    return ["".join(words)]
+
+
+def identifiers(text: str) -> List[List[str]]:
+    """
+    Exact-term candidates for each operation-shaped token in a query, most specific
+    first: s3:GetObject -> ["s3getobject", "getobject"], describe-instances ->
+    ["describeinstances"]. Product names (DynamoDB, CloudWatch) are not operations.
+    """
+    found = (_operation(raw) for raw in _TOKEN_RE.findall(text))
+    return [candidates for candidates in found if candidates]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(d) = sum over lists of 1 / (k + rank(d))."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: -kv[1])
+
+
+class BM25Index:
+    """
+    Two lifecycles share this class:
+    - ingestion: ``load()`` the previous index, ``replace_source()`` for each
+      re-chunked source, ``save()`` rebuilds the postings for the whole corpus;
+    - query time: ``load()`` once, then ``search()`` / ``exact_match()``.
+    """
+
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.sources: List[str] = []
+        self.texts: List[str] = []
+        self.vocab: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._post_docs = np.zeros(0, dtype=np.int32)
+        self._post_tfs = np.zeros(0, dtype=np.float32)
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._norm = np.zeros(0, dtype=np.float32)
+        self._idf = np.zeros(0, dtype=np.float32)
+        self._by_id: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # -------------------------
+    # Ingestion side
+    # -------------------------
+    def has_source(self, source: str) -> bool:
+        return source in self.sources
+
+    def replace_source(self, source: str, passages: Iterable[Tuple[str, str]]):
+        """Swap every passage of ``source`` for ``(id, text)`` pairs. Postings are rebuilt on save()."""
+        keep = [i for i, s in enumerate(self.sources) if s != source]
+        self.ids = [self.ids[i] for i in keep]
+        self.texts = [self.texts[i] for i in keep]
+        self.sources = [self.sources[i] for i in keep]
+        for doc_id, text in passages:
+            self.ids.append(doc_id)
+            self.texts.append(text)
+            self.sources.append(source)
+
+    def build(self):
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for doc, text in enumerate(self.texts):
+            tokens = tokenize(text)
+            counts = Counter(tokens)
+            for term in tokens[:LEAD_TOKENS]:
+                counts[term] += LEAD_WEIGHT - 1
+            lengths[doc] = len(tokens)
+            for term, tf in counts.items():
+                postings[term].append((doc, tf))
+
+        terms = sorted(postings)
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        sizes = np.fromiter((len(postings[t]) for t in terms), dtype=np.int64, count=len(terms))
+        self._offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        flat = [p for t in terms for p in postings[t]]
+        self._post_docs = np.fromiter((d for d, _ in flat), dtype=np.int32, count=len(flat))
+        self._post_tfs = np.fromiter((tf for _, tf in flat), dtype=np.float32, count=len(flat))
+        self._finalize(lengths)
+
+    def save(self, path: Path):
+        self.build()
+        blob = "".join(self.texts).encode("utf-8")
+        text_offsets = np.zeros(len(self.texts) + 1, dtype=np.int64)
+        text_offsets[1:] = np.cumsum([len(t.encode("utf-8")) for t in self.texts])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(self.ids, dtype=str),
+                sources=np.array(self.sources, dtype=str),
+                vocab=np.array(list(self.vocab), dtype=str),
+                offsets=self._offsets,
+                post_docs=self._post_docs,
+                post_tfs=self._post_tfs,
+                lengths=self._lengths,
+                text_blob=np.frombuffer(blob, dtype=np.uint8),
+                text_offsets=text_offsets,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    # -------------------------
+    # Query side
+    # -------------------------
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            index.ids = data["ids"].tolist()
+            index.sources = data["sources"].tolist()
+            index.vocab = {t: i for i, t in enumerate(data["vocab"].tolist())}
+            index._offsets = data["offsets"]
+            index._post_docs = data["post_docs"]
+            index._post_tfs = data["post_tfs"]
+            blob = data["text_blob"].tobytes()
+            bounds = data["text_offsets"]
+            index.texts = [blob[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(index.ids))]
+            index._finalize(data["lengths"])
+        logger.info(f"BM25 index loaded: {len(index.ids)} passages, {len(index.vocab)} terms")
+        return index
+
+    def _finalize(self, lengths: np.ndarray):
+        n = len(lengths)
+        self._lengths = lengths.astype(np.float32)
+        avgdl = float(lengths.mean()) if n else 0.0
+        # per-document length normalisation, precomputed once
+        self._norm = (self.k1 * (1 - self.b + self.b * lengths / avgdl)).astype(np.float32) if n else self._lengths
+        df = np.diff(self._offsets).astype(np.float32)
+        self._idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self._by_id = {doc_id: i for i, doc_id in enumerate(self.ids)}
+
+    def _postings(self, term_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo, hi = self._offsets[term_idx], self._offsets[term_idx + 1]
+        return self._post_docs[lo:hi], self._post_tfs[lo:hi]
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        terms = [self.vocab[t] for t in dict.fromkeys(tokenize(query)) if t in self.vocab]
+        if not terms or not self.ids:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for t in terms:
+            docs, tfs = self._postings(t)
+            scores[docs] += self._idf[t] * tfs * (self.k1 + 1) / (tfs + self._norm[docs])
+        k = min(top_k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+    def exact_match(self, query: str, top_k: int = 5) -> Optional[List[Tuple[str, float]]]:
+        """
+        BM25 hits when the query names an operation present in the corpus (CLI
+        command, API operation, IAM action); None for anything else, including
+        questions that merely name a service.
+        Only hits containing every such identifier are returned.
+        """
+        required = []
+        for candidates in identifiers(query):
+            known = [self.vocab[t] for t in candidates if t in self.vocab]
+            if known:
+                required.append(known[0])
+        if not required:
+            return None
+        hits = self.search(query, top_k=top_k * 4)
+        if not hits:
+            return None
+        docs = np.fromiter((self._by_id[doc_id] for doc_id, _ in hits), dtype=np.int32, count=len(hits))
+        mask = np.ones(len(hits), dtype=bool)
+        for t in required:
+            mask &= np.isin(docs, self._postings(t)[0])
+        exact = [hit for hit, ok in zip(hits, mask) if ok]
+        return exact[:top_k] or None
+
+    def text(self, doc_id: str) -> Optional[str]:
+        i = self._by_id.get(doc_id)
+        return self.texts[i] if i is not None else None
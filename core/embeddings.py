@@ -0,0 +1,199 @@
+# core/embeddings.py
+"""
+Process-wide sentence embedding model.
+
+StaticAgent, the routing cache and the local router all embed short texts with
+the same MiniLM model; loading it once here avoids a second copy in memory.
+
+Query embeddings go through two layers before reaching the model:
+- an LRU cache of recent texts (EMBED_CACHE_SIZE), so the router, the routing
+  cache and StaticAgent embedding the same message cost one forward pass;
+- a micro-batcher (``aembed``) that coalesces concurrent requests arriving within
+  EMBED_BATCH_WINDOW_MS into a single ``encode`` call of up to EMBED_MAX_BATCH texts.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import numpy as np
+from utils.cache import TTLCache
+from utils.logger import logger
+
+MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# torch: SentenceTransformer in fp32; onnx: int8-quantized ONNX Runtime (core.onnx_embeddings);
+# onnx-fp32: the same export without quantization
+BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+
+class MicroBatcher:
+    """
+    Async front for Embedder.encode: requests are queued and a single worker task
+    drains the queue every ``window`` seconds (or as soon as ``max_batch`` texts are
+    waiting), encoding the whole batch in one call on a dedicated thread.
+    """
+
+    def __init__(self, embedder: "Embedder", window_ms: float = None, max_batch: int = None):
+        self.embedder = embedder
+        self.window = (window_ms if window_ms is not None else float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))) / 1000.0
+        self.max_batch = max_batch or int(os.getenv("EMBED_MAX_BATCH", "64"))
+        # one thread: batches run back to back while the next batch accumulates
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-batch")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+        self.batches = 0
+        self.batched_texts = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        self._ensure_worker()
+        fut = self._loop.create_future()
+        self._queue.put_nowait((text, fut))
+        return await fut
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            pending = [(t, f) for t, f in batch if not f.done()]
+            if not pending:
+                continue
+            texts = list(dict.fromkeys(t for t, _ in pending))
+            try:
+                vectors = await self._loop.run_in_executor(self._pool, self.embedder.encode_cached, texts)
+            except Exception as e:
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_texts += len(texts)
+            by_text = dict(zip(texts, vectors))
+            for text, fut in pending:
+                if not fut.done():
+                    fut.set_result(by_text[text])
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.batched_texts,
+            "avg_batch": (self.batched_texts / self.batches) if self.batches else None,
+        }
+
+
+class Embedder:
+    """Lazily loads the embedding model (PyTorch or ONNX backend) and returns L2-normalised vectors."""
+
+    def __init__(self, model_name: str = MODEL_NAME, cache_size: int = None, backend: str = None):
+        self.model_name = model_name
+        self.backend = (backend or BACKEND).lower()
+        self._model = None
+        self._lock = threading.Lock()
+        # never the model lock: the event loop takes this one, and must not wait out a model load
+        self._batcher_lock = threading.Lock()
+        self.cache = TTLCache(max_entries=cache_size or int(os.getenv("EMBED_CACHE_SIZE", "4096")))
+        self._batcher: Optional[MicroBatcher] = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        if self.backend in ("onnx", "onnx-fp32"):
+            from core import onnx_embeddings
+            return onnx_embeddings.load(self.model_name, quantized=self.backend == "onnx")
+        from sentence_transformers import SentenceTransformer
+        logger.info(f"Loading embedding model {self.model_name}")
+        return SentenceTransformer(self.model_name)
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def batcher(self) -> MicroBatcher:
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(self)
+        return self._batcher
+
+    def encode(self, texts: List[str], batch_size: int = 32):
+        """Encode a batch of texts into a (n, dim) numpy array of unit vectors (uncached)."""
+        return self.model.encode(texts, batch_size=batch_size,
+                                 normalize_embeddings=True, show_progress_bar=False)
+
+    def encode_cached(self, texts: List[str]) -> List[np.ndarray]:
+        """Like encode(), but serves repeated texts from the LRU and only encodes the misses."""
+        out: List[Optional[np.ndarray]] = [self.cache.get(t) for t in texts]
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            vectors = self.encode([texts[i] for i in missing], batch_size=max(32, len(missing)))
+            for i, vec in zip(missing, vectors):
+                vec.setflags(write=False)  # shared between callers via the cache
+                self.cache.set(texts[i], vec)
+                out[i] = vec
+        return out
+
+    def embed_vector(self, text: str) -> np.ndarray:
+        return self.encode_cached([text])[0]
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_vector(text).tolist()
+
+    async def aembed_vector(self, text: str) -> np.ndarray:
+        """Non-blocking, micro-batched embedding for use on the event loop."""
+        cached = self.cache.get(text)
+        if cached is not None:
+            return cached
+        return await self.batcher.embed(text)
+
+    async def aembed(self, text: str) -> List[float]:
+        return (await self.aembed_vector(text)).tolist()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "loaded": self.loaded,
+            "cache": self.cache.stats(),
+            "batcher": self._batcher.stats() if self._batcher else None,
+        }
+
+
+_embedder: Optional[Embedder] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = Embedder()
+    return _embedder
@@ -0,0 +1,121 @@
+# core/executors.py
+"""
+Dispatches agent calls according to their declared ExecutionClass:
+
+    ASYNC -> awaited on the event loop (agent.aprocess)
+    IO    -> shared thread pool          (AGENT_IO_WORKERS, default 16)
+    CPU   -> process pool                (AGENT_CPU_WORKERS, default half the cores)
+             or a dedicated thread pool with AGENT_CPU_POOL=thread, useful when the
+             heavy work releases the GIL (torch, numpy) or memory is tight
+
+Process-pool workers build their own agent instance from (module, class_name)
+on first use and keep it for the life of the worker; the parent only imports
+the class to read its ExecutionClass and never builds a copy of such agents.
+"""
+import asyncio
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional
+from agents.base_agent import ExecutionClass
+from models.schemas import AgentMetadata
+from utils.logger import logger
+
+# -------------------------
+# Process-pool worker side
+# -------------------------
+_WORKER_AGENTS: Dict[str, object] = {}
+
+
+def _run_in_worker(module: str, class_name: str, query: str):
+    key = f"{module}.{class_name}"
+    agent = _WORKER_AGENTS.get(key)
+    if agent is None:
+        agent = getattr(importlib.import_module(module), class_name)()
+        _WORKER_AGENTS[key] = agent
+    return agent.process(query)
+
+
+# -------------------------
+# Event-loop side
+# -------------------------
+class AgentExecutor:
+    def __init__(self, io_workers: Optional[int] = None, cpu_workers: Optional[int] = None,
+                 cpu_pool: Optional[str] = None):
+        self.io_workers = io_workers or int(os.getenv("AGENT_IO_WORKERS", "16"))
+        self.cpu_workers = cpu_workers or int(os.getenv("AGENT_CPU_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+        self.cpu_pool_kind = (cpu_pool or os.getenv("AGENT_CPU_POOL", "process")).lower()
+        self._io_pool: Optional[Executor] = None
+        self._cpu_pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def io_pool(self) -> Executor:
+        if self._io_pool is None:
+            with self._lock:
+                if self._io_pool is None:
+                    self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="agent-io")
+        return self._io_pool
+
+    @property
+    def cpu_pool(self) -> Executor:
+        # created on first CPU-bound dispatch so servers without such agents never spawn workers
+        if self._cpu_pool is None:
+            with self._lock:
+                if self._cpu_pool is None:
+                    if self.cpu_pool_kind == "thread":
+                        self._cpu_pool = ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="agent-cpu")
+                    else:
+                        # spawn: forking a parent that already holds torch/grpc threads is unsafe
+                        self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers,
+                                                             mp_context=multiprocessing.get_context("spawn"))
+                    logger.info(f"Started {self.cpu_pool_kind} pool for CPU-bound agents ({self.cpu_workers} workers)")
+        return self._cpu_pool
+
+    async def run_io(self, fn, *args):
+        """Run a blocking callable in the shared I/O thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_pool, partial(fn, *args))
+
+    def in_worker(self, agent_cls) -> bool:
+        """True when agents of this class are built and run inside process-pool workers only."""
+        return (getattr(agent_cls, "execution", ExecutionClass.IO) == ExecutionClass.CPU
+                and self.cpu_pool_kind != "thread")
+
+    async def run_in_worker(self, meta: AgentMetadata, query: str):
+        """Dispatch on metadata alone: the worker builds (once) and runs its own instance."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.cpu_pool, _run_in_worker, meta.module, meta.class_name, query)
+
+    async def run(self, agent, meta: AgentMetadata, query: str):
+        if self.in_worker(type(agent)):
+            return await self.run_in_worker(meta, query)
+        execution = getattr(agent, "execution", ExecutionClass.IO)
+        if execution == ExecutionClass.ASYNC:
+            return await agent.aprocess(query)
+        loop = asyncio.get_running_loop()
+        if execution == ExecutionClass.CPU:
+            return await loop.run_in_executor(self.cpu_pool, agent.process, query)
+        return await loop.run_in_executor(self.io_pool, agent.process, query)
+
+    def shutdown(self):
+        for pool in (self._io_pool, self._cpu_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool = self._cpu_pool = None
+
+
+_executor: Optional[AgentExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_agent_executor() -> AgentExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = AgentExecutor()
+    return _executor
@@ -1,19 +1,11 @@
-from typing import List, Dict
-import google.generativeai as genai
-from dotenv import load_dotenv
+import hashlib
+import json
 import os
-
-# --- Initialization ---
-# Load environment variables from a .env file
-load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-
-# It's good practice to ensure the key was actually loaded
-# if not GOOGLE_API_KEY:
-#     raise ValueError("GOOGLE_API_KEY not found. Please set it in your .env file.")
-
-# Configure the library with your API key
-genai.configure(api_key=GOOGLE_API_KEY)
+from functools import cached_property
+from typing import AsyncIterator, List, Dict, Optional
+from llm.client import get_llm_client
+from utils.cache import TTLCache
+from utils.logger import logger
 
 
 class Fuser:
@@ -21,22 +13,86 @@ class Fuser:
     A class to fuse multiple agent text responses into a single,
     coherent summary using a generative model.
     """
-    def __init__(self):
-        """Initializes the Fuser with a Gemini model instance."""
-        self.model = genai.GenerativeModel("gemini-2.5-flash-lite")
+    def __init__(self, model: str = "gemini-2.5-flash-lite", client=None,
+                 cache: Optional[TTLCache] = None, single_agent_fast_path: Optional[bool] = None):
+        """Initializes the Fuser on top of the shared async LLM client."""
+        self.model = model
+        if client is not None:
+            self.client = client
+        # Fused answers keyed by hash(message + agent outputs)
+        self.cache = cache if cache is not None else TTLCache(
+            max_entries=int(os.getenv("FUSION_CACHE_SIZE", "512")),
+            ttl=float(os.getenv("FUSION_CACHE_TTL", "600")),
+        )
+        if single_agent_fast_path is None:
+            single_agent_fast_path = os.getenv("FUSER_SINGLE_AGENT_FAST_PATH", "1") == "1"
+        self.single_agent_fast_path = single_agent_fast_path
+        self.fast_path_hits = 0
+        self.llm_calls = 0
 
-    async def fuse(self, user_message: str, agent_responses: List[Dict]) -> str:
-        """
-        Combines multiple agent responses into one coherent answer using Gemini.
+    @cached_property
+    def client(self):
+        # Resolved on the first LLM fusion: fast-path answers need no API key
+        return get_llm_client()
 
-        Args:
-            user_message: The original message/query from the user.
-            agent_responses: A list of dictionaries, where each dict represents
-                             an agent's response.
+    # -------------------------
+    # Cache key & local fast paths
+    # -------------------------
+    @staticmethod
+    def _cache_key(user_message: str, agent_responses: List[Dict]) -> str:
+        outputs = [(r.get('agent'), r.get('ok', True), r.get('data')) for r in agent_responses]
+        payload = json.dumps([user_message.strip().lower(), outputs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-        Returns:
-            A single, synthesized string response.
-        """
+    @staticmethod
+    def _payload(r: Dict):
+        agent_data = r.get('data', {})
+        if isinstance(agent_data, dict):
+            return agent_data.get('message', agent_data)
+        return agent_data
+
+    @staticmethod
+    def _render_structured(value, indent: str = "") -> str:
+        if isinstance(value, dict):
+            lines = []
+            for k, v in value.items():
+                if isinstance(v, (dict, list)):
+                    lines.append(f"{indent}- {k}:")
+                    lines.append(Fuser._render_structured(v, indent + "  "))
+                else:
+                    lines.append(f"{indent}- {k}: {v}")
+            return "\n".join(lines)
+        if isinstance(value, list):
+            return "\n".join(
+                Fuser._render_structured(v, indent + "  ") if isinstance(v, (dict, list)) else f"{indent}- {v}"
+                for v in value
+            )
+        return f"{indent}{value}"
+
+    def _fast_path(self, agent_responses: List[Dict]) -> Optional[str]:
+        """Render the answer locally when an LLM synthesis would add nothing."""
+        answered = [r for r in agent_responses if r.get('ok', True)]
+        if not answered:
+            return None
+        missing = [r.get('agent', 'Unnamed Agent') for r in agent_responses if not r.get('ok', True)]
+        payloads = [self._payload(r) for r in answered]
+
+        if all(isinstance(p, (dict, list)) for p in payloads):
+            if len(answered) == 1:
+                body = self._render_structured(payloads[0])
+            else:
+                body = "\n\n".join(f"{r.get('agent', 'Unnamed Agent')}:\n{self._render_structured(p)}"
+                                    for r, p in zip(answered, payloads))
+        elif len(answered) == 1 and self.single_agent_fast_path:
+            body = str(payloads[0]).strip()
+        else:
+            return None
+
+        if missing:
+            body += f"\n\n(No response from: {', '.join(missing)}.)"
+        return body
+
+    def _build_prompt(self, user_message: str, agent_responses: List[Dict]) -> str:
         # Construct a detailed prompt for the model
         prompt_parts = [
             "You are a helpful assistant. Your job is to synthesize information from different expert agents into a single, unified, and natural-sounding response.",
@@ -45,10 +101,15 @@ class Fuser:
             "---",
             "INFORMATION FROM AGENTS:",
         ]
-        print("agent response: ", agent_responses)
+        logger.debug(f"Fusing agent responses: {agent_responses}")
         # Append each agent's data to the prompt context
         for r in agent_responses:
             agent_name = r.get('agent', 'Unnamed Agent')
+            if not r.get('ok', True):
+                # Explicit marker so the model doesn't invent an answer for a missing agent
+                reason = (r.get('data') or {}).get('error', 'no response')
+                prompt_parts.append(f"\n[{agent_name}]: (no answer: {reason})")
+                continue
             # Handle both dictionary and simple string data
             agent_data = r.get('data', {})
             if isinstance(agent_data, dict):
@@ -58,9 +119,60 @@ class Fuser:
             
             prompt_parts.append(f"\n[{agent_name}]: {data_content}")
         
-        final_prompt = "\n".join(prompt_parts)
+        return "\n".join(prompt_parts)
 
-        # Asynchronously generate the content
-        response = await self.model.generate_content_async(final_prompt)
-        
-        return response.text
\ No newline at end of file
+    async def fuse(self, user_message: str, agent_responses: List[Dict]) -> str:
+        """
+        Combines multiple agent responses into one coherent answer using Gemini.
+
+        Args:
+            user_message: The original message/query from the user.
+            agent_responses: A list of dictionaries, where each dict represents
+                             an agent's response.
+
+        Returns:
+            A single, synthesized string response.
+        """
+        key = self._cache_key(user_message, agent_responses)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        fused = self._fast_path(agent_responses)
+        if fused is not None:
+            self.fast_path_hits += 1
+        else:
+            final_prompt = self._build_prompt(user_message, agent_responses)
+            # Asynchronously generate the content
+            self.llm_calls += 1
+            fused = await self.client.generate(final_prompt, model=self.model)
+
+        self.cache.set(key, fused)
+        return fused
+
+    async def fuse_stream(self, user_message: str, agent_responses: List[Dict]) -> AsyncIterator[str]:
+        """
+        Same as fuse(), but yields the answer in chunks as Gemini generates it.
+        """
+        key = self._cache_key(user_message, agent_responses)
+        fused = self.cache.get(key)
+        if fused is None:
+            fused = self._fast_path(agent_responses)
+            if fused is not None:
+                self.fast_path_hits += 1
+                self.cache.set(key, fused)
+        if fused is not None:
+            yield fused
+            return
+
+        final_prompt = self._build_prompt(user_message, agent_responses)
+        self.llm_calls += 1
+        chunks = []
+        async for chunk in self.client.stream(final_prompt, model=self.model):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.set(key, "".join(chunks))
+
+    def stats(self) -> Dict:
+        return {"fast_path_hits": self.fast_path_hits, "llm_calls": self.llm_calls,
+                "cache": self.cache.stats()}
\ No newline at end of file
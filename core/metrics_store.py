@@ -0,0 +1,296 @@
+# core/metrics_store.py
+"""
+Columnar metrics store with incrementally maintained rollups.
+
+Raw points live in one float64 column per metric (NaN where a sample lacks that
+metric) next to a sorted timestamp column. Every batch of new points also
+updates 1-minute, 1-hour and 1-day rollups holding count / sum / min / max /
+sumsq per metric and bucket, so
+
+- a window aggregate is exact and touches only the buckets that tile the window
+  (whole days, then hours and minutes at the edges, raw points for the
+  sub-minute remainder): a month is ~30 day buckets + a few dozen edge buckets;
+- spike detection z-scores the bucket means at the finest resolution that keeps
+  the window under MAX_SPIKE_BUCKETS, as a handful of vector operations.
+"""
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+MINUTE, HOUR, DAY = 60.0, 3600.0, 86400.0
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+MAX_SPIKE_BUCKETS = 1500
+SPIKE_Z = 2.5
+TIMESTAMP_FIELDS = ("timestamp", "time", "ts")
+
+
+class _Column:
+    """Append-mostly float64 array with amortised O(1) growth."""
+
+    def __init__(self, fill: float = np.nan, capacity: int = 1024):
+        self.fill = fill
+        self.data = np.full(capacity, fill)
+        self.size = 0
+
+    def view(self) -> np.ndarray:
+        return self.data[:self.size]
+
+    def _reserve(self, extra: int):
+        need = self.size + extra
+        if need > len(self.data):
+            grown = np.full(max(need, 2 * len(self.data)), self.fill)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+
+    def extend(self, values: np.ndarray):
+        self._reserve(len(values))
+        self.data[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+    def pad(self, n: int):
+        """Extend with n fill values (a metric first seen after n points)."""
+        self._reserve(n)
+        self.data[self.size:self.size + n] = self.fill
+        self.size += n
+
+    def insert(self, index: int, value: float):
+        self._reserve(1)
+        self.data[index + 1:self.size + 1] = self.data[index:self.size]
+        self.data[index] = value
+        self.size += 1
+
+
+# aggregate = (count, sum, min, max, sumsq)
+Agg = Tuple[float, float, float, float, float]
+_EMPTY: Agg = (0.0, 0.0, math.inf, -math.inf, 0.0)
+
+
+def _merge(a: Agg, b: Agg) -> Agg:
+    return (a[0] + b[0], a[1] + b[1], min(a[2], b[2]), max(a[3], b[3]), a[4] + b[4])
+
+
+def _reduce(values: np.ndarray) -> Agg:
+    v = values[~np.isnan(values)]
+    if not len(v):
+        return _EMPTY
+    return (float(len(v)), float(v.sum()), float(v.min()), float(v.max()), float((v * v).sum()))
+
+
+class Rollup:
+    """Per-bucket count/sum/min/max/sumsq for every metric at one resolution."""
+
+    FIELDS = ("count", "sum", "min", "max", "sumsq")
+    FILLS = {"count": 0.0, "sum": 0.0, "min": np.inf, "max": -np.inf, "sumsq": 0.0}
+
+    def __init__(self, resolution: float):
+        self.resolution = resolution
+        self.starts = _Column()
+        self.cols: Dict[str, Dict[str, _Column]] = {}
+
+    def _metric(self, name: str) -> Dict[str, _Column]:
+        if name not in self.cols:
+            self.cols[name] = {}
+            for f in self.FIELDS:
+                col = _Column(fill=self.FILLS[f])
+                col.pad(self.starts.size)
+                self.cols[name][f] = col
+        return self.cols[name]
+
+    def add(self, ts: np.ndarray, values: Dict[str, np.ndarray]):
+        """Fold a time-sorted batch in: one reduceat per metric and field."""
+        keys = np.floor(ts / self.resolution) * self.resolution
+        cuts = np.concatenate([[0], np.flatnonzero(np.diff(keys)) + 1])
+        bucket_keys = keys[cuts]
+        partial: Dict[str, Dict[str, np.ndarray]] = {}
+        for name, vals in values.items():
+            valid = ~np.isnan(vals)
+            clean = np.where(valid, vals, 0.0)
+            partial[name] = {
+                "count": np.add.reduceat(valid.astype(np.float64), cuts),
+                "sum": np.add.reduceat(clean, cuts),
+                "min": np.fmin.reduceat(np.where(valid, vals, np.inf), cuts),
+                "max": np.fmax.reduceat(np.where(valid, vals, -np.inf), cuts),
+                "sumsq": np.add.reduceat(clean * clean, cuts),
+            }
+            self._metric(name)
+
+        starts = self.starts.view()
+        last = starts[-1] if len(starts) else -np.inf
+        # buckets at or before the newest existing one: merge (late data, or the still-open bucket)
+        n_old = int(np.searchsorted(bucket_keys, last, side="right"))
+        for i in range(n_old):
+            pos = int(np.searchsorted(self.starts.view(), bucket_keys[i]))
+            if pos == self.starts.size or self.starts.data[pos] != bucket_keys[i]:
+                self.starts.insert(pos, bucket_keys[i])
+                for fields in self.cols.values():
+                    for f, col in fields.items():
+                        col.insert(pos, self.FILLS[f])
+            for name, p in partial.items():
+                c = self.cols[name]
+                c["count"].data[pos] += p["count"][i]
+                c["sum"].data[pos] += p["sum"][i]
+                c["min"].data[pos] = min(c["min"].data[pos], p["min"][i])
+                c["max"].data[pos] = max(c["max"].data[pos], p["max"][i])
+                c["sumsq"].data[pos] += p["sumsq"][i]
+
+        # new buckets: plain appends
+        fresh = len(bucket_keys) - n_old
+        if fresh:
+            self.starts.extend(bucket_keys[n_old:])
+            for name, fields in self.cols.items():
+                for f, col in fields.items():
+                    if name in partial:
+                        col.extend(partial[name][f][n_old:])
+                    else:
+                        col.pad(fresh)
+
+    def span(self, lo: float, hi: float) -> Tuple[int, int]:
+        """Index range of buckets starting in [lo, hi)."""
+        starts = self.starts.view()
+        return int(np.searchsorted(starts, lo, side="left")), int(np.searchsorted(starts, hi, side="left"))
+
+    def aggregate(self, metric: str, i: int, j: int) -> Agg:
+        c = self.cols.get(metric)
+        if c is None or i >= j:
+            return _EMPTY
+        return (float(c["count"].data[i:j].sum()), float(c["sum"].data[i:j].sum()),
+                float(c["min"].data[i:j].min()), float(c["max"].data[i:j].max()),
+                float(c["sumsq"].data[i:j].sum()))
+
+
+class MetricsStore:
+    def __init__(self, resolutions: Iterable[float] = RESOLUTIONS):
+        self.ts = _Column()
+        self.columns: Dict[str, _Column] = {}
+        self.rollups = [Rollup(r) for r in sorted(resolutions)]
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self.ts.size
+
+    @property
+    def metrics(self) -> List[str]:
+        return list(self.columns)
+
+    # -------------------------
+    # Ingestion
+    # -------------------------
+    @staticmethod
+    def _numeric(row: Dict) -> Dict[str, float]:
+        return {k: float(v) for k, v in row.items()
+                if k not in TIMESTAMP_FIELDS and isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+    def add(self, points: Iterable[Tuple[float, Dict]]):
+        """Append (epoch seconds, sample dict) points; numeric fields become metric columns."""
+        points = sorted(points, key=lambda p: p[0])
+        if not points:
+            return
+        rows = [self._numeric(row) for _, row in points]
+        ts = np.fromiter((t for t, _ in points), dtype=np.float64, count=len(points))
+        names = {k for row in rows for k in row}
+        values = {name: np.fromiter((row.get(name, np.nan) for row in rows), dtype=np.float64, count=len(rows))
+                  for name in names}
+        self.add_columns(ts, values)
+
+    def add_columns(self, ts: np.ndarray, values: Dict[str, np.ndarray]):
+        """Append a time-sorted columnar batch (e.g. a slice of an on-disk segment) as is."""
+        if not len(ts):
+            return
+        ts = np.asarray(ts, dtype=np.float64)
+        values = {name: np.asarray(v, dtype=np.float64) for name, v in values.items()}
+        with self._lock:
+            for name in values:
+                if name not in self.columns:
+                    col = _Column()
+                    col.pad(self.ts.size)
+                    self.columns[name] = col
+
+            raw_ts = self.ts.view()
+            if not len(raw_ts) or ts[0] >= raw_ts[-1]:
+                self.ts.extend(ts)
+                for name, col in self.columns.items():
+                    col.extend(values[name]) if name in values else col.pad(len(ts))
+            else:
+                # late points: keep the raw columns sorted
+                for k in range(len(ts)):
+                    pos = int(np.searchsorted(self.ts.view(), ts[k], side="right"))
+                    self.ts.insert(pos, ts[k])
+                    for name, col in self.columns.items():
+                        col.insert(pos, values[name][k] if name in values else np.nan)
+
+            for rollup in self.rollups:
+                rollup.add(ts, values)
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def _raw(self, metric: str, lo: float, hi: float) -> Agg:
+        ts = self.ts.view()
+        i, j = np.searchsorted(ts, lo, side="left"), np.searchsorted(ts, hi, side="left")
+        return _reduce(self.columns[metric].data[i:j])
+
+    def _cover(self, metric: str, lo: float, hi: float, level: int) -> Agg:
+        """Aggregate over [lo, hi) using the coarsest whole buckets, recursing on the edges."""
+        if lo >= hi:
+            return _EMPTY
+        if level < 0:
+            return self._raw(metric, lo, hi)
+        rollup = self.rollups[level]
+        r = rollup.resolution
+        a, b = math.ceil(lo / r) * r, math.floor(hi / r) * r
+        if a >= b:
+            return self._cover(metric, lo, hi, level - 1)
+        agg = rollup.aggregate(metric, *rollup.span(a, b))
+        agg = _merge(agg, self._cover(metric, lo, a, level - 1))
+        return _merge(agg, self._cover(metric, b, hi, level - 1))
+
+    def aggregate(self, metric: str, start: float, end: float) -> Agg:
+        """Exact (count, sum, min, max, sumsq) for start <= ts <= end."""
+        with self._lock:
+            if metric not in self.columns:
+                return _EMPTY
+            return self._cover(metric, start, np.nextafter(end, np.inf), len(self.rollups) - 1)
+
+    def summary(self, metric: str, start: float, end: float) -> Optional[Dict]:
+        count, total, lo, hi, sumsq = self.aggregate(metric, start, end)
+        if not count:
+            return None
+        mean = total / count
+        return {"count": int(count), "avg": mean, "min": lo, "max": hi,
+                "std": math.sqrt(max(sumsq / count - mean * mean, 0.0))}
+
+    def spikes(self, metric: str, start: float, end: float, z: float = SPIKE_Z) -> Dict:
+        """
+        Z-score spikes over the series of bucket means, at the finest rollup that keeps
+        the window within MAX_SPIKE_BUCKETS (1-minute buckets for a day, 1-hour for a
+        month). With one sample per bucket this is the plain per-sample z-score.
+        """
+        with self._lock:
+            if metric not in self.columns:
+                return {"count": 0, "examples": [], "resolution": None}
+            rollup = next((r for r in self.rollups if (end - start) / r.resolution <= MAX_SPIKE_BUCKETS),
+                          self.rollups[-1])
+            i, j = rollup.span(math.floor(start / rollup.resolution) * rollup.resolution, np.nextafter(end, np.inf))
+            c = rollup.cols[metric]
+            counts = c["count"].data[i:j]
+            filled = np.flatnonzero(counts > 0)
+            starts = rollup.starts.data[i:j][filled]
+            means = c["sum"].data[i:j][filled] / counts[filled]
+            peaks = c["max"].data[i:j][filled]
+        std = means.std() if len(means) >= 3 else 0.0
+        if std == 0:
+            return {"count": 0, "examples": [], "resolution": rollup.resolution}
+        zs = (means - means.mean()) / std
+        hits = np.flatnonzero(np.abs(zs) >= z)
+        order = hits[np.argsort(-np.abs(zs[hits]))]
+        return {
+            "count": int(len(hits)),
+            "resolution": rollup.resolution,
+            "examples": [{"bucket": float(starts[k]), "value": float(means[k]), "max": float(peaks[k]),
+                          "z": float(zs[k])} for k in order[:3]],
+        }
+
+    def stats(self) -> Dict:
+        return {"points": self.ts.size, "metrics": self.metrics,
+                "buckets": {int(r.resolution): r.starts.size for r in self.rollups}}
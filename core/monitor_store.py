@@ -0,0 +1,204 @@
+# core/monitor_store.py
+"""
+In-memory, time-indexed view of the monitoring files SummaryAgent summarises.
+
+    logs/monitor_logs.log          tailed (append-only text, one record per line)
+    metrics/metrics_history.log    tailed (append-only JSONL)
+    metrics/segments/*.mseg        loaded at start (binary history, core.metric_segments)
+    storage/log_alerts.jsonl       deduplicating alert stores (core.alert_store)
+    storage/metric_alerts.jsonl
+    storage/*_alerts.json          legacy JSON arrays: imported into the stores when changed
+
+A background thread polls every MONITOR_POLL_INTERVAL seconds and appends the new
+records, parsed once (utils.timestamps, format detected per source), into
+TimeIndex structures; queries also poll first so they never miss lines written
+since the last tick. A summary window then costs two
+bisects plus the records inside it, instead of re-reading and re-parsing every
+file on every query. Metric samples are also folded into a columnar
+core.metrics_store.MetricsStore, whose rollups answer window statistics and
+spike detection without touching the raw samples.
+
+History compacted into binary segments is mmap'd once at start: its columns go
+straight into the MetricsStore and window reads slice the segments, so a cold
+start decodes no JSON for it. Tailed JSONL rows not newer than the last segment
+were already converted and are skipped.
+
+New metric samples also pass through an online detector (core.anomaly) whose
+alerts go straight into the metric alert store, so anomalies on every metric are
+recorded at ingest rather than found per query. The segment history and the
+backlog read by the first poll only seed the detector: just samples newer than
+that baseline are scored, so a restart never re-alerts on old data.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from core.alert_store import LEGACY_PATHS, LOG_ALERTS_PATH, METRIC_ALERTS_PATH, AlertStore, read_legacy
+from core.anomaly import AnomalyDetector
+from core.metric_segments import SEGMENTS_DIR, SegmentStore
+from core.metrics_store import MetricsStore
+from utils.logger import logger
+from utils.tail import FileTailer, TimeIndex, WatchedFile
+from utils.timestamps import TimestampParser
+
+LOG_PATH = "logs/monitor_logs.log"
+METRICS_PATH = "metrics/metrics_history.log"
+
+
+def _row_timestamp(row: Dict, parser: TimestampParser) -> Optional[float]:
+    return parser.parse(row.get("timestamp") or row.get("time") or row.get("ts"))
+
+
+class MonitorStore:
+    def __init__(self, log_path: str = LOG_PATH, metrics_path: str = METRICS_PATH,
+                 log_alerts_path: str = LOG_ALERTS_PATH, metric_alerts_path: str = METRIC_ALERTS_PATH,
+                 segments_dir: str = SEGMENTS_DIR):
+        self.logs = TimeIndex()
+        self.metrics = TimeIndex()
+        self.log_alerts = AlertStore(log_alerts_path)
+        self.metric_alerts = AlertStore(metric_alerts_path)
+        self.metric_columns = MetricsStore()
+        self.segments = SegmentStore(segments_dir)
+        self._segments_until = self.segments.max_ts
+        self.detector = AnomalyDetector.from_env()
+        # samples at or before this were history when the store started: warm only, never scored
+        self._scored_after: Optional[float] = None
+        for ts, cols in self.segments.read(-float("inf"), float("inf")):
+            self.metric_columns.add_columns(ts, cols)
+            self.detector.warm(cols)
+        self._log_tail = FileTailer(log_path)
+        self._metrics_tail = FileTailer(metrics_path)
+        # producers still writing the old JSON arrays: re-imported (deduplicated) when they change
+        self._legacy_alerts = [(WatchedFile(LEGACY_PATHS[path]), store)
+                               for path, store in ((log_alerts_path, self.log_alerts),
+                                                   (metric_alerts_path, self.metric_alerts))
+                               if path in LEGACY_PATHS]
+        # one parser per source: each detects its own timestamp format once
+        self._parsers = {"logs": TimestampParser("logs"), "metrics": TimestampParser("metrics")}
+        self._poll_lock = threading.Lock()
+        # bumped whenever a poll ingested anything; listeners hear (source, oldest new ts)
+        self.version = 0
+        self._listeners: List[Callable[[str, float], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> Dict[str, int]:
+        """Ingest whatever was appended/changed since the last poll. Cheap when nothing changed."""
+        with self._poll_lock:
+            new_logs = self._log_records(self._log_tail.read_new())
+            self.logs.extend(new_logs)
+            new_metrics = self._metric_records(self._metrics_tail.read_new())
+            self.metrics.extend(new_metrics)
+            self.metric_columns.add(new_metrics)
+            new_alerts = self.metric_alerts.add(self._detect(new_metrics))
+            for watched, store in self._legacy_alerts:
+                if watched.changed():
+                    new_alerts += store.add(read_legacy(watched.path))
+            new_alerts += self.log_alerts.refresh() + self.metric_alerts.refresh()
+            if new_logs or new_metrics or new_alerts:
+                self.version += 1
+            for source, records in (("logs", new_logs), ("metrics", new_metrics)):
+                if records:
+                    oldest = min(ts for ts, _ in records)
+                    for listener in self._listeners:
+                        listener(source, oldest)
+        return {"logs": len(new_logs), "metrics": len(new_metrics), "alerts": new_alerts}
+
+    def _detect(self, records: List[Tuple[float, Dict]]) -> List[Dict]:
+        records = sorted(records, key=lambda r: r[0])
+        if self._scored_after is None:
+            # first poll: the whole existing file is history
+            self.detector.observe(records, score=False)
+            self._scored_after = records[-1][0] if records else (self._segments_until or -float("inf"))
+            return []
+        fresh = [r for r in records if r[0] > self._scored_after]
+        if fresh:
+            self._scored_after = fresh[-1][0]
+        return self.detector.observe(fresh)
+
+    def on_ingest(self, listener: Callable[[str, float], None]):
+        """Call ``listener(source, oldest_ts)`` after each poll that ingested records from a source."""
+        self._listeners.append(listener)
+
+    def _log_records(self, lines: List[str]) -> List[Tuple[float, str]]:
+        parser = self._parsers["logs"]
+        return [(ts, line) for line in lines if (ts := parser.parse_line(line)) is not None]
+
+    def _metric_records(self, lines: List[str]) -> List[Tuple[float, Dict]]:
+        parser = self._parsers["metrics"]
+        out = []
+        for line in lines:
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                continue
+            for row in (obj if isinstance(obj, list) else [obj]):
+                if isinstance(row, dict):
+                    ts = _row_timestamp(row, parser)
+                    if ts is not None and (self._segments_until is None or ts > self._segments_until):
+                        out.append((ts, row))
+        return out
+
+    # -------------------------
+    # Background tailing
+    # -------------------------
+    def start(self, interval: Optional[float] = None):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        interval = interval or float(os.getenv("MONITOR_POLL_INTERVAL", "2"))
+        self.poll()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="monitor-tail", daemon=True)
+        self._thread.start()
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f"Monitor tailing failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    # -------------------------
+    # Window queries: O(log n + k)
+    # -------------------------
+    def window(self, start: datetime, end: datetime, limit: Optional[int] = None) -> Dict[str, list]:
+        """Records in the window; ``limit`` caps the (oldest-first) logs and metric samples."""
+        lo, hi = start.timestamp(), end.timestamp()
+        metrics = self.segments.rows(lo, hi, limit)
+        rest = None if limit is None else limit - len(metrics)
+        return {
+            "logs": self.logs.range(lo, hi, limit),
+            "metrics": metrics + self.metrics.range(lo, hi, rest),
+            "log_alerts": self.log_alerts.range(lo, hi),
+            "metric_alerts": self.metric_alerts.range(lo, hi),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "logs": len(self.logs), "metrics": len(self.segments) + len(self.metrics),
+            "log_alerts": self.log_alerts.stats(), "metric_alerts": self.metric_alerts.stats(),
+            "log_rotations": self._log_tail.rotations, "metrics_rotations": self._metrics_tail.rotations,
+            "timestamps": {name: p.stats() for name, p in self._parsers.items()},
+            "metric_columns": self.metric_columns.stats(),
+            "metric_segments": self.segments.stats(),
+            "anomaly_detector": self.detector.stats(),
+        }
+
+
+_store: Optional[MonitorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_monitor_store() -> MonitorStore:
+    """Process-wide store, tailing in the background from first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MonitorStore()
+                _store.start()
+    return _store
@@ -0,0 +1,180 @@
+# core/onnx_embeddings.py
+"""
+ONNX Runtime backend for the sentence embedding model (EMBEDDING_BACKEND=onnx).
+
+    python -m core.onnx_embeddings export [--no-quantize]   # torch -> ONNX (+ int8 dynamic quantization)
+    python -m core.onnx_embeddings check                    # parity against the PyTorch vectors
+
+The transformer is exported once with ``torch.onnx.export`` and its weights
+quantized to int8 with ONNX Runtime's dynamic quantization (activations stay
+float and are quantized per batch at run time). Serving then needs only
+``onnxruntime`` and ``tokenizers``: no torch import, a fraction of the memory,
+and typically 2-4x the single-query throughput on CPU.
+
+OnnxEmbeddingModel.encode() mirrors SentenceTransformer.encode() (mean pooling
+over the attention mask, optional L2 normalisation), so core.embeddings uses
+either backend unchanged.
+"""
+import argparse
+import os
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from utils.logger import logger
+
+ONNX_ROOT = Path(__file__).resolve().parent.parent / "data" / "onnx"
+MAX_SEQ_LENGTH = 256          # sentence-transformers' limit for all-MiniLM-L6-v2
+PARITY_THRESHOLD = 0.99       # minimum cosine between torch and ONNX vectors
+PARITY_SENTENCES = [
+    "How do I list all S3 buckets with the AWS CLI?",
+    "aws ec2 describe-instances --filters Name=instance-state-name,Values=running",
+    "Which IAM permission allows s3:GetObject on a single prefix?",
+    "Summarize CPU usage spikes from last week",
+    "What happened to the database connections yesterday?",
+    "CIS benchmark: ensure MFA is enabled for the root account",
+    "DynamoDB",
+    "Explain the difference between security groups and network ACLs in a VPC, "
+    "including stateful versus stateless filtering and default rules.",
+]
+
+
+def model_dir(model_name: str) -> Path:
+    return Path(os.getenv("EMBEDDING_ONNX_DIR", ONNX_ROOT / model_name.split("/")[-1]))
+
+
+def model_file(directory: Path, quantized: bool) -> Path:
+    return directory / ("model.int8.onnx" if quantized else "model.onnx")
+
+
+# -------------------------
+# Export
+# -------------------------
+def export(model_name: str, out_dir: Optional[Path] = None, quantize: bool = True) -> Path:
+    """Export the transformer (without pooling) to ONNX and optionally quantize it. Needs torch."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = out_dir or model_dir(model_name)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+    tokenizer.save_pretrained(str(out_dir))   # writes tokenizer.json used at serving time
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    inputs = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    axes = {name: {0: "batch", 1: "sequence"} for name in inputs}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32 = model_file(out_dir, quantized=False)
+    logger.info(f"Exporting {model_name} to {fp32}")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(sample[name] for name in inputs), str(fp32),
+            input_names=inputs, output_names=["last_hidden_state"],
+            dynamic_axes=axes, opset_version=17, do_constant_folding=True,
+        )
+    if not quantize:
+        return fp32
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    int8 = model_file(out_dir, quantized=True)
+    quantize_dynamic(str(fp32), str(int8), weight_type=QuantType.QInt8)
+    logger.info(f"Quantized {fp32.name} -> {int8.name} "
+                f"({fp32.stat().st_size >> 20} MB -> {int8.stat().st_size >> 20} MB)")
+    return int8
+
+
+# -------------------------
+# Serving
+# -------------------------
+class OnnxEmbeddingModel:
+    """Drop-in for SentenceTransformer.encode() on an exported model directory."""
+
+    def __init__(self, directory: Path, quantized: bool = True, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = model_file(directory, quantized)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = threads or int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(directory / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+        self.path = path
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = True,
+               show_progress_bar: bool = False) -> np.ndarray:
+        out = []
+        for i in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[i:i + batch_size]))
+            feed = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+            }
+            hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+            # mean pooling over real (non-padding) tokens, as sentence-transformers does
+            mask = feed["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            out.append(pooled)
+        vectors = np.concatenate(out) if out else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(vectors):
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+
+def load(model_name: str, quantized: bool = True) -> OnnxEmbeddingModel:
+    """Load the exported model, exporting it first (one-off, needs torch) if it isn't there yet."""
+    directory = model_dir(model_name)
+    if not model_file(directory, quantized).exists() or not (directory / "tokenizer.json").exists():
+        logger.warning(f"No ONNX export in {directory}, exporting {model_name} now")
+        export(model_name, directory, quantize=quantized)
+    logger.info(f"Loading ONNX embedding model {model_file(directory, quantized)}")
+    return OnnxEmbeddingModel(directory, quantized=quantized)
+
+
+# -------------------------
+# Parity
+# -------------------------
+def parity(reference, candidate, texts: List[str] = None) -> dict:
+    """Cosine similarity between two backends' normalised vectors for the same texts."""
+    texts = texts or PARITY_SENTENCES
+    a = np.asarray(reference.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    b = np.asarray(candidate.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    cos = (a * b).sum(axis=1)
+    # retrieval parity: does each text still find itself first among the others?
+    same_rank = float(np.mean(np.argmax(b @ a.T, axis=1) == np.arange(len(texts))))
+    return {"min_cosine": float(cos.min()), "mean_cosine": float(cos.mean()),
+            "self_retrieval": same_rank, "ok": bool(cos.min() >= PARITY_THRESHOLD)}
+
+
+def main(argv: Optional[List[str]] = None):
+    from core.embeddings import MODEL_NAME
+
+    parser = argparse.ArgumentParser(description="Export / verify the ONNX embedding backend.")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--no-quantize", action="store_true", help="keep fp32 weights")
+    args = parser.parse_args(argv)
+    quantized = not args.no_quantize
+
+    if args.command == "export":
+        print(f"✔ Exported to {export(args.model, quantize=quantized)}")
+        return
+
+    from sentence_transformers import SentenceTransformer
+    result = parity(SentenceTransformer(args.model, device="cpu"), load(args.model, quantized))
+    print(f"{'✔' if result['ok'] else '✘'} parity vs PyTorch: {result}")
+    if not result["ok"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
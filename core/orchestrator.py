@@ -1,48 +1,86 @@
 # core/orchestrator.py
 from utils.logger import logger
-from utils.async_utils import gather_with_timeout
+from utils.async_utils import gather_with_timeout, iter_with_deadline
 from core.fuser import Fuser
+from llm.gemini import LangChainGemini
+from llm.routing_cache import RoutingCache
 import asyncio
+import os
+from functools import cached_property
 from langchain.tools import Tool
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional
 
 class Orchestrator:
-    def __init__(self, tools: List[Tool]):
+    def __init__(self, tools: List[Tool], selector=None,
+                 agent_timeouts: Optional[Dict[str, float]] = None,
+                 hedge_after: Optional[float] = None):
         """
         tools: preloaded list of LangChain Tool objects (one per agent)
+        selector: optional core.selector.Selector (local embedding router first,
+                  Gemini only for ambiguous queries). Without it every request is
+                  classified by Gemini.
+        agent_timeouts: per-agent deadlines in seconds (others use call_timeout)
+        hedge_after: start a second attempt for agents still running after this
+                     many seconds (AGENT_HEDGE_AFTER); None disables hedging
         """
         self.tools = tools
+        self.selector = selector
         self.fuser = Fuser()
-        self.call_timeout = 5  # seconds per agent
+        self.call_timeout = float(os.getenv("AGENT_TIMEOUT", "5"))  # default seconds per agent
+        self.agent_timeouts = agent_timeouts or {}
+        if hedge_after is None and os.getenv("AGENT_HEDGE_AFTER"):
+            hedge_after = float(os.getenv("AGENT_HEDGE_AFTER"))
+        self.hedge_after = hedge_after
+        # handle_batch(): unique queries fanned out to agents at once, and fusions in flight at once
+        self.batch_concurrency = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    @cached_property
+    def llm(self) -> LangChainGemini:
+        """One long-lived classifier, built on the first LLM-routed request so the
+        service starts (and local routing works) without an API key."""
+        return LangChainGemini()
+
+    async def select_agent_names(self, message: str) -> List[str]:
+        if self.selector is not None:
+            return [m.name for m in await self.selector.select_agents(message)]
+        # Filter tools by names returned from Gemini classification
+        registry_summary = "\n".join([f"{t.name}: {t.description}" for t in self.tools])
+        logger.debug(f"Classifying against registry:\n{registry_summary}")
+        return await self.llm.classify_agents(message, registry_summary)
+
+    async def select_agent_names_batch(self, messages: List[str]) -> List[List[str]]:
+        if self.selector is not None:
+            return [[m.name for m in selected] for selected in await self.selector.select_agents_batch(messages)]
+        registry_summary = "\n".join([f"{t.name}: {t.description}" for t in self.tools])
+        return await self.llm.classify_agents_batch(messages, registry_summary)
+
+    async def _run_tool(self, tool: Tool, message: str):
+        if tool.coroutine is not None:
+            return await tool.coroutine(message)
+        if asyncio.iscoroutinefunction(tool.func):
+            return await tool.func(message)
+        else:
+            return tool.func(message)
+
+    def _agent_calls(self, candidates: List[Tool], message: str):
+        return {t.name: (lambda tool=t: self._run_tool(tool, message)) for t in candidates}
 
     async def handle_request(self, message: str):
         logger.info(f"Handling user request: {message}")
 
         # 1️⃣ Select agents to handle this message
-        # Filter tools by names returned from Gemini classification
-        registry_summary = "\n".join([f"{t.name}: {t.description}" for t in self.tools])
-        from llm.gemini import LangChainGemini
-        llm = LangChainGemini()
-        print("REGISTRRY",registry_summary)
-        selected_agent_names = await llm.classify_agents(message, registry_summary)
+        selected_agent_names = await self.select_agent_names(message)
         logger.info(f"Selected agents: {selected_agent_names}")
 
         # Filter the tools to only selected ones
         candidates = [t for t in self.tools if t.name in selected_agent_names]
 
-        # 2️⃣ Run agents concurrently
-        async def run_tool(tool: Tool):
-            if asyncio.iscoroutinefunction(tool.func):
-                return await tool.func(message)
-            else:
-                return tool.func(message)
-
-        tasks = [run_tool(t) for t in candidates]
-        responses = await gather_with_timeout(tasks, timeout=self.call_timeout)
-
-        # Wrap responses for fuser
-        agent_responses = [{"agent": t.name, "ok": True, "data": {"message": r}}
-                           for t, r in zip(candidates, responses)]
+        # 2️⃣ Run agents concurrently, each against its own deadline;
+        # stragglers come back as explicit timeout markers for the fuser
+        agent_responses = await gather_with_timeout(
+            self._agent_calls(candidates, message), timeout=self.agent_timeouts,
+            hedge_after=self.hedge_after, default_timeout=self.call_timeout,
+        )
 
         # 3️⃣ Fuse their outputs into a single summary
         fused = await self.fuser.fuse(message, agent_responses)
@@ -52,3 +90,126 @@ class Orchestrator:
             "responses": agent_responses,
             "fused": fused
         }
+
+    async def handle_batch(self, messages: List[str], max_concurrency: Optional[int] = None) -> Dict:
+        """
+        handle_request() for many messages; results come back in input order.
+
+        1️⃣ all messages are routed together (local router, then one batched classification prompt)
+        2️⃣ messages are grouped by normalized query: each agent runs once per unique query, and a
+           query's agents start as soon as one of ``max_concurrency`` slots frees up
+        3️⃣ each unique (query, agents) pair is fused once, at most ``max_concurrency`` at a time
+
+        A message that differs from an earlier one only in case, whitespace or trailing
+        punctuation gets that message's answer; its item says so with
+        ``"deduplicated_from": <index of the message that was actually run>``.
+        A failed fusion is reported on its own items ({"fused": None, "error": ...}) instead of
+        failing the whole batch.
+        """
+        limit = max_concurrency or self.batch_concurrency
+        logger.info(f"Handling batch of {len(messages)} requests")
+        selections = await self.select_agent_names_batch(messages)
+
+        # Group by normalized query; the first message of a group is the one sent to agents and fusion
+        groups: Dict[str, Dict] = {}
+        keys = []
+        for i, (message, names) in enumerate(zip(messages, selections)):
+            key = RoutingCache.normalize(message)
+            group = groups.setdefault(key, {"index": i, "message": message, "agents": set()})
+            group["agents"].update(names)
+            keys.append(key)
+
+        agent_slots = asyncio.Semaphore(limit)
+        fusion_slots = asyncio.Semaphore(limit)
+
+        async def run_agents(group: Dict) -> Dict[str, Dict]:
+            candidates = [t for t in self.tools if t.name in group["agents"]]
+            async with agent_slots:
+                responses = await gather_with_timeout(
+                    self._agent_calls(candidates, group["message"]), timeout=self.agent_timeouts,
+                    hedge_after=self.hedge_after, default_timeout=self.call_timeout,
+                )
+            return {r["agent"]: r for r in responses}
+
+        agent_runs = {key: asyncio.ensure_future(run_agents(group)) for key, group in groups.items()}
+
+        async def fuse(key: str, agent_names: tuple) -> str:
+            responses = await agent_runs[key]
+            async with fusion_slots:
+                return await self.fuser.fuse(groups[key]["message"], [responses[n] for n in agent_names])
+
+        fusions: Dict[tuple, asyncio.Future] = {}
+        for key, names in zip(keys, selections):
+            agent_names = tuple(t.name for t in self.tools if t.name in names)
+            if (key, agent_names) not in fusions:
+                fusions[(key, agent_names)] = asyncio.ensure_future(fuse(key, agent_names))
+
+        try:
+            await asyncio.gather(*fusions.values(), return_exceptions=True)
+        finally:
+            for task in [*agent_runs.values(), *fusions.values()]:
+                task.cancel()
+
+        results = []
+        for i, (key, names) in enumerate(zip(keys, selections)):
+            agent_names = tuple(t.name for t in self.tools if t.name in names)
+            responses = agent_runs[key].result()
+            item = {
+                "agents_called": list(agent_names),
+                "responses": [responses[n] for n in agent_names],
+            }
+            if groups[key]["index"] != i:
+                item["deduplicated_from"] = groups[key]["index"]
+            fusion = fusions[(key, agent_names)]
+            if fusion.exception() is not None:
+                logger.error(f"Batch fusion failed: {fusion.exception()!r}")
+                item.update(fused=None, error=str(fusion.exception()) or type(fusion.exception()).__name__)
+            else:
+                item["fused"] = fusion.result()
+            results.append(item)
+
+        return {
+            "results": results,
+            "unique_queries": len(groups),
+            "agent_calls": sum(len(g["agents"]) for g in groups.values()),
+            "fusions": len(fusions),
+        }
+
+    async def stream_request(self, message: str) -> AsyncIterator[Dict]:
+        """
+        Streaming variant of handle_request(). Yields events as they happen:
+            {"event": "routing", "agents": [...]}            right after selection
+            {"event": "agent", "agent": ..., "ok": ..., "data": {...}}   per agent, as it completes
+            {"event": "token", "text": ...}                  fused answer chunks
+            {"event": "done", "agents_called": [...], "fused": ...}
+            {"event": "error", "message": ...}               if fusion fails
+        """
+        logger.info(f"Streaming user request: {message}")
+
+        # 1️⃣ Routing decision goes out immediately
+        selected_agent_names = await self.select_agent_names(message)
+        candidates = [t for t in self.tools if t.name in selected_agent_names]
+        yield {"event": "routing", "agents": [t.name for t in candidates]}
+
+        # 2️⃣ Push each agent's result as soon as it completes (or misses its deadline)
+        finished: Dict[str, Dict] = {}
+        async for resp in iter_with_deadline(
+            self._agent_calls(candidates, message), timeout=self.agent_timeouts,
+            hedge_after=self.hedge_after, default_timeout=self.call_timeout,
+        ):
+            finished[resp["agent"]] = resp
+            yield {"event": "agent", **resp}
+
+        agent_responses = [finished[t.name] for t in candidates]
+
+        # 3️⃣ Stream the fused answer token by token
+        chunks = []
+        try:
+            async for chunk in self.fuser.fuse_stream(message, agent_responses):
+                chunks.append(chunk)
+                yield {"event": "token", "text": chunk}
+        except Exception as e:
+            logger.error(f"Streaming fusion failed: {e}")
+            yield {"event": "error", "message": str(e)}
+
+        yield {"event": "done", "agents_called": [t.name for t in candidates], "fused": "".join(chunks)}
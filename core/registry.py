@@ -1,9 +1,137 @@
+# core/registry.py
+"""
+Lazily constructed agents.
+
+Building an agent can be expensive (StaticAgent loads a SentenceTransformer and
+opens Chroma), so the server only records a LazyAgent per registry entry at
+startup. The agent is imported and instantiated on first selection, or ahead of
+time by ``AgentRegistry.warmup()`` running in the background. Agents that run in
+process-pool workers are only imported here and end up "deferred": each worker
+builds its own instance on its first call.
+"""
+import asyncio
+import importlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+from models.schemas import AgentMetadata
+from utils.logger import logger
+
+COLD, WARMING, WARM, DEFERRED, FAILED = "cold", "warming", "warm", "deferred", "failed"
+
+
+class LazyAgent:
+    """
+    Imports and constructs an agent on first use; safe to call from several threads.
+
+    remote  optional predicate on the agent class: True means instances live
+            elsewhere (process-pool workers), so warmup only imports the class
+    """
+
+    def __init__(self, meta: AgentMetadata, remote: Optional[Callable[[type], bool]] = None):
+        self.meta = meta
+        self.remote = remote
+        self.state = COLD
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._class = None
+        self._remote: Optional[bool] = None
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def warm(self) -> bool:
+        return self.state == WARM
+
+    @property
+    def ready(self) -> bool:
+        """Nothing left to load in this process (built here, or deferred to the workers)."""
+        return self.state in (WARM, DEFERRED)
+
+    def agent_class(self) -> type:
+        """Import only; cheap after the first call."""
+        if self._class is None:
+            self._class = getattr(importlib.import_module(self.meta.module), self.meta.class_name)
+        return self._class
+
+    def is_remote(self) -> bool:
+        if self._remote is None:
+            self._remote = self.remote is not None and self.remote(self.agent_class())
+            if self._remote:
+                self.state, self.error = DEFERRED, None
+        return self._remote
+
+    async def ais_remote(self) -> bool:
+        """Event-loop variant: the first call imports the agent's module in the shared I/O pool."""
+        if self._remote is not None:
+            return self._remote
+        from core.executors import get_agent_executor
+        return await get_agent_executor().run_io(self.is_remote)
+
+    def get(self):
+        """Blocking: constructs the agent if needed. A failed build is retried on the next call."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self.state = WARMING
+                    start = time.perf_counter()
+                    try:
+                        self._instance = self.agent_class()()
+                    except Exception as e:
+                        self.state, self.error = FAILED, str(e)
+                        logger.error(f"Agent {self.meta.name} failed to load: {e}")
+                        raise
+                    self.load_seconds = round(time.perf_counter() - start, 3)
+                    self.state, self.error = WARM, None
+                    logger.info(f"Agent {self.meta.name} ready in {self.load_seconds}s")
+        return self._instance
+
+    async def aget(self):
+        """Event-loop variant: construction runs in the shared I/O pool."""
+        if self._instance is not None:
+            return self._instance
+        from core.executors import get_agent_executor
+        return await get_agent_executor().run_io(self.get)
+
+    async def awarmup(self):
+        """aget(), except that remote agents are only imported and marked DEFERRED (their workers build them)."""
+        try:
+            remote = await self.ais_remote()
+        except Exception as e:
+            self.state, self.error = FAILED, str(e)
+            logger.error(f"Agent {self.meta.name} failed to load: {e}")
+            raise
+        if remote:
+            logger.info(f"Agent {self.meta.name} runs in process-pool workers; not built here")
+            return None
+        return await self.aget()
+
+    def status(self) -> dict:
+        return {"state": self.state, "load_seconds": self.load_seconds, "error": self.error}
+
+
 class AgentRegistry:
     def __init__(self):
-        self.agents = {}
+        self.agents: Dict[str, LazyAgent] = {}
 
     def register(self, name, agent):
         self.agents[name] = agent
 
     def get(self, name):
         return self.agents.get(name)
+
+    def states(self) -> Dict[str, dict]:
+        return {name: agent.status() for name, agent in self.agents.items()}
+
+    @property
+    def all_ready(self) -> bool:
+        return all(agent.ready for agent in self.agents.values())
+
+    async def warmup(self, names: Optional[Iterable[str]] = None):
+        """Construct the given (default: all) agents concurrently; failures are logged, not raised."""
+        targets = [self.agents[n] for n in (names or self.agents) if n in self.agents]
+        results = await asyncio.gather(*(agent.awarmup() for agent in targets), return_exceptions=True)
+        failed = [a.meta.name for a, r in zip(targets, results) if isinstance(r, Exception)]
+        deferred = [a.meta.name for a in targets if a.state == DEFERRED]
+        logger.info(f"Agent warmup finished: {len(targets) - len(failed) - len(deferred)} warm, "
+                     f"deferred to workers: {deferred or 'none'}, failed: {failed or 'none'}")
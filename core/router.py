@@ -0,0 +1,92 @@
+# core/router.py
+"""
+Local embedding router.
+
+Each agent's ``description`` in the registry is a comma-separated list of
+capabilities ("monitoring, summary, CPU usage, ..."). Every capability phrase
+is embedded once at startup; an incoming message is scored against all of them
+in a single matrix-vector product and each agent takes its best phrase score.
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List
+import numpy as np
+from models.schemas import AgentMetadata
+from utils.logger import logger
+
+
+@dataclass
+class RouteDecision:
+    agents: List[str]
+    scores: Dict[str, float] = field(default_factory=dict)
+    confident: bool = False
+
+
+class EmbeddingRouter:
+    """
+    accept_threshold  minimum best-phrase cosine for an agent to be dispatched locally
+    ambiguity_margin  an agent scoring within this margin *below* the threshold makes
+                      the decision ambiguous (escalated to the LLM)
+    """
+
+    def __init__(self, registry: List[AgentMetadata], embedder=None,
+                 accept_threshold: float = None, ambiguity_margin: float = None):
+        if embedder is None:
+            from core.embeddings import get_embedder
+            embedder = get_embedder()
+        self.embedder = embedder
+        self.accept_threshold = accept_threshold if accept_threshold is not None else float(
+            os.getenv("ROUTER_ACCEPT_THRESHOLD", "0.5"))
+        self.ambiguity_margin = ambiguity_margin if ambiguity_margin is not None else float(
+            os.getenv("ROUTER_AMBIGUITY_MARGIN", "0.05"))
+        self.agent_names: List[str] = []
+        self._owners = np.zeros(0, dtype=np.int32)
+        self._matrix = None
+        self._build_index(registry)
+
+    @staticmethod
+    def capabilities(meta: AgentMetadata) -> List[str]:
+        return [c.strip() for c in (meta.description or "").split(",") if c.strip()]
+
+    def _build_index(self, registry: List[AgentMetadata]):
+        phrases, owners = [], []
+        for idx, meta in enumerate(registry):
+            self.agent_names.append(meta.name)
+            for cap in self.capabilities(meta):
+                phrases.append(cap)
+                owners.append(idx)
+        if not phrases:
+            logger.warning("Local router: registry has no capability phrases.")
+            return
+        self._matrix = np.asarray(self.embedder.encode(phrases), dtype=np.float32)
+        self._owners = np.asarray(owners, dtype=np.int32)
+        logger.info(f"Local router indexed {len(phrases)} capability phrases for {len(registry)} agents")
+
+    def _score_vector(self, query) -> Dict[str, float]:
+        if self._matrix is None:
+            return {}
+        sims = self._matrix @ np.asarray(query, dtype=np.float32)
+        best = np.full(len(self.agent_names), -1.0, dtype=np.float32)
+        np.maximum.at(best, self._owners, sims)
+        return {name: float(best[i]) for i, name in enumerate(self.agent_names)}
+
+    def score(self, message: str) -> Dict[str, float]:
+        if self._matrix is None:
+            return {}
+        return self._score_vector(self.embedder.embed_vector(message))
+
+    def route(self, message: str) -> RouteDecision:
+        return self._decide(self.score(message))
+
+    async def aroute(self, message: str) -> RouteDecision:
+        """Event-loop variant: the query embedding goes through the shared micro-batcher."""
+        if self._matrix is None:
+            return RouteDecision(agents=[])
+        return self._decide(self._score_vector(await self.embedder.aembed_vector(message)))
+
+    def _decide(self, scores: Dict[str, float]) -> RouteDecision:
+        accepted = [n for n, s in sorted(scores.items(), key=lambda kv: -kv[1]) if s >= self.accept_threshold]
+        borderline = [n for n, s in scores.items()
+                      if self.accept_threshold - self.ambiguity_margin <= s < self.accept_threshold]
+        confident = bool(accepted) and not borderline
+        return RouteDecision(agents=accepted, scores=scores, confident=confident)
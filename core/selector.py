@@ -1,13 +1,30 @@
 # core/selector.py
-from typing import List
+import asyncio
+import threading
+from functools import cached_property
+from typing import List, Optional
 from models.schemas import AgentMetadata
 from llm.llm_manager import LLMManager
+from core.router import EmbeddingRouter
 from utils.logger import logger
 
 class Selector:
-    def __init__(self, metadata_mgr):
+    def __init__(self, metadata_mgr, llm: LLMManager = None, router: EmbeddingRouter = None):
         self.metadata = metadata_mgr
-        self.llm = LLMManager(provider="gemini-2.5-flash-lite")
+        if llm is not None:
+            self.llm = llm
+        # Built on first use or by warmup(): indexing the registry loads the embedding model
+        self.router = router
+        self.router_state = "warm" if router is not None else "cold"
+        self._router_lock = threading.Lock()
+        self._warmup_task = None
+        self.local_routes = 0
+        self.llm_routes = 0
+
+    @cached_property
+    def llm(self) -> LLMManager:
+        # Only ambiguous queries need it; building it needs the LLM API key
+        return LLMManager(provider="gemini-2.5-flash-lite")
 
     async def select_agents(self, message: str, top_k: int = 3) -> List[AgentMetadata]:
         registry = self.metadata.list_all()
@@ -15,11 +32,21 @@ class Selector:
             logger.warning("No agents registered.")
             return []
 
-        summary = "\n".join([f"{m.name}: {', '.join(m.description)}" for m in registry])
+        # ⚡ Confident local decision: no LLM round trip
+        self._start_warmup()
+        if self.router is not None:
+            decision = await self.router.aroute(message)
+            logger.info(f"Local router scores: {decision.scores}")
+            if decision.confident:
+                self.local_routes += 1
+                selected = [m for m in registry if m.name in decision.agents[:top_k]]
+                logger.info(f"Local router selected agents: {[m.name for m in selected]}")
+                return selected
 
-        # Get classification from Gemini
+        # Ambiguous: escalate to Gemini classification
+        self.llm_routes += 1
+        summary = "\n".join([f"{m.name}: {m.description}" for m in registry])
         agent_names = await self.llm.classify_agents(message, summary)
-        print("Summary",summary)
         if not agent_names:
             logger.warning("Gemini returned no matches, fallback to keyword.")
             return self._fallback_keyword(message, registry, top_k)
@@ -28,12 +55,67 @@ class Selector:
         logger.info(f"Gemini selected agents: {[m.name for m in selected]}")
         return selected
 
+    async def select_agents_batch(self, messages: List[str], top_k: int = 3) -> List[List[AgentMetadata]]:
+        """
+        select_agents() for many messages, in input order: each is routed locally first and
+        all the ambiguous ones are escalated together in a single batched Gemini prompt.
+        """
+        registry = self.metadata.list_all()
+        if not registry:
+            logger.warning("No agents registered.")
+            return [[] for _ in messages]
+
+        selected: List[Optional[List[AgentMetadata]]] = [None] * len(messages)
+        self._start_warmup()
+        if self.router is not None:
+            decisions = await asyncio.gather(*(self.router.aroute(m) for m in messages))
+            for i, decision in enumerate(decisions):
+                if decision.confident:
+                    self.local_routes += 1
+                    selected[i] = [m for m in registry if m.name in decision.agents[:top_k]]
+
+        ambiguous = [i for i, s in enumerate(selected) if s is None]
+        if ambiguous:
+            self.llm_routes += len(ambiguous)
+            summary = "\n".join([f"{m.name}: {m.description}" for m in registry])
+            agent_lists = await self.llm.classify_agents_batch([messages[i] for i in ambiguous], summary)
+            for i, agent_names in zip(ambiguous, agent_lists):
+                if agent_names:
+                    selected[i] = [m for m in registry if m.name in agent_names][:top_k]
+                else:
+                    selected[i] = self._fallback_keyword(messages[i], registry, top_k)
+        logger.info(f"Batch routing: {len(messages) - len(ambiguous)} local, {len(ambiguous)} escalated")
+        return selected
+
+    def _start_warmup(self):
+        if self.router is None and self.router_state == "cold" and self._warmup_task is None:
+            # don't hold this request on the model load; later ones route locally
+            self._warmup_task = asyncio.create_task(asyncio.to_thread(self.warmup))
+
+    def warmup(self):
+        """Blocking: build the local router once. On failure every query goes to Gemini."""
+        with self._router_lock:
+            if self.router_state != "cold":
+                return
+            self.router_state = "warming"
+        try:
+            self.router = EmbeddingRouter(self.metadata.list_all())
+            self.router_state = "warm"
+        except Exception as e:
+            self.router_state = "failed"
+            logger.warning(f"Local router unavailable, every query goes to Gemini: {e}")
+
     def _fallback_keyword(self, message: str, registry, top_k: int):
         msg = message.lower()
         scored = []
         for m in registry:
-            score = sum(tok in msg for cap in m.description for tok in cap.lower().split())
+            caps = EmbeddingRouter.capabilities(m)
+            score = sum(cap.lower() in msg for cap in caps)
             if score > 0:
                 scored.append((m, score))
         scored.sort(key=lambda x: -x[1])
         return [m for m, _ in scored[:top_k]]
+
+    def stats(self) -> dict:
+        return {"local_routes": self.local_routes, "llm_routes": self.llm_routes,
+                "router": self.router_state}
@@ -1,18 +1,36 @@
 # core/tool_loader.py
 from langchain.tools import Tool # type: ignore
-import importlib
 from models.schemas import AgentMetadata
+from core.executors import AgentExecutor, get_agent_executor
+from core.registry import AgentRegistry, LazyAgent
 from typing import List
 
-def create_tools(metadata: List[AgentMetadata]) -> list[Tool]:
+
+def _dispatcher(agent: LazyAgent, meta: AgentMetadata, executor: AgentExecutor):
+    async def call(query):
+        if await agent.ais_remote():
+            # CPU-bound agents on the process pool are built inside each worker, never here
+            return await executor.run_in_worker(meta, query)
+        # first selection builds the agent (off the event loop) unless warmup already did
+        instance = await agent.aget()
+        # dispatched by declared ExecutionClass: loop / thread pool / process pool
+        return await executor.run(instance, meta, query)
+    return call
+
+
+def create_tools(metadata: List[AgentMetadata], executor: AgentExecutor = None,
+                 registry: AgentRegistry = None) -> list[Tool]:
+    """One Tool per agent. Agents are not imported or constructed here (see core.registry)."""
+    executor = executor or get_agent_executor()
+    registry = registry if registry is not None else AgentRegistry()
     tools = []
     for agent_meta in metadata:
-        module = importlib.import_module(agent_meta.module)   # use .module from schema
-        cls = getattr(module, agent_meta.class_name)          # use .class_name from schema
-        instance = cls()                                      # instantiate once
+        agent = LazyAgent(agent_meta, remote=executor.in_worker)
+        registry.register(agent_meta.name, agent)
         tool = Tool(
             name=agent_meta.name,
-            func=lambda query, inst=instance: inst.process(query),
+            func=lambda query, agent=agent: agent.get().process(query),
+            coroutine=_dispatcher(agent, agent_meta, executor),
             description=agent_meta.description or ""
         )
         tools.append(tool)
@@ -1,15 +1,39 @@
-import os
+"""
+Convert botocore service models into compact per-operation records for RAG.
+
+    python -m knowledge_base.convert [--workers 8] [--force]
+
+For each service the latest API version's ``service-2.json(.gz)`` is parsed in a
+process pool and written straight to ``knowledge_base/knowledge_base/botocore/<service>.jsonl``,
+one record per operation. A manifest of source mtimes, sizes and sha256 hashes means
+reruns only reconvert service models that actually changed. The main process never
+holds more than one service's summary at a time, so memory stays flat with corpus size.
+The output directory is picked up by ``knowledge_base.ingest`` as one source per service.
+"""
+import argparse
+import gzip
+import hashlib
 import json
-import glob
-import botocore
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+OUTPUT_DIR = Path(__file__).resolve().parent / "knowledge_base" / "botocore"
+MANIFEST_FILE = OUTPUT_DIR / "manifest.json"
+MAX_DOC_CHARS = 600
 
-OUTPUT_FILE = Path("knowledge_base/botocore_services.txt")
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE = re.compile(r"\s+")
 
-def get_botocore_data_path():
+
+def get_botocore_data_path() -> Path:
     """
     Automatically find the botocore data folder inside your environment.
     """
+    import botocore
+
     botocore_path = Path(botocore.__file__).parent
     data_path = botocore_path / "data"
 
@@ -19,63 +43,193 @@ def get_botocore_data_path():
     return data_path
 
 
-def collect_json_files(root):
+def collect_service_models(root: Path) -> Dict[str, Path]:
     """
-    Recursively collect ALL JSON files in botocore/data
+    Map each service to the service-2.json(.gz) of its latest API version.
     """
-    pattern = str(root / "**/*.json")
-    return glob.glob(pattern, recursive=True)
-
-
-def convert_json_files_to_text(json_files):
-    """
-    Read each JSON file and convert it into formatted text.
-    """
-    output_blocks = []
-
-    for file_path in json_files:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            # Format JSON pretty for RAG
-            block = f"### FILE: {file_path}\n\n"
-            block += json.dumps(data, indent=2)
-            block += "\n\n\n"
+    models: Dict[str, Path] = {}
+    for service_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        versions = sorted((p for p in service_dir.iterdir() if p.is_dir()), reverse=True)
+        for version in versions:
+            for name in ("service-2.json", "service-2.json.gz"):
+                path = version / name
+                if path.exists():
+                    models[service_dir.name] = path
+                    break
+            if service_dir.name in models:
+                break
+    return models
+
+
+# -------------------------
+# Worker side
+# -------------------------
+def _plain(doc: Optional[str]) -> str:
+    text = _WS_RE.sub(" ", _TAG_RE.sub(" ", doc or "")).strip()
+    return text[:MAX_DOC_CHARS].rsplit(" ", 1)[0] + " …" if len(text) > MAX_DOC_CHARS else text
+
+
+def _members(shapes: Dict, shape_name: Optional[str]) -> Tuple[List[str], List[str]]:
+    shape = shapes.get(shape_name or "", {})
+    return list(shape.get("members", {}).keys()), list(shape.get("required", []))
+
+
+def iter_operation_records(service: str, model: Dict) -> Iterator[Dict]:
+    meta = model.get("metadata", {})
+    shapes = model.get("shapes", {})
+    title = meta.get("serviceFullName") or service
+    for op_name, op in sorted(model.get("operations", {}).items()):
+        inputs, required = _members(shapes, (op.get("input") or {}).get("shape"))
+        outputs, _ = _members(shapes, (op.get("output") or {}).get("shape"))
+        errors = [e.get("shape") for e in op.get("errors", []) if e.get("shape")]
+        http = op.get("http", {})
+        doc = _plain(op.get("documentation"))
+
+        text = f"{title} ({service} {meta.get('apiVersion', '')}) operation {op_name}."
+        if http:
+            text += f" HTTP {http.get('method', '')} {http.get('requestUri', '')}."
+        if inputs:
+            text += f" Input: {', '.join(inputs)}."
+        if required:
+            text += f" Required: {', '.join(required)}."
+        if outputs:
+            text += f" Output: {', '.join(outputs)}."
+        if errors:
+            text += f" Errors: {', '.join(errors)}."
+        if doc:
+            text += f" {doc}"
+
+        yield {
+            "id": f"{service}.{op_name}",
+            "service": service,
+            "api_version": meta.get("apiVersion"),
+            "operation": op_name,
+            "text": text,
+        }
+
+
+def convert_service(service: str, model_path: str, output_dir: str) -> Dict:
+    """Parse one service model and stream its records to <output_dir>/<service>.jsonl."""
+    path = Path(model_path)
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if path.suffix == ".gz":
+        raw = gzip.decompress(raw)
+    model = json.loads(raw)
+    del raw
+
+    out = Path(output_dir) / f"{service}.jsonl"
+    tmp = out.with_suffix(".jsonl.tmp")
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in iter_operation_records(service, model):
+            f.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    os.replace(tmp, out)
+    return {"service": service, "sha256": digest, "records": count}
+
+
+# -------------------------
+# Manifest & driver
+# -------------------------
+def load_manifest() -> Dict:
+    if MANIFEST_FILE.exists():
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"version": 1, "services": {}}
+
+
+def save_manifest(manifest: Dict):
+    tmp = MANIFEST_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def plan(models: Dict[str, Path], manifest: Dict, force: bool = False) -> List[str]:
+    """Services whose model file changed since the last run (mtime/size, confirmed by sha256)."""
+    todo = []
+    for service, path in models.items():
+        st = path.stat()
+        entry = manifest["services"].get(service)
+        output_ok = (OUTPUT_DIR / f"{service}.jsonl").exists()
+        if force or not entry or not output_ok or entry.get("path") != str(path):
+            todo.append(service)
+            continue
+        if entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+            continue
+        if _file_sha256(path) == entry.get("sha256"):
+            # touched but identical: just refresh the stat fields
+            entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+            continue
+        todo.append(service)
+    return todo
+
+
+def convert(data_path: Path, workers: Optional[int] = None, force: bool = False) -> Dict:
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    models = collect_service_models(data_path)
+    manifest = load_manifest()
+
+    # services removed from botocore: drop their records
+    for service in set(manifest["services"]) - set(models):
+        (OUTPUT_DIR / f"{service}.jsonl").unlink(missing_ok=True)
+        del manifest["services"][service]
+
+    todo = plan(models, manifest, force)
+    print(f"➡ {len(models)} service models, {len(todo)} to convert")
+
+    converted = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(convert_service, s, str(models[s]), str(OUTPUT_DIR)): s for s in todo}
+        for fut in as_completed(futures):
+            service = futures[fut]
+            try:
+                result = fut.result()
+            except Exception as e:
+                print(f"Failed to process {service}: {e}")
+                continue
+            st = models[service].stat()
+            manifest["services"][service] = {
+                "path": str(models[service]),
+                "mtime_ns": st.st_mtime_ns,
+                "size": st.st_size,
+                "sha256": result["sha256"],
+                "records": result["records"],
+            }
+            converted += 1
+            if converted % 50 == 0:
+                save_manifest(manifest)  # checkpoint long runs
+                print(f"   {converted}/{len(todo)} converted")
+
+    save_manifest(manifest)
+    total = sum(e["records"] for e in manifest["services"].values())
+    return {"services": len(models), "converted": converted, "records": total}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Convert botocore service models into per-operation JSONL records.")
+    parser.add_argument("--data-path", type=Path, default=None, help="botocore data folder (auto-detected)")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="reconvert every service")
+    args = parser.parse_args(argv)
 
-            output_blocks.append(block)
-
-        except Exception as e:
-            print(f"Failed to process {file_path}: {e}")
-
-    return "\n".join(output_blocks)
-
-
-def save_output(text):
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write(text)
-
-    print(f"\n✔ Saved botocore service definitions to:\n{OUTPUT_FILE}\n")
-    print(f"Total size: {len(text) / 1_000_000:.2f} MB")
-
-
-def main():
     print("🔍 Locating botocore data folder...")
-    data_path = get_botocore_data_path()
+    data_path = args.data_path or get_botocore_data_path()
     print(f"📁 Found botocore data at: {data_path}\n")
 
-    print("📂 Collecting JSON files...")
-    json_files = collect_json_files(data_path)
-    print(f"➡ Found {len(json_files)} JSON files\n")
-
-    print("📝 Converting JSON files to text...")
-    text = convert_json_files_to_text(json_files)
-
-    print("💾 Saving output...")
-    save_output(text)
-
-    print("🎉 Conversion completed!")
+    stats = convert(data_path, workers=args.workers, force=args.force)
+    print(f"\n✔ Saved {stats['records']} operation records for {stats['services']} services to:\n{OUTPUT_DIR}")
+    print(f"🎉 Conversion completed! ({stats['converted']} services reconverted)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,341 @@
+"""
+Incremental ingestion of the static knowledge base into Chroma.
+
+    python -m knowledge_base.ingest [--processes 4] [--batch-size 2048] [--rebuild]
+
+Each source is streamed line by line, split into overlapping passages, encoded
+in large batches and upserted into the collection StaticAgent queries.
+
+Passage ids embed the passage's content hash, and a manifest next to the vector
+store records, per source, the file's sha256 and the ids already stored. Reruns
+skip unchanged sources outright, embed only new passages of changed sources and
+delete passages that disappeared; sources no longer listed are dropped entirely.
+The manifest is rewritten atomically after every upserted batch, so an
+interrupted run resumes where it stopped.
+
+The same passages feed a BM25 keyword index (``core.bm25``) saved next to the
+vector store, which StaticAgent uses for exact-term lookups and hybrid ranking.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from core.bm25 import BM25Index
+from knowledge_base.convert import OUTPUT_DIR as BOTOCORE_RECORDS_DIR
+from knowledge_base.loaders.jsonl import iter_jsonl_records
+from knowledge_base.loaders.pdf import iter_pdf_lines
+from knowledge_base.loaders.text import iter_text_lines
+
+ROOT = Path(__file__).resolve().parent
+KB_DIR = ROOT / "knowledge_base"                 # source documents live here
+VECTORSTORE_PATH = KB_DIR / "vectorstore"        # same store StaticAgent opens
+MANIFEST_PATH = VECTORSTORE_PATH / "ingest_manifest.json"
+BM25_PATH = VECTORSTORE_PATH / "bm25_index.npz"
+COLLECTION_NAME = "aws_static_docs"
+
+# Chunking defaults: MiniLM truncates at 256 word pieces (~1000 characters of English)
+MIN_CHARS = 500
+MAX_CHARS = 1000
+OVERLAP_CHARS = 150
+# A line whose crc32 is divisible by this ends a chunk early (content-defined boundary),
+# so an edit near the top of a file doesn't shift every later chunk boundary.
+BOUNDARY_MODULUS = 8
+
+
+@dataclass
+class Chunk:
+    id: str
+    source: str
+    index: int
+    text: str
+
+
+@dataclass
+class Source:
+    name: str
+    path: Path
+    reader: Callable[[Path], Iterable[str]]
+
+
+# -------------------------
+# Chunking
+# -------------------------
+def _pieces(lines: Iterable[str], max_chars: int) -> Iterator[str]:
+    for line in lines:
+        while len(line) > max_chars:
+            yield line[:max_chars]
+            line = line[max_chars:]
+        if line:
+            yield line
+
+
+def _is_boundary(piece: str) -> bool:
+    if not piece.strip():
+        return True  # blank line: paragraph end
+    return zlib.crc32(piece.encode("utf-8")) % BOUNDARY_MODULUS == 0
+
+
+def chunk_lines(lines: Iterable[str], source: str, min_chars: int = MIN_CHARS,
+                max_chars: int = MAX_CHARS, overlap: int = OVERLAP_CHARS) -> Iterator[Chunk]:
+    """Split a stream of lines into overlapping passages without materialising the source."""
+    buf: List[str] = []
+    size = 0
+    carry = ""
+    index = 0
+    seen: Set[str] = set()
+
+    def make() -> Optional[Chunk]:
+        nonlocal buf, size, carry, index
+        body = "".join(buf)
+        text = (carry + body).strip()
+        # overlap: tail of this passage, starting at a word boundary
+        tail = body[-overlap:] if overlap else ""
+        cut = tail.find(" ")
+        carry = tail[cut + 1:] if 0 <= cut < len(tail) - 1 else tail
+        buf, size = [], 0
+        if not text:
+            return None
+        chunk_id = f"{source}:{hashlib.sha1(text.encode('utf-8')).hexdigest()[:20]}"
+        if chunk_id in seen:
+            return None  # identical passage already emitted for this source
+        seen.add(chunk_id)
+        chunk = Chunk(id=chunk_id, source=source, index=index, text=text)
+        index += 1
+        return chunk
+
+    for piece in _pieces(lines, max_chars):
+        buf.append(piece)
+        size += len(piece)
+        if size >= max_chars or (size >= min_chars and _is_boundary(piece)):
+            chunk = make()
+            if chunk:
+                yield chunk
+    if buf:
+        chunk = make()
+        if chunk:
+            yield chunk
+
+
+# -------------------------
+# Manifest
+# -------------------------
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Manifest:
+    """{"version": 1, "sources": {name: {"sha256", "params", "complete", "chunks": [ids]}}}"""
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = path
+        self.data = {"version": 1, "sources": {}}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    @property
+    def sources(self) -> Dict[str, Dict]:
+        return self.data["sources"]
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+# -------------------------
+# Encoding
+# -------------------------
+class BatchEncoder:
+    """Encodes passages with the shared embedder, optionally across a multi-process pool."""
+
+    def __init__(self, processes: int = 1):
+        from core.embeddings import get_embedder
+        self.embedder = get_embedder()
+        self.pool = None
+        if processes > 1 and self.embedder.backend != "torch":
+            # ONNX Runtime already spreads one batch across all cores
+            print(f"⚠  --processes ignored with the {self.embedder.backend} backend")
+        elif processes > 1:
+            self.pool = self.embedder.model.start_multi_process_pool(target_devices=["cpu"] * processes)
+
+    def encode(self, texts: List[str]):
+        if self.pool is not None:
+            return self.embedder.model.encode_multi_process(texts, self.pool, batch_size=64)
+        return self.embedder.encode(texts, batch_size=64)
+
+    def close(self):
+        if self.pool is not None:
+            self.embedder.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+def ingest_source(src: Source, collection, encoder: BatchEncoder, manifest: Manifest,
+                  keywords: BM25Index, batch_size: int, params: Dict, rebuild: bool = False) -> Dict:
+    started = time.time()
+    digest = file_sha256(src.path)
+    entry = manifest.sources.get(src.name)
+    if (entry and not rebuild and entry.get("complete") and entry.get("sha256") == digest
+            and entry.get("params") == params and keywords.has_source(src.name)):
+        print(f"⏭  {src.name}: unchanged, skipped")
+        return {"source": src.name, "skipped": True}
+
+    # ids already in the collection for this source (previous run, or a crashed partial run)
+    stored: Set[str] = set(entry.get("chunks", [])) if entry else set()
+    skip = set() if rebuild else stored
+    entry = {"sha256": digest, "params": params, "complete": False, "chunks": sorted(stored)}
+    manifest.sources[src.name] = entry
+
+    current: Set[str] = set()
+    passages: List[tuple] = []  # (id, text) for the keyword index, embedded or not
+    pending: List[Chunk] = []
+    embedded = 0
+
+    def flush():
+        nonlocal pending, embedded
+        if not pending:
+            return
+        vectors = encoder.encode([c.text for c in pending])
+        collection.upsert(
+            ids=[c.id for c in pending],
+            documents=[c.text for c in pending],
+            embeddings=[v.tolist() for v in vectors],
+            metadatas=[{"source": c.source, "chunk": c.index} for c in pending],
+        )
+        stored.update(c.id for c in pending)
+        entry["chunks"] = sorted(stored)
+        manifest.save()  # checkpoint: a crash after this point doesn't redo this batch
+        embedded += len(pending)
+        pending = []
+
+    for chunk in chunk_lines(src.reader(src.path), src.name, params["min_chars"],
+                             params["max_chars"], params["overlap"]):
+        current.add(chunk.id)
+        passages.append((chunk.id, chunk.text))
+        if chunk.id in skip:
+            continue
+        pending.append(chunk)
+        if len(pending) >= batch_size:
+            flush()
+            print(f"   {src.name}: {embedded} passages embedded")
+    flush()
+
+    stale = sorted(stored - current)
+    for i in range(0, len(stale), 5000):
+        collection.delete(ids=stale[i:i + 5000])
+
+    keywords.replace_source(src.name, passages)
+    entry["chunks"] = sorted(current)
+    entry["complete"] = True
+    manifest.save()
+
+    stats = {"source": src.name, "passages": len(current), "embedded": embedded,
+             "deleted": len(stale), "seconds": round(time.time() - started, 1)}
+    print(f"✔ {src.name}: {stats}")
+    return stats
+
+
+def prune_sources(keep: Iterable[str], collection, manifest: Manifest, keywords: BM25Index) -> List[str]:
+    """Drop every source no longer listed (e.g. the legacy dump once botocore records exist)."""
+    keep = set(keep)
+    gone = sorted((set(manifest.sources) | set(keywords.sources)) - keep)
+    for name in gone:
+        ids = manifest.sources.get(name, {}).get("chunks", [])
+        for i in range(0, len(ids), 5000):
+            collection.delete(ids=ids[i:i + 5000])
+        keywords.replace_source(name, [])
+        manifest.sources.pop(name, None)
+        manifest.save()
+        print(f"🗑  {name}: no longer a source, {len(ids)} passages removed")
+    return gone
+
+
+def _find(name: str) -> Optional[Path]:
+    for base in (KB_DIR, ROOT):
+        path = base / name
+        if path.exists():
+            return path
+    return None
+
+
+def default_sources() -> List[Source]:
+    sources = []
+    # per-operation records from knowledge_base.convert, one source per service
+    records = sorted(BOTOCORE_RECORDS_DIR.glob("*.jsonl")) if BOTOCORE_RECORDS_DIR.exists() else []
+    for path in records:
+        sources.append(Source(name=f"botocore/{path.stem}", path=path, reader=iter_jsonl_records))
+
+    candidates = [
+        ("aws_cli.txt", iter_text_lines),
+        ("CIS_benchmark.pdf", iter_pdf_lines),
+    ]
+    if not records:
+        # legacy single-file dump (pre-JSONL converter)
+        candidates.insert(0, ("botocore_services.txt", iter_text_lines))
+    for name, reader in candidates:
+        path = _find(name)
+        if path is None:
+            print(f"⚠  {name} not found, skipping")
+            continue
+        sources.append(Source(name=name, path=path, reader=reader))
+    return sources
+
+
+def run(sources: List[Source], batch_size: int = 512, processes: int = 1, rebuild: bool = False,
+        min_chars: int = MIN_CHARS, max_chars: int = MAX_CHARS, overlap: int = OVERLAP_CHARS) -> List[Dict]:
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(VECTORSTORE_PATH))
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    manifest = Manifest()
+    keywords = BM25Index.load(BM25_PATH) if BM25_PATH.exists() and not rebuild else BM25Index()
+    params = {"min_chars": min_chars, "max_chars": max_chars, "overlap": overlap}
+
+    encoder = BatchEncoder(processes=processes)
+    try:
+        results = [ingest_source(src, collection, encoder, manifest, keywords, batch_size, params, rebuild)
+                   for src in sources]
+        prune_sources((src.name for src in sources), collection, manifest, keywords)
+    finally:
+        encoder.close()
+        # sources finished before an interruption keep their keyword entries
+        keywords.save(BM25_PATH)
+
+    print(f"Collection '{COLLECTION_NAME}' now holds {collection.count()} passages")
+    print(f"BM25 index: {len(keywords)} passages, {len(keywords.vocab)} terms -> {BM25_PATH}")
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Incrementally ingest knowledge-base sources into Chroma.")
+    parser.add_argument("--batch-size", type=int, default=512, help="passages per encode/upsert batch")
+    parser.add_argument("--processes", type=int, default=1, help="encoder processes (multi-process pool if > 1)")
+    parser.add_argument("--min-chars", type=int, default=MIN_CHARS)
+    parser.add_argument("--max-chars", type=int, default=MAX_CHARS)
+    parser.add_argument("--overlap", type=int, default=OVERLAP_CHARS)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the manifest and re-embed everything")
+    args = parser.parse_args(argv)
+
+    run(default_sources(), batch_size=args.batch_size, processes=args.processes, rebuild=args.rebuild,
+        min_chars=args.min_chars, max_chars=args.max_chars, overlap=args.overlap)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,65 +1,35 @@
-import os
-import chromadb
-from dotenv import load_dotenv
-from llama_parse import LlamaParse
-from sentence_transformers import SentenceTransformer
-
-load_dotenv()
-
-# ==== CONFIG ====
-DATA_PATH = "../knowledge_base/"
-CHROMA_DB_PATH = "../knowledge_base/vectorstore"
-COLLECTION_NAME = "aws_static_docs"
-VECTORSTORE_PATH = os.path.abspath("knowledge_base/data/vectorstore")  # relative to root
-
-# ==== INIT CHROMA ====
-client = chromadb.PersistentClient(path=VECTORSTORE_PATH)
-collection = client.get_or_create_collection(name=COLLECTION_NAME)
-
-# ==== EMBEDDING MODEL ====
-embed_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-
-def embed(text):
-    return embed_model.encode(text).tolist()
-
-# ==== LOAD RAW TXT DATA ====
-def load_text_file(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
-
-botocore_text = load_text_file(DATA_PATH + "botocore_services.txt")
-aws_cli_docs = load_text_file(DATA_PATH + "aws_cli.txt")
-
-# ==== USE LLAMAPARSE FOR PDF FILES ====
-parser = LlamaParse(api_key=os.getenv("LLAMA_CLOUD_KEY"))
-
-cis_docs = parser.load_data(DATA_PATH + "CIS_benchmark.pdf")
-
-# Convert nodes → plain text
-
-aws_cli_texts = [aws_cli_docs]  # wrap in list because it's one document
-cis_texts = [doc.text for doc in cis_docs]
-
-# Combine all
-all_docs = [botocore_text] + aws_cli_texts + cis_texts
-
-print("Total docs:", len(all_docs))
-
-# ==== INSERT INTO CHROMA ====
-ids = []
-docs = []
-embeds = []
-
-for i, chunk in enumerate(all_docs):
-    ids.append(f"doc_{i}")
-    docs.append(chunk)
-    embeds.append(embed(chunk))
-
-collection.add(
-    ids=ids,
-    documents=docs,
-    embeddings=embeds
-)
-
-print(f"Added {len(ids)} documents to Chroma collection '{COLLECTION_NAME}'")
+"""
+JSONL record loader, and the knowledge-base loader entry point.
+
+    python -m knowledge_base.loaders.jsonl
+
+The chunked, batched and incremental pipeline lives in knowledge_base/ingest.py.
+"""
+import json
+from pathlib import Path
+from typing import Iterator
+
+
+def iter_jsonl_records(path: Path, text_field: str = "text") -> Iterator[str]:
+    """
+    Stream the text of each record in a JSONL file (e.g. knowledge_base.convert output).
+    Records are separated by a blank line so passages break on record boundaries.
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            text = record.get(text_field) if isinstance(record, dict) else None
+            if text:
+                yield text + "\n"
+                yield "\n"
+
+
+if __name__ == "__main__":
+    from knowledge_base.ingest import main
+    main()
@@ -0,0 +1,17 @@
+import os
+from pathlib import Path
+from typing import Iterator
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def iter_pdf_lines(path: Path) -> Iterator[str]:
+    """Parse a PDF with LlamaParse and stream its text line by line."""
+    from llama_parse import LlamaParse
+
+    parser = LlamaParse(api_key=os.getenv("LLAMA_CLOUD_KEY"))
+    for doc in parser.load_data(str(path)):
+        for line in doc.text.splitlines(keepends=True):
+            yield line
+        yield "\n"
@@ -0,0 +1,9 @@
+from pathlib import Path
+from typing import Iterator
+
+
+def iter_text_lines(path: Path, block_size: int = 1 << 20) -> Iterator[str]:
+    """Stream a text file line by line (keeps line endings) without loading it whole."""
+    with open(path, "r", encoding="utf-8", errors="ignore", buffering=block_size) as f:
+        for line in f:
+            yield line
@@ -0,0 +1,293 @@
+# llm/client.py
+"""
+Shared, long-lived async LLM client.
+
+Every component that talks to Gemini (agent classification, fusion, summaries)
+goes through one process-wide client returned by ``get_llm_client()`` so that:
+
+- the SDK is configured once and model handles / HTTP connections are reused,
+- calls are truly async and never block the event loop,
+- the number of in-flight calls is bounded, and callers beyond the waiting
+  queue are rejected immediately instead of piling up (backpressure).
+
+The backend is selected with ``LLM_BACKEND``:
+    gemini (default)  google-generativeai SDK
+    http              Gemini REST protocol over a pooled httpx client; point
+                      ``LLM_BASE_URL`` at a local stub server for testing.
+"""
+import os
+import json
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Optional
+from dotenv import load_dotenv
+from utils.logger import logger
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash-lite")
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when too many calls are already waiting for a free LLM slot."""
+
+
+def _api_key() -> Optional[str]:
+    return os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+
+
+# -------------------------
+# Backends
+# -------------------------
+class GeminiBackend:
+    """google-generativeai SDK; one configure() and one model handle per model name."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        import google.generativeai as genai
+        api_key = api_key or _api_key()
+        if not api_key:
+            raise ValueError("Missing GEMINI_API_KEY (or GOOGLE_API_KEY) in .env")
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self._models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, name: str):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._genai.GenerativeModel(name)
+                    self._models[name] = model
+        return model
+
+    async def generate(self, prompt: str, model: str) -> str:
+        response = await self._model(model).generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        response = await self._model(model).generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+    def generate_sync(self, prompt: str, model: str) -> str:
+        return self._model(model).generate_content(prompt).text
+
+    async def aclose(self):
+        pass
+
+
+class HTTPBackend:
+    """
+    Speaks the Gemini REST protocol (``/v1beta/models/{model}:generateContent``)
+    through pooled keep-alive connections. Works against the real API or any
+    local stub that implements the same route.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 max_connections: int = 20, timeout: float = 60.0):
+        import httpx
+        self.base_url = (base_url or os.getenv("LLM_BASE_URL")
+                         or "https://generativelanguage.googleapis.com").rstrip("/")
+        headers = {"Content-Type": "application/json"}
+        api_key = api_key or _api_key()
+        if api_key:
+            headers["x-goog-api-key"] = api_key
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections)
+        self._client = httpx.AsyncClient(base_url=self.base_url, headers=headers,
+                                         limits=limits, timeout=timeout)
+        self._sync_client = httpx.Client(base_url=self.base_url, headers=headers,
+                                         limits=limits, timeout=timeout)
+
+    @staticmethod
+    def _body(prompt: str) -> Dict:
+        return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+    @staticmethod
+    def _text(payload: Dict) -> str:
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(p.get("text", "") for p in parts)
+
+    async def generate(self, prompt: str, model: str) -> str:
+        resp = await self._client.post(f"/v1beta/models/{model}:generateContent", json=self._body(prompt))
+        resp.raise_for_status()
+        return self._text(resp.json())
+
+    async def stream(self, prompt: str, model: str) -> AsyncIterator[str]:
+        url = f"/v1beta/models/{model}:streamGenerateContent"
+        async with self._client.stream("POST", url, params={"alt": "sse"}, json=self._body(prompt)) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                text = self._text(json.loads(line[len("data:"):]))
+                if text:
+                    yield text
+
+    def generate_sync(self, prompt: str, model: str) -> str:
+        resp = self._sync_client.post(f"/v1beta/models/{model}:generateContent", json=self._body(prompt))
+        resp.raise_for_status()
+        return self._text(resp.json())
+
+    async def aclose(self):
+        await self._client.aclose()
+        self._sync_client.close()
+
+
+def _backend_from_env():
+    kind = os.getenv("LLM_BACKEND", "gemini").lower()
+    if kind == "http":
+        return HTTPBackend(max_connections=int(os.getenv("LLM_MAX_CONCURRENCY", "8")) * 2)
+    return GeminiBackend()
+
+
+# -------------------------
+# Client
+# -------------------------
+class AsyncLLMClient:
+    """
+    Concurrency-limited front for an LLM backend.
+
+    max_concurrency  calls allowed in flight at once
+    max_pending      calls allowed to wait for a slot; beyond that LLMOverloadedError
+    acquire_timeout  seconds a caller may wait for a slot before LLMOverloadedError
+    request_timeout  seconds a single backend call may take
+    """
+
+    def __init__(self, backend=None, max_concurrency: Optional[int] = None,
+                 max_pending: Optional[int] = None, acquire_timeout: Optional[float] = None,
+                 request_timeout: Optional[float] = None, default_model: str = DEFAULT_MODEL):
+        self.backend = backend if backend is not None else _backend_from_env()
+        self.default_model = default_model
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv("LLM_MAX_PENDING", "64"))
+        self.acquire_timeout = acquire_timeout or float(os.getenv("LLM_ACQUIRE_TIMEOUT", "10"))
+        self.request_timeout = request_timeout or float(os.getenv("LLM_REQUEST_TIMEOUT", "30"))
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._sync_semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._pending = 0
+        self._in_flight = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+
+    @asynccontextmanager
+    async def _slot(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise LLMOverloadedError(f"{self._pending} LLM calls already waiting")
+            self._pending += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.acquire_timeout)
+            except asyncio.TimeoutError:
+                self._rejected += 1
+                raise LLMOverloadedError(f"No LLM slot free within {self.acquire_timeout}s")
+            finally:
+                self._pending -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    @contextmanager
+    def _sync_slot(self):
+        if not self._sync_semaphore.acquire(timeout=self.acquire_timeout):
+            self._rejected += 1
+            raise LLMOverloadedError(f"No LLM slot free within {self.acquire_timeout}s")
+        try:
+            yield
+        finally:
+            self._sync_semaphore.release()
+
+    async def generate(self, prompt: str, model: Optional[str] = None) -> str:
+        """Generate a completion without blocking the event loop."""
+        async with self._slot():
+            try:
+                text = await asyncio.wait_for(
+                    self.backend.generate(prompt, model or self.default_model),
+                    timeout=self.request_timeout,
+                )
+            except Exception:
+                self._failed += 1
+                raise
+            self._completed += 1
+            return text
+
+    async def stream(self, prompt: str, model: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield text chunks as the model produces them; the slot is held until the stream ends."""
+        async with self._slot():
+            chunks = self.backend.stream(prompt, model or self.default_model).__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.request_timeout)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            except Exception:
+                self._failed += 1
+                raise
+            finally:
+                await chunks.aclose()
+            self._completed += 1
+
+    def generate_sync(self, prompt: str, model: Optional[str] = None) -> str:
+        """Blocking variant for callers running off the event loop (scripts, worker threads)."""
+        with self._sync_slot():
+            try:
+                text = self.backend.generate_sync(prompt, model or self.default_model)
+            except Exception:
+                self._failed += 1
+                raise
+            self._completed += 1
+            return text
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "pending": self._pending,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+
+_client: Optional[AsyncLLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> AsyncLLMClient:
+    """Return the process-wide LLM client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AsyncLLMClient()
+                logger.info(f"LLM client ready: {type(_client.backend).__name__}, "
+                            f"max_concurrency={_client.max_concurrency}")
+    return _client
+
+
+def set_llm_client(client: Optional[AsyncLLMClient]):
+    """Swap the shared client (e.g. for a stub backend). ``None`` resets to lazy default."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -22,3 +22,6 @@ class LangChainGemini(BaseModel):
 
     async def classify_agents(self, message: str, registry_summary: str) -> list[str]:
         return await self.llm_manager.classify_agents(message, registry_summary)
+
+    async def classify_agents_batch(self, messages: List[str], registry_summary: str) -> list[list[str]]:
+        return await self.llm_manager.classify_agents_batch(messages, registry_summary)
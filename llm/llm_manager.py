@@ -1,20 +1,21 @@
-import os
+import asyncio
 import json
+import os
 import re
-import google.generativeai as genai
-from dotenv import load_dotenv
+from typing import Dict, List
+from llm.client import get_llm_client
+from llm.routing_cache import RoutingCache, get_routing_cache
 from utils.logger import logger
 
-load_dotenv()
-
 class LLMManager:
-    def __init__(self, provider="gemini-2.5-flash-lite"):
+    def __init__(self, provider="gemini-2.5-flash-lite", client=None, routing_cache=None):
         self.provider = provider
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("Missing GEMINI_API_KEY in .env")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(provider)
+        # Shared, pooled async client (configured once per process)
+        self.client = client or get_llm_client()
+        # Shared routing cache (exact + semantic) in front of classification
+        self.routing_cache = routing_cache if routing_cache is not None else get_routing_cache()
+        # Requests classified per batched prompt (larger batches are split and sent concurrently)
+        self.batch_size = int(os.getenv("CLASSIFY_BATCH_SIZE", "25"))
 
         # 🧠 Simple in-memory context
         self.context_memory = []
@@ -38,9 +39,19 @@ class LLMManager:
         Uses Gemini API to classify a user prompt and return multiple agent names.
         Includes short-term conversational memory.
         """
+        # ⚡ Repeated / near-duplicate questions skip the LLM round trip
+        probe = None
+        if self.routing_cache is not None:
+            cached, probe = await self.routing_cache.alookup(message, registry_summary)
+            if cached is not None:
+                logger.info(f"Routing cache hit: {cached}")
+                self._update_context("user", message)
+                self._update_context("assistant", f"Agents selected: {cached}")
+                return cached
+
         # 🧠 Build prompt with memory
         contextual_message = self._build_context_prompt(message)
-        print("memory",contextual_message)
+        logger.debug(f"Classification context: {contextual_message}")
         prompt = (
             "You are an orchestrator assistant that selects relevant agents.\n"
             "Given the conversation context, user request, and list of available agents with capabilities, "
@@ -52,33 +63,92 @@ class LLMManager:
         )
 
         try:
-            response = self.model.generate_content(prompt)
-            raw = response.candidates[0].content.parts[0].text.strip()
-            print("Raw output:", raw)
+            raw = (await self.client.generate(prompt, model=self.provider)).strip()
             logger.debug(f"Gemini raw output: {raw}")
             cleaned = re.sub(r"^```(json)?\s*|\s*```$", "", raw, flags=re.IGNORECASE).strip()
 
             try:
                 parsed = json.loads(cleaned)
-                if isinstance(parsed, list):
-                    # 🧠 Save this turn to memory
-                    self._update_context("user", message)
-                    self._update_context("assistant", f"Agents selected: {parsed}")
-                    print("Parsed:", parsed)
-                    return parsed
-                else:
-                    logger.warning("Gemini returned non-list structure.")
-                    return []
             except json.JSONDecodeError as e:
-                logger.error(f"JSON parsing failed: {e}")
-                return []
+                # the array may be wrapped in prose: retry on the first [...] span
+                start, end = raw.find("["), raw.find("]") + 1
+                if start == -1 or end <= start:
+                    logger.error(f"JSON parsing failed: {e}")
+                    return []
+                parsed = json.loads(raw[start:end])
 
-            start, end = raw.find("["), raw.find("]") + 1
-            if start != -1 and end != -1:
-                arr = json.loads(raw[start:end])
-                return arr if isinstance(arr, list) else []
+            if not isinstance(parsed, list):
+                logger.warning("Gemini returned non-list structure.")
+                return []
+            # 🧠 Save this turn to memory
+            self._update_context("user", message)
+            self._update_context("assistant", f"Agents selected: {parsed}")
+            if probe is not None:
+                self.routing_cache.store(probe, parsed)
+            logger.debug(f"Gemini selected: {parsed}")
+            return parsed
 
         except Exception as e:
             logger.error(f"Gemini classification error: {e}")
 
         return []
+
+    async def classify_agents_batch(self, messages: List[str], registry_summary: str) -> List[List[str]]:
+        """
+        Classify many independent requests, one agent-name list per message in input order.
+        Routing-cache hits skip the LLM, identical (normalized) messages are classified once,
+        and the remaining ones go out together in one prompt per ``batch_size`` requests.
+        Batch requests don't share a conversation, so memory is neither used nor updated.
+        """
+        unique: Dict[str, str] = {}
+        for message in messages:
+            unique.setdefault(RoutingCache.normalize(message), message)
+
+        results: Dict[str, List[str]] = {}
+        probes = {}
+        if self.routing_cache is not None:
+            lookups = await asyncio.gather(*(self.routing_cache.alookup(m, registry_summary) for m in unique.values()))
+            for key, (cached, probe) in zip(unique, lookups):
+                if cached is not None:
+                    results[key] = cached
+                else:
+                    probes[key] = probe
+
+        misses = [key for key in unique if key not in results]
+        chunks = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+        answers = await asyncio.gather(*(self._classify_chunk([unique[k] for k in chunk], registry_summary)
+                                         for chunk in chunks))
+        for chunk, agent_lists in zip(chunks, answers):
+            for key, agents in zip(chunk, agent_lists):
+                results[key] = agents
+                if key in probes:
+                    self.routing_cache.store(probes[key], agents)
+        logger.info(f"Batch classification: {len(messages)} messages, {len(unique)} unique, "
+                    f"{len(misses)} sent to Gemini in {len(chunks)} prompt(s)")
+        return [list(results[RoutingCache.normalize(m)]) for m in messages]
+
+    async def _classify_chunk(self, messages: List[str], registry_summary: str) -> List[List[str]]:
+        numbered = "\n".join(f"{i}. {json.dumps(m)}" for i, m in enumerate(messages, 1))
+        prompt = (
+            "You are an orchestrator assistant that selects relevant agents.\n"
+            "Below is a numbered list of independent user requests and the list of available agents "
+            "with capabilities. For every request, pick the agents that should handle it; "
+            "if multiple agents are needed include all of them.\n"
+            f"Return ONLY a JSON array with exactly {len(messages)} elements, one array of agent names "
+            "per request, in the same order as the requests.\n\n"
+            f"Agents:\n{registry_summary}\n\n"
+            f"Requests:\n{numbered}\n"
+            "Return format example for 2 requests: [[\"monitoring_agent\"], [\"monitoring_agent\", \"cost_agent\"]]"
+        )
+        try:
+            raw = (await self.client.generate(prompt, model=self.provider)).strip()
+            logger.debug(f"Gemini raw batch output: {raw}")
+            cleaned = re.sub(r"^```(json)?\s*|\s*```$", "", raw, flags=re.IGNORECASE).strip()
+            parsed = json.loads(cleaned)
+            if (isinstance(parsed, list) and len(parsed) == len(messages)
+                    and all(isinstance(p, list) for p in parsed)):
+                return [[str(name) for name in p] for p in parsed]
+            logger.warning(f"Gemini batch classification: expected {len(messages)} lists, got {raw[:200]!r}")
+        except Exception as e:
+            logger.error(f"Gemini batch classification error: {e}")
+        return [[] for _ in messages]
@@ -0,0 +1,155 @@
+# llm/routing_cache.py
+"""
+Cache of agent-classification results placed in front of the LLM router.
+
+Entries are keyed on the normalised message plus a hash of the agent registry,
+so changing an agent's name/description invalidates every routing decision made
+against the old registry. On an exact miss the message embedding is compared
+against cached messages (same registry only); a near-duplicate phrasing above
+``similarity_threshold`` reuses that decision.
+"""
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from utils.cache import TTLCache
+from utils.logger import logger
+
+
+@dataclass
+class RoutingProbe:
+    """Lookup state handed back to ``store()`` so the embedding isn't computed twice."""
+    key: Tuple[str, str]
+    vector: Optional[np.ndarray] = None
+
+
+class RoutingCache:
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600,
+                 similarity_threshold: float = 0.92, semantic: bool = True, embedder=None):
+        self._cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.similarity_threshold = similarity_threshold
+        self.semantic = semantic
+        self._embedder = embedder
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # Keys
+    # -------------------------
+    @staticmethod
+    def normalize(message: str) -> str:
+        msg = (message or "").lower().strip()
+        msg = re.sub(r"\s+", " ", msg)
+        return msg.strip(" ?!.,;:")
+
+    @staticmethod
+    def registry_hash(registry_summary: str) -> str:
+        return hashlib.sha1((registry_summary or "").encode("utf-8")).hexdigest()
+
+    def _get_embedder(self):
+        if self._embedder is None:
+            from core.embeddings import get_embedder
+            self._embedder = get_embedder()
+        return self._embedder
+
+    # -------------------------
+    # Lookup / store
+    # -------------------------
+    def _exact(self, message: str, registry_summary: str) -> Tuple[Optional[List[str]], RoutingProbe]:
+        probe = RoutingProbe(key=(self.registry_hash(registry_summary), self.normalize(message)))
+        entry = self._cache.get(probe.key)
+        if entry is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return list(entry[0]), probe
+        return None, probe
+
+    def _semantic(self, probe: RoutingProbe) -> Optional[List[str]]:
+        if probe.vector is not None:
+            reg = probe.key[0]
+            candidates = [(agents, vec) for (entry_reg, _), (agents, vec) in self._cache.items()
+                          if entry_reg == reg and vec is not None]
+            if candidates:
+                # unit vectors: cosine similarity is a single matrix-vector product
+                sims = np.stack([vec for _, vec in candidates]) @ probe.vector
+                idx = int(np.argmax(sims))
+                if sims[idx] >= self.similarity_threshold:
+                    with self._lock:
+                        self.semantic_hits += 1
+                    logger.debug(f"Routing cache semantic hit (cos={sims[idx]:.3f})")
+                    return list(candidates[idx][0])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _semantic_failed(self, e: Exception):
+        logger.warning(f"Routing cache: semantic lookup disabled ({e})")
+        self.semantic = False
+
+    def lookup(self, message: str, registry_summary: str) -> Tuple[Optional[List[str]], RoutingProbe]:
+        """Blocking lookup (may run the embedding model). Prefer ``alookup`` on the event loop."""
+        agents, probe = self._exact(message, registry_summary)
+        if agents is not None:
+            return agents, probe
+        if self.semantic:
+            try:
+                probe.vector = self._get_embedder().embed_vector(probe.key[1])
+            except Exception as e:
+                self._semantic_failed(e)
+        return self._semantic(probe), probe
+
+    async def alookup(self, message: str, registry_summary: str) -> Tuple[Optional[List[str]], RoutingProbe]:
+        """Exact lookup inline; the semantic fallback embeds through the shared micro-batcher."""
+        agents, probe = self._exact(message, registry_summary)
+        if agents is not None:
+            return agents, probe
+        if self.semantic:
+            try:
+                probe.vector = await self._get_embedder().aembed_vector(probe.key[1])
+            except Exception as e:
+                self._semantic_failed(e)
+        return self._semantic(probe), probe
+
+    def store(self, probe: RoutingProbe, agents: List[str]):
+        if not agents:
+            return
+        self._cache.set(probe.key, (list(agents), probe.vector))
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "size": len(self._cache),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": ((self.exact_hits + self.semantic_hits) / total) if total else None,
+            "evictions": self._cache.evictions,
+            "expirations": self._cache.expirations,
+        }
+
+
+_routing_cache: Optional[RoutingCache] = None
+_routing_cache_lock = threading.Lock()
+
+
+def get_routing_cache() -> RoutingCache:
+    global _routing_cache
+    if _routing_cache is None:
+        with _routing_cache_lock:
+            if _routing_cache is None:
+                _routing_cache = RoutingCache(
+                    max_entries=int(os.getenv("ROUTING_CACHE_SIZE", "1024")),
+                    ttl=float(os.getenv("ROUTING_CACHE_TTL", "3600")),
+                    similarity_threshold=float(os.getenv("ROUTING_CACHE_SIMILARITY", "0.92")),
+                    semantic=os.getenv("ROUTING_CACHE_SEMANTIC", "1") == "1",
+                )
+    return _routing_cache
@@ -1,9 +1,20 @@
 # main.py
+import asyncio
+import json
+import os
+from typing import List, Optional
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from core.orchestrator import Orchestrator
 from core.metadata_manager import MetadataManager
 from core.tool_loader import create_tools
+from core.registry import AgentRegistry
+from core.selector import Selector
+from core.executors import get_agent_executor
+from core.embeddings import get_embedder
+from llm.client import get_llm_client
+from llm.routing_cache import get_routing_cache
 from fastapi.middleware.cors import CORSMiddleware
 
 # FastAPI app
@@ -29,11 +40,29 @@ app.add_middleware(
 metadata_manager = MetadataManager("data/agents_registry.json")
 metadata = metadata_manager.list_all()
 
-# 2️⃣ Preload all Tools once at startup
-tools = create_tools(metadata)
+# 2️⃣ One Tool per agent; agents themselves are built on first use or by the warmup below
+agent_registry = AgentRegistry()
+tools = create_tools(metadata, registry=agent_registry)
 
-# 3️⃣ Initialize orchestrator with preloaded Tools
-orc = Orchestrator(tools=tools)
+# 3️⃣ Initialize orchestrator with preloaded Tools and the local-first selector
+orc = Orchestrator(
+    tools=tools,
+    selector=Selector(metadata_manager),
+    agent_timeouts={m.name: m.timeout for m in metadata if m.timeout},
+)
+
+@app.on_event("startup")
+async def start_warmup():
+    # Serve immediately; heavy agents and the local router load in the background
+    if os.getenv("AGENT_WARMUP", "1") == "1":
+        app.state.warmup = asyncio.gather(
+            agent_registry.warmup(),
+            asyncio.to_thread(orc.selector.warmup),
+        )
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    get_agent_executor().shutdown()
 
 # Request model
 class Query(BaseModel):
@@ -44,6 +73,48 @@ class Query(BaseModel):
 async def handle_query(q: Query):
     return await orc.handle_request(q.message)
 
+# Batch endpoint: one routing prompt for all messages, one agent call per unique query,
+# bounded concurrent fusion; results in input order (see Orchestrator.handle_batch).
+# Items answered by an earlier message differing only in case/whitespace carry "deduplicated_from".
+class BatchQuery(BaseModel):
+    messages: List[str]
+    max_concurrency: Optional[int] = None
+
+@app.post("/query/batch")
+async def handle_query_batch(q: BatchQuery):
+    return await orc.handle_batch(q.messages, max_concurrency=q.max_concurrency)
+
+# Streaming endpoint: newline-delimited JSON events (see Orchestrator.stream_request)
+@app.post("/query/stream")
+async def handle_query_stream(q: Query):
+    async def ndjson():
+        async for event in orc.stream_request(q.message):
+            yield json.dumps(event, default=str) + "\n"
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+# Readiness: 503 until every agent and the local router are loaded (probes only read the status code).
+# Per-agent states: cold / warming / warm / failed, or deferred for process-pool agents that each
+# worker builds on its first call. Cold agents are still served, just built on first use.
+@app.get("/ready")
+async def ready():
+    is_ready = agent_registry.all_ready and orc.selector.router_state == "warm"
+    body = {
+        "ready": is_ready,
+        "agents": agent_registry.states(),
+        "router": orc.selector.router_state,
+    }
+    return body if is_ready else JSONResponse(body, status_code=503)
+
+@app.get("/stats")
+async def stats():
+    return {
+        "llm_client": get_llm_client().stats(),
+        "routing_cache": get_routing_cache().stats(),
+        "selector": orc.selector.stats() if orc.selector else None,
+        "fuser": orc.fuser.stats(),
+        "embeddings": get_embedder().stats(),
+    }
+
 # Run FastAPI server
 if __name__ == "__main__":
     import uvicorn
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class AgentMetadata(BaseModel):
@@ -5,3 +6,4 @@ class AgentMetadata(BaseModel):
     module: str
     description: str 
     class_name: str
+    timeout: Optional[float] = None   # per-agent deadline in seconds
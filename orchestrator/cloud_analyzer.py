@@ -1,51 +1,363 @@
-import boto3
+import bisect
+import heapq
 import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.aws import DEFAULT_ENDPOINT, get_client
+from utils.logger import logger
+from utils.timestamps import TimestampParser
 
-ENDPOINT = "http://localhost:4566"
-BUCKET_NAME = "cloud-logs"
+ENDPOINT = os.getenv("CLOUD_LOGS_ENDPOINT", DEFAULT_ENDPOINT)
+BUCKET_NAME = os.getenv("CLOUD_LOGS_BUCKET", "cloud-logs")
+PREFIX = os.getenv("CLOUD_LOGS_PREFIX", "logs/")
+# keep at or below AWS_MAX_POOL_CONNECTIONS (utils.aws) so downloads don't queue for connections
+SYNC_WORKERS = int(os.getenv("CLOUD_LOGS_SYNC_WORKERS", "16"))
+# repeated tool calls within this many seconds reuse the last listing
+SYNC_MAX_AGE = float(os.getenv("CLOUD_LOGS_SYNC_MAX_AGE", "10"))
+CACHE_PATH = os.getenv("CLOUD_LOGS_CACHE", "data/cloud_logs_cache.json")
+
+
+# -------------------------
+# Incremental log sync
+# -------------------------
+class S3LogSync:
+    """
+    Local mirror of the log objects under ``bucket/prefix``.
+
+    A sync pages through list_objects_v2 (no 1000-key cap), then downloads only
+    the keys whose ETag is new or changed, concurrently on a bounded thread pool.
+    Deleted keys are dropped. The {key: (etag, records)} cache is persisted to
+    ``cache_path`` so a restart only fetches what changed meanwhile.
+    """
+
+    def __init__(self, client=None, bucket: str = BUCKET_NAME, prefix: str = PREFIX,
+                 workers: int = SYNC_WORKERS, max_age: float = SYNC_MAX_AGE, cache_path: Optional[str] = CACHE_PATH):
+        self.client = client if client is not None else get_client("s3", endpoint_url=ENDPOINT)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.workers = workers
+        self.max_age = max_age
+        self.cache_path = cache_path
+        self._objects: Dict[str, Tuple[str, List[Dict]]] = {}
+        self._lock = threading.Lock()
+        self._synced_at = 0.0
+        self.last_sync: Dict = {}
+        self._listeners: List[Callable[[Dict[str, List[Dict]], Dict[str, List[Dict]]], None]] = []
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("bucket") == self.bucket and data.get("prefix") == self.prefix:
+            self._objects = {key: (entry["etag"], entry["records"]) for key, entry in data["objects"].items()}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"bucket": self.bucket, "prefix": self.prefix,
+                       "objects": {k: {"etag": etag, "records": recs} for k, (etag, recs) in self._objects.items()}}, f)
+        os.replace(tmp, self.cache_path)
+
+    def _list(self) -> Dict[str, str]:
+        listing = {}
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                listing[obj["Key"]] = obj.get("ETag", "")
+        return listing
+
+    def _fetch(self, key: str) -> Tuple[str, List[Dict]]:
+        obj = self.client.get_object(Bucket=self.bucket, Key=key)
+        data = json.loads(obj["Body"].read().decode("utf-8"))
+        records = data if isinstance(data, list) else [data]
+        return obj.get("ETag", ""), [r for r in records if isinstance(r, dict)]
+
+    def sync(self, force: bool = False) -> Dict:
+        """Bring the mirror up to date; a no-op within ``max_age`` of the last sync unless forced."""
+        with self._lock:
+            if not force and time.monotonic() - self._synced_at < self.max_age:
+                return {**self.last_sync, "skipped": True}
+            listing = self._list()
+            removed = [key for key in self._objects if key not in listing]
+            dropped = {key: self._objects.pop(key)[1] for key in removed}
+            stale = [key for key, etag in listing.items() if key not in self._objects or self._objects[key][0] != etag]
+
+            failed = 0
+            added: Dict[str, List[Dict]] = {}
+            if stale:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(stale))) as pool:
+                    futures = {key: pool.submit(self._fetch, key) for key in stale}
+                for key, future in futures.items():
+                    try:
+                        etag, records = future.result()
+                    except Exception as e:
+                        failed += 1  # retried on the next sync
+                        logger.warning(f"Fetching s3://{self.bucket}/{key} failed: {e}")
+                        continue
+                    if key in self._objects:
+                        dropped[key] = self._objects[key][1]  # overwritten object
+                    self._objects[key] = (etag, records)
+                    added[key] = records
+            if stale or removed:
+                self._save_cache()
+            if dropped or added:
+                for listener in self._listeners:
+                    listener(dropped, added)
+
+            self._synced_at = time.monotonic()
+            self.last_sync = {"listed": len(listing), "fetched": len(stale) - failed,
+                              "removed": len(removed), "failed": failed}
+            return self.last_sync
+
+    def logs(self) -> List[Dict]:
+        self.sync()
+        with self._lock:
+            return [record for _, records in self._objects.values() for record in records]
+
+    def subscribe(self, listener: Callable[[Dict[str, List[Dict]], Dict[str, List[Dict]]], None]):
+        """
+        ``listener(removed, added)`` receives {key: records} after every sync that
+        changed something (an overwritten key appears in both); on subscribing it is
+        handed the current contents as ``added``.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            listener({}, {key: records for key, (_, records) in self._objects.items()})
+
+
+_log_sync: Optional[S3LogSync] = None
+_log_sync_lock = threading.Lock()
+
+
+def get_log_sync() -> S3LogSync:
+    global _log_sync
+    if _log_sync is None:
+        with _log_sync_lock:
+            if _log_sync is None:
+                _log_sync = S3LogSync()
+    return _log_sync
 
-s3 = boto3.client(
-    "s3",
-    endpoint_url=ENDPOINT,
-    aws_access_key_id="test",
-    aws_secret_access_key="test",
-    region_name="us-east-1"
-)
 
 def _get_all_logs():
-    response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix="logs/")
-    logs = []
-    for obj in response.get("Contents", []):
-        log_obj = s3.get_object(Bucket=BUCKET_NAME, Key=obj["Key"])
-        log_data = json.loads(log_obj["Body"].read().decode("utf-8"))
-        logs.append(log_data)
-    return logs
-
-
-def get_average_cpu_usage():
-    """Return average CPU usage."""
-    logs = _get_all_logs()
-    if not logs:
+    return get_log_sync().logs()
+
+
+# -------------------------
+# Materialized aggregates
+# -------------------------
+class CloudLogAggregates:
+    """
+    Aggregates kept up to date from S3LogSync change notifications, so the tools
+    never rescan the logs:
+
+        totals            CPU sum/count overall and per service       -> mean in O(1)
+        buckets           CPU sum/count/max per (hour, service)       -> windowed mean/max in O(hours)
+        per-service max   lazy max-heap of CPU per service            -> O(1) amortised
+        errors            lazy max-heap of ERROR/CRITICAL by time     -> latest in O(1) amortised
+
+    Removed (deleted or overwritten) records are subtracted from the sums at once
+    and dropped from the heaps lazily when they surface (each heap entry carries
+    the serial of the record it was made for); a bucket losing its maximum
+    recomputes it from the records it still holds.
+    """
+
+    ERROR_LEVELS = ("ERROR", "CRITICAL")
+
+    def __init__(self, bucket_seconds: float = 3600.0):
+        self.bucket_seconds = bucket_seconds
+        self._parser = TimestampParser("cloud_logs")
+        self._serial = 0
+        # (object key, index in object) -> (record, ts, serial)
+        self._records: Dict[Tuple[str, int], Tuple[Dict, Optional[float], int]] = {}
+        self._keys: Dict[str, int] = {}  # object key -> number of records it holds
+        self._total = [0.0, 0]
+        self._services: Dict[str, List] = {}  # service -> [sum, count]
+        self._buckets: Dict[float, Dict[str, Dict]] = {}  # hour start -> service -> {sum, count, max, ids}
+        self._starts: List[float] = []  # sorted hour starts present in _buckets
+        self._max_heaps: Dict[str, List] = {}  # service -> [(-cpu, serial, rid)]
+        self._errors: List = []  # [(-ts, serial, rid)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cpu(record: Dict) -> Optional[float]:
+        value = record.get("cpu_usage")
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    @staticmethod
+    def _service(record: Dict) -> str:
+        return str(record.get("service", "unknown"))
+
+    def _hour(self, ts: float) -> float:
+        return math.floor(ts / self.bucket_seconds) * self.bucket_seconds
+
+    def _add(self, rid: Tuple[str, int], record: Dict):
+        ts = self._parser.parse(record.get("timestamp"))
+        self._serial += 1
+        self._records[rid] = (record, ts, self._serial)
+        cpu, service = self._cpu(record), self._service(record)
+        if cpu is not None:
+            self._total[0] += cpu
+            self._total[1] += 1
+            totals = self._services.setdefault(service, [0.0, 0])
+            totals[0] += cpu
+            totals[1] += 1
+            heapq.heappush(self._max_heaps.setdefault(service, []), (-cpu, self._serial, rid))
+            if ts is not None:
+                start = self._hour(ts)
+                if start not in self._buckets:
+                    self._buckets[start] = {}
+                    bisect.insort(self._starts, start)
+                bucket = self._buckets[start].setdefault(service, {"sum": 0.0, "count": 0, "max": -math.inf, "ids": set()})
+                bucket["sum"] += cpu
+                bucket["count"] += 1
+                bucket["max"] = max(bucket["max"], cpu)
+                bucket["ids"].add(rid)
+        if record.get("log_level") in self.ERROR_LEVELS:
+            heapq.heappush(self._errors, (-(ts if ts is not None else -math.inf), self._serial, rid))
+
+    def _remove(self, rid: Tuple[str, int]):
+        record, ts, _ = self._records.pop(rid)
+        cpu, service = self._cpu(record), self._service(record)
+        if cpu is None:
+            return
+        self._total[0] -= cpu
+        self._total[1] -= 1
+        self._services[service][0] -= cpu
+        self._services[service][1] -= 1
+        if ts is None:
+            return
+        start = self._hour(ts)
+        bucket = self._buckets[start][service]
+        bucket["ids"].discard(rid)
+        bucket["sum"] -= cpu
+        bucket["count"] -= 1
+        if not bucket["ids"]:
+            del self._buckets[start][service]
+            if not self._buckets[start]:
+                del self._buckets[start]
+                self._starts.pop(bisect.bisect_left(self._starts, start))
+        elif cpu >= bucket["max"]:
+            bucket["max"] = max(self._cpu(self._records[i][0]) for i in bucket["ids"])
+
+    def apply(self, removed: Dict[str, List[Dict]], added: Dict[str, List[Dict]]):
+        """S3LogSync listener."""
+        with self._lock:
+            for key in removed:
+                for i in range(self._keys.pop(key, 0)):
+                    self._remove((key, i))
+            for key, records in added.items():
+                for i, record in enumerate(records):
+                    self._add((key, i), record)
+                self._keys[key] = len(records)
+
+    def _top(self, heap: List) -> Optional[Tuple]:
+        # lazy deletion: drop entries whose record was removed or replaced since they were pushed
+        while heap:
+            _, serial, rid = heap[0]
+            current = self._records.get(rid)
+            if current is not None and current[2] == serial:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _window(self, window_hours: float):
+        """(service, bucket) pairs for the hours overlapping the last ``window_hours``."""
+        cutoff = self._hour(time.time() - window_hours * 3600.0)
+        for start in self._starts[bisect.bisect_left(self._starts, cutoff):]:
+            yield from self._buckets[start].items()
+
+    def average_cpu(self, window_hours: Optional[float] = None) -> Optional[float]:
+        with self._lock:
+            if window_hours is None:
+                total, count = self._total
+            else:
+                total, count = 0.0, 0
+                for _, bucket in self._window(window_hours):
+                    total += bucket["sum"]
+                    count += bucket["count"]
+            return total / count if count else None
+
+    def latest_error(self, window_hours: Optional[float] = None) -> Optional[Dict]:
+        with self._lock:
+            top = self._top(self._errors)
+            if top is None:
+                return None
+            if window_hours is not None and -top[0] < time.time() - window_hours * 3600.0:
+                return None
+            return self._records[top[2]][0]
+
+    def service_max_cpu(self, window_hours: Optional[float] = None) -> Dict[str, float]:
+        with self._lock:
+            out: Dict[str, float] = {}
+            if window_hours is None:
+                for service, heap in self._max_heaps.items():
+                    top = self._top(heap)
+                    if top is not None:
+                        out[service] = -top[0]
+            else:
+                for service, bucket in self._window(window_hours):
+                    out[service] = max(out.get(service, -math.inf), bucket["max"])
+            return out
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"records": len(self._records), "objects": len(self._keys), "services": len(self._services),
+                    "buckets": sum(len(b) for b in self._buckets.values()), "error_heap": len(self._errors)}
+
+
+_aggregates: Optional[CloudLogAggregates] = None
+_aggregates_lock = threading.Lock()
+
+
+def get_aggregates() -> CloudLogAggregates:
+    """Process-wide aggregates; each call first lets the log sync pick up new objects."""
+    global _aggregates
+    if _aggregates is None:
+        with _aggregates_lock:
+            if _aggregates is None:
+                aggregates = CloudLogAggregates()
+                get_log_sync().subscribe(aggregates.apply)
+                _aggregates = aggregates
+    get_log_sync().sync()
+    return _aggregates
+
+
+def _window_label(window_hours: Optional[float]) -> str:
+    return "" if window_hours is None else f" over the last {window_hours:g}h"
+
+
+def get_average_cpu_usage(window_hours: Optional[float] = None):
+    """Return average CPU usage (optionally over the last ``window_hours``)."""
+    avg_cpu = get_aggregates().average_cpu(window_hours)
+    if avg_cpu is None:
         return "No logs found."
-    avg_cpu = sum(l["cpu_usage"] for l in logs) / len(logs)
-    return f"Average CPU usage: {avg_cpu:.2f}%"
+    return f"Average CPU usage{_window_label(window_hours)}: {avg_cpu:.2f}%"
 
 
-def get_latest_error():
-    """Return the latest error/critical log."""
-    logs = _get_all_logs()
-    errors = [l for l in logs if l["log_level"] in ["ERROR", "CRITICAL"]]
-    if not errors:
+def get_latest_error(window_hours: Optional[float] = None):
+    """Return the latest error/critical log (optionally within the last ``window_hours``)."""
+    latest = get_aggregates().latest_error(window_hours)
+    if latest is None:
         return "No recent errors."
-    latest = max(errors, key=lambda x: x["timestamp"])
     return f"Latest error ({latest['log_level']}): {latest['message']} in {latest['service']}"
 
 
-def get_high_usage_services(threshold=80):
-    """Return services exceeding CPU threshold."""
-    logs = _get_all_logs()
-    high_usage = [l for l in logs if l["cpu_usage"] > threshold]
-    if not high_usage:
+def get_high_usage_services(threshold=80, window_hours: Optional[float] = None):
+    """Return services exceeding CPU threshold (optionally within the last ``window_hours``)."""
+    maxima = get_aggregates().service_max_cpu(window_hours)
+    services = sorted(service for service, peak in maxima.items() if peak > threshold)
+    if not services:
         return f"No services above {threshold}% CPU usage."
-    services = set(l["service"] for l in high_usage)
     return f"High CPU usage detected in: {', '.join(services)}"
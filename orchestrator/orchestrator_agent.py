@@ -3,19 +3,51 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import initialize_agent, AgentType
 from dotenv import load_dotenv
 import os
+import re
+from typing import Optional
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-from orchestrator.cloud_analyzer import get_average_cpu_usage
+from orchestrator.cloud_analyzer import get_average_cpu_usage, get_high_usage_services, get_latest_error
 from tools.metrics_tools import get_cpu_usage, get_instance_status
 from tools.cost_tools import reduce_cost_recommendations, get_cost_summary
 from tools.error_tools import get_current_errors, analyze_error_trend
 
+# The whole tool input must be a duration with an explicit unit: '24h', '30 minutes', 'last 2 weeks',
+# 'past month'. Region or instance strings ('us-east-1', 'i-0abc') are not windows.
+WINDOW_RE = re.compile(
+    r"^(?:(last|past)\s+)?(\d+(?:\.\d+)?)?\s*"
+    r"(m|mins?|minutes?|h|hrs?|hours?|d|days?|w|wks?|weeks?|mo|months?)$",
+    re.I,
+)
+WINDOW_UNIT_HOURS = {"m": 1 / 60, "h": 1, "d": 24, "w": 24 * 7, "mo": 24 * 30}
+
+
+def _window_hours(query: str) -> Optional[float]:
+    """'24h', '30 minutes', 'last 2 weeks', 'past month' -> hours; anything else -> None (all synced logs)."""
+    m = WINDOW_RE.match((query or "").strip().strip("'\"").strip())
+    if not m or (m.group(2) is None and m.group(1) is None):
+        return None
+    unit = m.group(3).lower()
+    unit = "mo" if unit.startswith("mo") else "m" if unit.startswith("mi") or unit == "m" else unit[0]
+    return float(m.group(2) or 1) * WINDOW_UNIT_HOURS[unit]
+
+
 @tool
 def cpu_usage_tool(query: str) -> str:
-    """Fetches the current CPU usage of the instance."""
-    return str(get_average_cpu_usage())
+    """Average CPU usage from the cloud logs. Input: optional time window such as '24h' or '7 days'; empty for all logs."""
+    return str(get_average_cpu_usage(_window_hours(query)))
+
+@tool
+def latest_error_tool(query: str) -> str:
+    """Most recent ERROR/CRITICAL cloud log entry. Input: optional time window such as '6h'; empty for all logs."""
+    return str(get_latest_error(_window_hours(query)))
+
+@tool
+def high_usage_services_tool(query: str) -> str:
+    """Services whose CPU usage exceeded 80%. Input: optional time window such as '24h'; empty for all logs."""
+    return str(get_high_usage_services(window_hours=_window_hours(query)))
 
 @tool
 def instance_status_tool(query: str) -> str:
@@ -44,6 +76,8 @@ def error_trend_tool(query: str) -> str:
 
 tools = [
     cpu_usage_tool,
+    latest_error_tool,
+    high_usage_services_tool,
     instance_status_tool,
     cost_tool,
     cost_summary_tool,
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the repo has no package metadata: make the top-level packages (core, utils, llm, ...) importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+import json
+from core.alert_store import AlertStore, read_legacy
+
+
+def _alert(minute, message="CPU high", metric="CPU_Usage", **extra):
+    return {"type": "metric_anomaly", "metric": metric, "message": message,
+            "timestamp": f"2025-01-01T00:{minute:02d}:00+00:00", **extra}
+
+
+def test_duplicates_are_suppressed_within_and_across_batches(tmp_path):
+    path = tmp_path / "alerts.jsonl"
+    store = AlertStore(str(path))
+
+    assert store.add([_alert(1), _alert(1), _alert(2)]) == 2
+    assert store.add([_alert(2), _alert(3)]) == 1
+    # same instant written in another timestamp format is the same alert
+    assert store.add([{**_alert(3), "timestamp": "2025-01-01T00:03:00Z"}]) == 0
+    # anything in the fingerprint differing makes it a new alert
+    assert store.add([_alert(3, message="CPU very high"), _alert(3, metric="Memory_Usage")]) == 2
+
+    assert len(store) == 5
+    assert store.stats()["duplicates_dropped"] == 3
+    assert len(path.read_text().splitlines()) == 5
+
+
+def test_store_reloads_and_refreshes_from_the_file(tmp_path):
+    path = tmp_path / "alerts.jsonl"
+    AlertStore(str(path)).add([_alert(5), _alert(1)])
+
+    store = AlertStore(str(path))
+    assert len(store) == 2
+    assert store.add([_alert(1)]) == 0
+
+    # another process appends, including a line we already hold
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(_alert(3)) + "\n" + json.dumps(_alert(5)) + "\nnot json\n")
+    assert store.refresh() == 1
+    start, end = 1735689600.0, 1735689600.0 + 4 * 60
+    assert [a["timestamp"] for a in store.range(start, end)] == [_alert(1)["timestamp"], _alert(3)["timestamp"]]
+
+
+def test_alerts_without_a_timestamp_are_ignored(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.jsonl"))
+    assert store.add([{"type": "x", "message": "no time"}, {**_alert(1), "timestamp": "garbage"}]) == 0
+    assert len(store) == 0
+
+
+def test_read_legacy_flattens_arrays_and_reads_jsonl(tmp_path):
+    nested = tmp_path / "alerts.json"
+    nested.write_text(json.dumps([_alert(1), [_alert(2), [_alert(3)]], "junk"]))
+    assert [a["timestamp"][14:16] for a in read_legacy(str(nested))] == ["01", "02", "03"]
+
+    lines = tmp_path / "alerts.jsonl"
+    lines.write_text(json.dumps(_alert(4)) + "\n{broken\n" + json.dumps(_alert(5)) + "\n")
+    assert len(read_legacy(str(lines))) == 2
+    assert read_legacy(str(tmp_path / "missing.json")) == []
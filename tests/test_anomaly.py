@@ -0,0 +1,111 @@
+import json
+import random
+import numpy as np
+import pytest
+from core.anomaly import AnomalyDetector, _Ewma, _Welford
+
+BASE = 1_735_689_600.0
+
+
+def _points(values, metric="CPU_Usage", start=0):
+    return [(BASE + 60 * (start + i), {"timestamp": "t", metric: v}) for i, v in enumerate(values)]
+
+
+def test_welford_matches_numpy_and_block_warm_matches_streaming():
+    rng = np.random.default_rng(0)
+    values = rng.normal(50, 7, 5000)
+
+    streamed = _Welford()
+    for x in values:
+        streamed.update(float(x))
+    assert streamed.mean == pytest.approx(values.mean())
+    assert streamed.std == pytest.approx(values.std())
+
+    blocks = _Welford()
+    for chunk in np.array_split(values, 7):
+        blocks.warm(chunk)
+    assert blocks.n == 5000
+    assert blocks.mean == pytest.approx(streamed.mean)
+    assert blocks.std == pytest.approx(streamed.std)
+
+
+def test_ewma_tracks_a_level_shift_and_warm_replays_the_tail():
+    ewma = _Ewma(alpha=0.2)
+    for _ in range(100):
+        ewma.update(10.0)
+    assert ewma.mean == pytest.approx(10.0) and ewma.std == pytest.approx(0.0)
+    for _ in range(100):
+        ewma.update(20.0)
+    assert ewma.mean == pytest.approx(20.0, abs=1e-6)
+
+    values = np.random.default_rng(1).normal(5, 1, 2000)
+    streamed, warmed = _Ewma(0.2), _Ewma(0.2)
+    for x in values:
+        streamed.update(float(x))
+    warmed.warm(values)
+    assert warmed.n == streamed.n
+    assert warmed.mean == pytest.approx(streamed.mean, rel=1e-3)
+    assert warmed.std == pytest.approx(streamed.std, rel=1e-2)
+
+
+@pytest.mark.parametrize("method", ["welford", "ewma"])
+def test_detector_flags_outliers_only_after_warmup(method):
+    rng = random.Random(2)
+    # an outlier inside the warmup period is never scored
+    early = AnomalyDetector(method=method, z=3.0, warmup=20)
+    assert early.observe(_points([50 + rng.uniform(-1, 1) for _ in range(10)] + [400.0])) == []
+
+    detector = AnomalyDetector(method=method, z=3.0, warmup=20)
+    normal = [50 + rng.uniform(-1, 1) for _ in range(200)]
+    assert detector.observe(_points(normal)) == []
+
+    alerts = detector.observe(_points([95.0], start=300))
+    assert len(alerts) == 1
+    alert = alerts[0]
+    assert alert["type"] == "metric_anomaly" and alert["metric"] == "CPU_Usage" and alert["detector"] == method
+    assert alert["value"] == 95.0 and alert["zscore"] >= 3.0
+    assert alert["timestamp"].startswith("2025-01-01T05:00:00")
+
+
+def test_per_metric_thresholds_and_non_numeric_fields():
+    detector = AnomalyDetector(method="welford", z=3.0, warmup=5, thresholds={"Memory_Usage": 100.0})
+    history = [(BASE + i, {"CPU_Usage": 50 + (i % 2), "Memory_Usage": 50 + (i % 2), "host": "a", "up": True})
+               for i in range(50)]
+    detector.observe(history)
+
+    alerts = detector.observe([(BASE + 100, {"CPU_Usage": 60, "Memory_Usage": 60})])
+    assert [a["metric"] for a in alerts] == ["CPU_Usage"]
+    assert set(detector.stats()["metrics"]) == {"CPU_Usage", "Memory_Usage"}
+
+
+def test_score_false_only_seeds_state():
+    detector = AnomalyDetector(method="welford", warmup=5)
+    values = [10.0, 11.0] * 20 + [500.0]
+    assert detector.observe(_points(values), score=False) == []
+    assert detector.state["CPU_Usage"].n == len(values)
+    assert detector.flagged == 0
+
+
+def test_monitor_store_does_not_alert_on_history_read_at_startup(tmp_path):
+    from core.monitor_store import MonitorStore
+
+    metrics = tmp_path / "metrics.log"
+    rows = [{"timestamp": f"2025-01-01T00:{i:02d}:00+00:00", "CPU_Usage": 50 + i % 3} for i in range(40)]
+    rows[30]["CPU_Usage"] = 400  # an old spike already in the file
+    metrics.write_text("".join(json.dumps(r) + "\n" for r in rows))
+
+    def open_store():
+        return MonitorStore(log_path=str(tmp_path / "app.log"), metrics_path=str(metrics),
+                            log_alerts_path=str(tmp_path / "log_alerts.jsonl"),
+                            metric_alerts_path=str(tmp_path / "metric_alerts.jsonl"),
+                            segments_dir=str(tmp_path / "segments"))
+
+    store = open_store()
+    assert store.poll()["alerts"] == 0
+    with open(metrics, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": "2025-01-01T00:45:00+00:00", "CPU_Usage": 500}) + "\n")
+    assert store.poll()["alerts"] == 1
+
+    # a restart re-reads the whole file: still history, nothing new to alert on
+    assert open_store().poll()["alerts"] == 0
+    assert len((tmp_path / "metric_alerts.jsonl").read_text().splitlines()) == 1
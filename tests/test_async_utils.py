@@ -0,0 +1,78 @@
+import asyncio
+from utils.async_utils import gather_with_timeout, iter_with_deadline
+
+
+def _after(seconds, value=None, error=None):
+    async def call():
+        await asyncio.sleep(seconds)
+        if error is not None:
+            raise error
+        return value
+    return call
+
+
+def test_gather_keeps_call_order_and_times_out_stragglers():
+    calls = {"slow": _after(1.0, "late"), "fast": _after(0.01, "a"), "mid": _after(0.05, "b")}
+    results = asyncio.run(gather_with_timeout(calls, timeout=0.2))
+
+    assert [r["agent"] for r in results] == ["slow", "fast", "mid"]
+    slow, fast, mid = results
+    assert slow["ok"] is False and slow["timed_out"] is True and slow["data"] == {"error": "timeout"}
+    assert fast["ok"] and fast["data"] == {"message": "a"}
+    assert mid["ok"] and mid["data"] == {"message": "b"}
+    assert slow["elapsed"] < 0.5
+
+
+def test_per_agent_timeouts_override_the_default():
+    calls = {"patient": _after(0.1, "done"), "strict": _after(0.1, "done")}
+    results = asyncio.run(gather_with_timeout(calls, timeout={"patient": 1.0}, default_timeout=0.03))
+
+    assert results[0]["ok"] is True
+    assert results[1]["timed_out"] is True
+
+
+def test_failures_are_reported_not_raised():
+    calls = {"broken": _after(0.0, error=RuntimeError("boom")), "fine": _after(0.0, 1)}
+    broken, fine = asyncio.run(gather_with_timeout(calls, timeout=1.0))
+
+    assert broken["ok"] is False and broken["data"] == {"error": "boom"} and not broken["timed_out"]
+    assert fine["ok"] is True
+
+
+def test_iter_yields_in_completion_order():
+    calls = {"c": _after(0.06, 3), "a": _after(0.01, 1), "b": _after(0.03, 2)}
+
+    async def collect():
+        return [r["agent"] async for r in iter_with_deadline(calls, timeout=1.0)]
+
+    assert asyncio.run(collect()) == ["a", "b", "c"]
+
+
+def test_hedged_attempt_wins_over_a_stuck_first_attempt():
+    attempts = []
+
+    def factory():
+        attempts.append(len(attempts))
+        # the first attempt hangs past the deadline; the hedge answers quickly
+        return _after(10.0 if len(attempts) == 1 else 0.01, f"attempt {len(attempts)}")()
+
+    results = asyncio.run(gather_with_timeout({"agent": factory}, timeout=1.0, hedge_after=0.05))
+
+    assert len(attempts) == 2
+    assert results[0]["ok"] is True
+    assert results[0]["hedged"] is True
+    assert results[0]["data"] == {"message": "attempt 2"}
+    assert results[0]["elapsed"] < 0.5
+
+
+def test_no_hedge_when_the_first_attempt_is_fast():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        return _after(0.01, "ok")()
+
+    results = asyncio.run(gather_with_timeout({"agent": factory}, timeout=1.0, hedge_after=0.2))
+
+    assert attempts == [1]
+    assert results[0]["hedged"] is False
@@ -0,0 +1,55 @@
+from core.bm25 import BM25Index, identifiers, reciprocal_rank_fusion, tokenize
+
+PASSAGES = [
+    ("ec2-describe", "operation DescribeInstances. Describes the specified EC2 instances. CLI: aws ec2 describe-instances"),
+    ("s3-get", "operation GetObject. Retrieves an object from Amazon S3. IAM action s3:GetObject is required."),
+    ("dynamodb", "Amazon DynamoDB pricing is based on read and write capacity and on storage."),
+    ("cloudwatch", "Amazon CloudWatch collects metrics and logs from AWS resources."),
+]
+
+
+def _index():
+    index = BM25Index()
+    index.replace_source("docs", PASSAGES)
+    index.build()
+    return index
+
+
+def test_identifiers_index_under_one_joined_term():
+    assert "describeinstances" in tokenize("describe-instances")
+    assert "describeinstances" in tokenize("DescribeInstances")
+    assert {"s3getobject", "getobject"} <= set(tokenize("s3:GetObject"))
+
+
+def test_only_operation_shaped_tokens_are_exact_terms():
+    assert identifiers("aws ec2 describe-instances --region us-east-1") == [["describeinstances"]]
+    assert identifiers("DescribeInstances paging") == [["describeinstances"]]
+    assert identifiers("s3:GetObject") == [["s3getobject", "getobject"]]
+    assert identifiers("ec2.describe_instances") == [["ec2describeinstances", "describeinstances"]]
+    for prose in ["How does DynamoDB pricing work?", "What is CloudWatch used for?",
+                  "well-architected", "instance i-1234567890 in us-east-1"]:
+        assert identifiers(prose) == []
+
+
+def test_exact_match_for_operations_and_none_for_product_names():
+    index = _index()
+    assert index.exact_match("what does describe-instances return?")[0][0] == "ec2-describe"
+    assert index.exact_match("who needs s3:GetObject")[0][0] == "s3-get"
+    # product names go to the hybrid (dense + BM25) path instead
+    assert index.exact_match("How does DynamoDB pricing work?") is None
+    assert index.exact_match("What is CloudWatch used for?") is None
+    assert index.search("How does DynamoDB pricing work?")[0][0] == "dynamodb"
+
+
+def test_save_load_round_trip(tmp_path):
+    index = _index()
+    path = tmp_path / "bm25.npz"
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.ids == index.ids and loaded.text("s3-get") == PASSAGES[1][1]
+    assert loaded.search("CloudWatch metrics") == index.search("CloudWatch metrics")
+
+
+def test_reciprocal_rank_fusion_prefers_documents_ranked_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])
+    assert fused[0][0] == "b"
@@ -0,0 +1,29 @@
+from core.bm25 import BM25Index
+from knowledge_base.ingest import Manifest, prune_sources
+
+
+class FakeCollection:
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def delete(self, ids):
+        self.ids -= set(ids)
+
+
+def test_unlisted_sources_are_pruned_from_chroma_bm25_and_manifest(tmp_path):
+    manifest = Manifest(tmp_path / "manifest.json")
+    manifest.sources["botocore_services.txt"] = {"complete": True, "chunks": ["legacy-1", "legacy-2"]}
+    manifest.sources["botocore/ec2"] = {"complete": True, "chunks": ["ec2-1"]}
+    keywords = BM25Index()
+    keywords.replace_source("botocore_services.txt", [("legacy-1", "DescribeInstances"), ("legacy-2", "GetObject")])
+    keywords.replace_source("botocore/ec2", [("ec2-1", "operation DescribeInstances.")])
+    keywords.replace_source("orphan.txt", [("orphan-1", "only in the keyword index")])
+    collection = FakeCollection(["legacy-1", "legacy-2", "ec2-1"])
+
+    gone = prune_sources(["botocore/ec2"], collection, manifest, keywords)
+
+    assert gone == ["botocore_services.txt", "orphan.txt"]
+    assert collection.ids == {"ec2-1"}
+    assert keywords.ids == ["ec2-1"]
+    assert list(manifest.sources) == ["botocore/ec2"]
+    assert list(Manifest(tmp_path / "manifest.json").sources) == ["botocore/ec2"]
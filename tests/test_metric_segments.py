@@ -0,0 +1,98 @@
+import json
+import os
+import numpy as np
+from core.metric_segments import STATE_FILE, Segment, SegmentStore, convert, write_segment
+from utils.timestamps import to_datetime
+
+BASE = 1_735_689_600.0  # 2025-01-01T00:00:00Z
+
+
+def _row(i):
+    row = {"timestamp": to_datetime(BASE + 10 * i).isoformat(), "CPU_Usage": round(20 + (i % 50) * 1.5, 1)}
+    if i % 4:
+        row["Memory_Usage"] = i % 64
+    return row
+
+
+def _write_jsonl(path, rows, tail=""):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in rows) + tail)
+
+
+def test_convert_then_read_round_trips_rows(tmp_path):
+    source, segments = tmp_path / "metrics.log", tmp_path / "segments"
+    rows = [_row(i) for i in range(1000)]
+    _write_jsonl(source, rows)
+
+    result = convert(str(source), str(segments), rows_per_segment=300)
+    assert result == {"rows": 1000, "segments_written": 4}
+
+    store = SegmentStore(str(segments))
+    assert len(store) == 1000
+    assert store.rows(-np.inf, np.inf) == rows
+    # window reads bisect to exactly the rows inside, edges included
+    lo, hi = BASE + 10 * 295, BASE + 10 * 605
+    assert store.rows(lo, hi) == rows[295:606]
+    assert store.rows(lo, hi, limit=7) == rows[295:302]
+    store.close()
+
+
+def test_incremental_convert_rewrites_only_the_partial_tail(tmp_path):
+    source, segments = tmp_path / "metrics.log", tmp_path / "segments"
+    _write_jsonl(source, [_row(i) for i in range(250)])
+    convert(str(source), str(segments), rows_per_segment=200)
+    full = sorted(os.listdir(segments))
+    first = min(p for p in full if p.endswith(".mseg"))
+    first_bytes = (segments / first).read_bytes()
+
+    _write_jsonl(source, [_row(i) for i in range(250, 520)])
+    result = convert(str(source), str(segments), rows_per_segment=200)
+
+    assert result["rows"] == 270
+    assert (segments / first).read_bytes() == first_bytes  # full segment untouched
+    store = SegmentStore(str(segments))
+    assert [len(s) for s in store.segments] == [200, 200, 120]
+    assert store.rows(-np.inf, np.inf) == [_row(i) for i in range(520)]
+    store.close()
+
+
+def test_convert_resumes_from_its_offset_and_leaves_partial_lines(tmp_path):
+    source, segments = tmp_path / "metrics.log", tmp_path / "segments"
+    _write_jsonl(source, [_row(i) for i in range(10)], tail='{"timestamp": "2025-01-01T01:00:00+00:00", "CPU')
+    assert convert(str(source), str(segments))["rows"] == 10
+
+    state = json.loads((segments / STATE_FILE).read_text())
+    assert state["offset"] == os.path.getsize(source) - len('{"timestamp": "2025-01-01T01:00:00+00:00", "CPU')
+
+    _write_jsonl(source, [], tail='_Usage": 77}\n')
+    assert convert(str(source), str(segments))["rows"] == 1
+    store = SegmentStore(str(segments))
+    assert store.rows(-np.inf, np.inf)[-1] == {"CPU_Usage": 77, "timestamp": "2025-01-01T01:00:00+00:00"}
+    store.close()
+
+
+def test_convert_truncate_keeps_unconverted_bytes_and_skips_old_rows(tmp_path):
+    source, segments = tmp_path / "metrics.log", tmp_path / "segments"
+    _write_jsonl(source, [_row(i) for i in range(20)], tail='{"partial"')
+    convert(str(source), str(segments), truncate=True)
+    assert source.read_text() == '{"partial"'
+
+    # a producer rewriting old samples: rows not newer than the segments are dropped
+    source.write_text("".join(json.dumps(_row(i)) + "\n" for i in range(15, 25)))
+    assert convert(str(source), str(segments))["rows"] == 5
+    store = SegmentStore(str(segments))
+    assert store.rows(-np.inf, np.inf) == [_row(i) for i in range(25)]
+    store.close()
+
+
+def test_segment_index_locates_rows_across_strides(tmp_path):
+    ts = BASE + np.arange(1000, dtype=np.float64) * 3
+    path = write_segment(str(tmp_path / "seg.mseg"), ts, {"x": np.arange(1000, dtype=np.float64)}, stride=16)
+    seg = Segment(path)
+
+    for start, end in [(BASE, BASE), (BASE + 47, BASE + 48), (BASE - 5, BASE + 3 * 999 + 5), (BASE + 1, BASE + 2)]:
+        got_ts, cols = seg.read(start, end)
+        want = ts[(ts >= start) & (ts <= end)]
+        assert np.array_equal(got_ts, want)
+        assert np.array_equal(cols["x"], (want - BASE) / 3)
+    seg.close()
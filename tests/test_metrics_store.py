@@ -0,0 +1,106 @@
+import math
+import random
+import numpy as np
+import pytest
+from core.metrics_store import MINUTE, HOUR, DAY, MetricsStore
+
+BASE = 19675 * DAY  # day-aligned
+
+
+def _brute(points, metric, start, end):
+    values = [row[metric] for ts, row in points if start <= ts <= end and metric in row]
+    if not values:
+        return None
+    mean = sum(values) / len(values)
+    return {"count": len(values), "avg": mean, "min": min(values), "max": max(values),
+            "std": math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))}
+
+
+def _assert_summary(got, want):
+    if want is None:
+        assert got is None
+        return
+    assert got["count"] == want["count"]
+    for key in ("avg", "min", "max", "std"):
+        assert got[key] == pytest.approx(want[key], rel=1e-9, abs=1e-9)
+
+
+@pytest.fixture
+def points():
+    rng = random.Random(7)
+    out = []
+    ts = BASE
+    for i in range(5000):
+        ts += rng.uniform(1, 120)  # ~3.5 days, irregular spacing
+        row = {"timestamp": "ignored", "CPU_Usage": rng.uniform(0, 100)}
+        if i % 3:
+            row["Memory_Usage"] = rng.uniform(0, 64)
+        out.append((ts, row))
+    return out
+
+
+def test_window_summaries_match_brute_force(points):
+    store = MetricsStore()
+    # arrive in batches, like successive polls
+    for i in range(0, len(points), 700):
+        store.add(points[i:i + 700])
+    assert len(store) == len(points)
+    assert sorted(store.metrics) == ["CPU_Usage", "Memory_Usage"]
+
+    rng = random.Random(3)
+    first, last = points[0][0], points[-1][0]
+    windows = [(first, last), (first - DAY, last + DAY), (BASE + DAY, BASE + 2 * DAY),
+               (BASE + HOUR, BASE + HOUR)]  # aligned edges, and a zero-length window
+    windows += [tuple(sorted(rng.uniform(first - HOUR, last + HOUR) for _ in range(2))) for _ in range(200)]
+    for start, end in windows:
+        for metric in ("CPU_Usage", "Memory_Usage"):
+            _assert_summary(store.summary(metric, start, end), _brute(points, metric, start, end))
+
+
+def test_window_edges_are_inclusive():
+    store = MetricsStore()
+    store.add([(BASE, {"x": 1.0}), (BASE + MINUTE, {"x": 2.0}), (BASE + HOUR, {"x": 4.0})])
+
+    assert store.aggregate("x", BASE, BASE + HOUR)[0] == 3
+    assert store.aggregate("x", BASE + MINUTE, BASE + MINUTE)[1] == 2.0
+    assert store.summary("missing", BASE, BASE + HOUR) is None
+
+
+def test_late_points_update_raw_columns_and_rollups(points):
+    store = MetricsStore()
+    in_order, late = points[::2], points[1::2]
+    store.add(in_order)
+    store.add(late)
+
+    assert bool(np.all(np.diff(store.ts.view()) >= 0))
+    for start, end in [(points[0][0], points[-1][0]), (BASE + 2 * HOUR + 17, BASE + 30 * HOUR + 5)]:
+        _assert_summary(store.summary("CPU_Usage", start, end), _brute(points, "CPU_Usage", start, end))
+
+
+def test_add_columns_matches_add(points):
+    by_rows, by_cols = MetricsStore(), MetricsStore()
+    by_rows.add(points)
+    ts = np.array([t for t, _ in points])
+    by_cols.add_columns(ts, {"CPU_Usage": np.array([r["CPU_Usage"] for _, r in points]),
+                             "Memory_Usage": np.array([r.get("Memory_Usage", np.nan) for _, r in points])})
+
+    start, end = BASE + 5 * HOUR + 3, BASE + 50 * HOUR
+    assert by_rows.aggregate("Memory_Usage", start, end) == pytest.approx(by_cols.aggregate("Memory_Usage", start, end))
+
+
+def test_spikes_flag_the_outlier_bucket():
+    store = MetricsStore()
+    rng = random.Random(1)
+    points = [(BASE + i * MINUTE, {"CPU_Usage": 40 + rng.uniform(-2, 2)}) for i in range(600)]
+    points[300] = (points[300][0], {"CPU_Usage": 99.0})
+    store.add(points)
+
+    found = store.spikes("CPU_Usage", BASE, BASE + 600 * MINUTE)
+    assert found["resolution"] == MINUTE
+    assert found["count"] == 1
+    assert found["examples"][0]["bucket"] == BASE + 300 * MINUTE
+    assert found["examples"][0]["max"] == 99.0
+
+    flat = MetricsStore()
+    flat.add([(BASE + i * MINUTE, {"CPU_Usage": 50.0}) for i in range(100)])
+    assert flat.spikes("CPU_Usage", BASE, BASE + 100 * MINUTE)["count"] == 0
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import re
+from collections import Counter
+import pytest
+from langchain.tools import Tool
+from core.orchestrator import Orchestrator
+from core.router import RouteDecision
+from core.selector import Selector
+from llm.client import AsyncLLMClient, set_llm_client
+from llm.llm_manager import LLMManager
+from llm.routing_cache import RoutingCache
+from models.schemas import AgentMetadata
+
+AGENTS = ["monitoring_agent", "cost_agent"]
+
+
+class FakeBackend:
+    """Answers batched classification prompts by keyword; anything else is a fusion."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, model):
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.01)
+        if "Requests:" in prompt:
+            requests = [json.loads(r) for r in re.findall(r"^\d+\. (.*)$", prompt.split("Requests:")[1], re.M)]
+            return json.dumps([["cost_agent"] if "cost" in r.lower() else AGENTS for r in requests])
+        if "fusion fails" in prompt:
+            raise RuntimeError("model down")
+        return "fused: " + prompt.split("USER'S ORIGINAL REQUEST: ")[1].split("\n")[0]
+
+    async def aclose(self):
+        pass
+
+
+class FakeRouter:
+    """Confident for CPU questions (monitoring only); everything else is escalated."""
+
+    async def aroute(self, message):
+        return RouteDecision(agents=["monitoring_agent"], confident="cpu" in message.lower())
+
+
+class Registry:
+    def list_all(self):
+        return [AgentMetadata(name=n, module="x", class_name="X", description=f"{n} things") for n in AGENTS]
+
+
+@pytest.fixture
+def setup():
+    backend = FakeBackend()
+    set_llm_client(AsyncLLMClient(backend=backend, max_concurrency=4))
+    calls = Counter()
+
+    def tool(name):
+        async def run(query):
+            calls[(name, query)] += 1
+            await asyncio.sleep(0.01)
+            return f"{name} answer {len(calls)}"
+        return Tool(name=name, func=None, coroutine=run, description=f"{name} things")
+
+    selector = Selector(Registry(), llm=LLMManager(routing_cache=RoutingCache(semantic=False)), router=FakeRouter())
+    orc = Orchestrator(tools=[tool(n) for n in AGENTS], selector=selector)
+    orc.fuser.single_agent_fast_path = False  # every answer goes through the (fake) fusion model
+    yield orc, backend, calls
+    set_llm_client(None)
+
+
+def test_results_in_input_order_with_one_agent_call_per_unique_query(setup):
+    orc, backend, calls = setup
+    messages = ["CPU now?", "what does it cost", "cpu   now", "errors", "What does it COST?", "errors"]
+
+    out = asyncio.run(orc.handle_batch(messages, max_concurrency=2))
+    results = out["results"]
+
+    assert len(results) == len(messages)
+    assert [r["agents_called"] for r in results] == [
+        ["monitoring_agent"], ["cost_agent"], ["monitoring_agent"], AGENTS, ["cost_agent"], AGENTS]
+    assert [r["fused"] for r in results] == [
+        "fused: 'CPU now?'", "fused: 'what does it cost'", "fused: 'CPU now?'",
+        "fused: 'errors'", "fused: 'what does it cost'", "fused: 'errors'"]
+    assert [r.get("deduplicated_from") for r in results] == [None, None, 0, None, 1, 3]
+
+    # every (agent, normalized query) pair ran exactly once, with the first message's text
+    assert set(calls.values()) == {1}
+    assert set(calls) == {("monitoring_agent", "CPU now?"), ("cost_agent", "what does it cost"),
+                          ("monitoring_agent", "errors"), ("cost_agent", "errors")}
+    assert out["unique_queries"] == 3 and out["agent_calls"] == 4 and out["fusions"] == 3
+
+    # ambiguous messages went to the LLM in a single classification prompt
+    assert sum("Requests:" in p for p in backend.prompts) == 1
+
+
+def test_failed_fusion_is_reported_per_item(setup):
+    orc, _, _ = setup
+    out = asyncio.run(orc.handle_batch(["CPU fusion fails", "CPU fine"]))
+
+    failed, fine = out["results"]
+    assert failed["fused"] is None and failed["error"] == "model down"
+    assert failed["responses"][0]["ok"] is True
+    assert fine["fused"] == "fused: 'CPU fine'" and "error" not in fine
+
+
+def test_fusion_concurrency_is_bounded(setup):
+    orc, _, _ = setup
+    active = peak = 0
+    fuse = orc.fuser.fuse
+
+    async def tracking_fuse(message, responses):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            await asyncio.sleep(0.02)
+            return await fuse(message, responses)
+        finally:
+            active -= 1
+
+    orc.fuser.fuse = tracking_fuse
+    out = asyncio.run(orc.handle_batch([f"cpu question {i}" for i in range(12)], max_concurrency=3))
+
+    assert len(out["results"]) == 12
+    assert peak == 3
+
+
+def test_locally_routed_request_needs_no_llm_client(monkeypatch):
+    import llm.client
+
+    def missing_key():
+        raise ValueError("Missing GEMINI_API_KEY (or GOOGLE_API_KEY) in .env")
+
+    monkeypatch.setattr(llm.client, "_backend_from_env", missing_key)
+    set_llm_client(None)
+
+    async def monitoring(query):
+        return "cpu is fine"
+
+    tools = [Tool(name="monitoring_agent", func=None, coroutine=monitoring, description="monitoring things")]
+    orc = Orchestrator(tools=tools, selector=Selector(Registry(), router=FakeRouter()))
+
+    out = asyncio.run(orc.handle_request("CPU now?"))
+    assert out["agents_called"] == ["monitoring_agent"]
+    assert out["fused"]  # single-agent fast path, no fusion model
+    with pytest.raises(ValueError):
+        asyncio.run(orc.handle_request("anything else"))
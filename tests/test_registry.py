@@ -0,0 +1,56 @@
+import asyncio
+from agents.base_agent import BaseAgent, ExecutionClass
+from core.executors import AgentExecutor
+from core.registry import AgentRegistry, LazyAgent
+from models.schemas import AgentMetadata
+
+BUILT = []
+
+
+class HeavyAgent(BaseAgent):
+    execution = ExecutionClass.CPU
+
+    def __init__(self):
+        super().__init__("heavy")
+        BUILT.append(self.name)
+
+
+class LightAgent(BaseAgent):
+    def __init__(self):
+        super().__init__("light")
+        BUILT.append(self.name)
+
+
+def _registry(executor):
+    registry = AgentRegistry()
+    for name, cls in [("heavy", HeavyAgent), ("light", LightAgent)]:
+        meta = AgentMetadata(name=name, module=__name__, class_name=cls.__name__, description=name)
+        registry.register(name, LazyAgent(meta, remote=executor.in_worker))
+    return registry
+
+
+def test_process_pool_agents_are_deferred_not_warm():
+    BUILT.clear()
+    registry = _registry(AgentExecutor(cpu_pool="process"))
+    assert not registry.all_ready
+
+    asyncio.run(registry.warmup())
+
+    assert BUILT == ["light"]  # the heavy agent is left to the pool workers
+    assert {n: s["state"] for n, s in registry.states().items()} == {"heavy": "deferred", "light": "warm"}
+    assert registry.all_ready
+
+
+def test_first_dispatch_without_warmup_settles_the_state():
+    registry = _registry(AgentExecutor(cpu_pool="process"))
+    assert registry.get("heavy").is_remote()
+    assert registry.get("heavy").state == "deferred"
+    assert not registry.all_ready  # the light agent is still cold
+
+
+def test_thread_pool_agents_are_built_here():
+    BUILT.clear()
+    registry = _registry(AgentExecutor(cpu_pool="thread"))
+    asyncio.run(registry.warmup())
+    assert sorted(BUILT) == ["heavy", "light"]
+    assert all(s["state"] == "warm" for s in registry.states().values())
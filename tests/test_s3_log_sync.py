@@ -0,0 +1,138 @@
+import json
+import pytest
+
+moto = pytest.importorskip("moto")
+import boto3
+
+from orchestrator.cloud_analyzer import CloudLogAggregates, S3LogSync
+
+BUCKET = "cloud-logs"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def put(client, key, records):
+    client.put_object(Bucket=BUCKET, Key=key, Body=json.dumps(records).encode("utf-8"))
+
+
+def counting_fetches(monkeypatch, client):
+    fetched = []
+    get_object = client.get_object
+
+    def tracked(**kwargs):
+        fetched.append(kwargs["Key"])
+        return get_object(**kwargs)
+
+    monkeypatch.setattr(client, "get_object", tracked)
+    return fetched
+
+
+def log(cpu, service="api", level="INFO", ts="2026-10-18T10:00:00Z", message="ok"):
+    return {"timestamp": ts, "service": service, "cpu_usage": cpu, "log_level": level, "message": message}
+
+
+def test_lists_past_the_first_1000_keys(s3):
+    for i in range(1005):
+        put(s3, f"logs/{i:05d}.json", log(i % 100))
+    sync = S3LogSync(client=s3, workers=8, max_age=0, cache_path=None)
+
+    assert sync.sync() == {"listed": 1005, "fetched": 1005, "removed": 0, "failed": 0}
+    assert len(sync.logs()) == 1005
+
+
+def test_only_new_or_changed_etags_are_refetched(s3, monkeypatch, tmp_path):
+    put(s3, "logs/a.json", [log(10)])
+    put(s3, "logs/b.json", [log(20)])
+    put(s3, "other/ignored.json", [log(99)])
+    fetched = counting_fetches(monkeypatch, s3)
+    sync = S3LogSync(client=s3, max_age=0, cache_path=str(tmp_path / "cache.json"))
+
+    sync.sync()
+    assert sorted(fetched) == ["logs/a.json", "logs/b.json"]
+
+    fetched.clear()
+    assert sync.sync()["fetched"] == 0 and fetched == []
+
+    put(s3, "logs/b.json", [log(30)])
+    put(s3, "logs/c.json", [log(40)])
+    sync.sync()
+    assert sorted(fetched) == ["logs/b.json", "logs/c.json"]
+    assert sorted(r["cpu_usage"] for r in sync.logs()) == [10, 30, 40]
+
+    # the persisted cache means a restart fetches nothing that is unchanged
+    fetched.clear()
+    restarted = S3LogSync(client=s3, max_age=0, cache_path=str(tmp_path / "cache.json"))
+    assert restarted.sync()["fetched"] == 0 and fetched == []
+
+
+def test_deleted_keys_are_dropped(s3):
+    put(s3, "logs/a.json", [log(10)])
+    put(s3, "logs/b.json", [log(20)])
+    sync = S3LogSync(client=s3, max_age=0, cache_path=None)
+    sync.sync()
+
+    s3.delete_object(Bucket=BUCKET, Key="logs/a.json")
+    assert sync.sync()["removed"] == 1
+    assert [r["cpu_usage"] for r in sync.logs()] == [20]
+
+
+def test_failed_fetch_is_retried_on_the_next_sync(s3, monkeypatch):
+    put(s3, "logs/a.json", [log(10)])
+    put(s3, "logs/b.json", [log(20)])
+    # logs() reads the mirror without syncing again; each sync below is explicit
+    sync = S3LogSync(client=s3, max_age=3600, cache_path=None)
+    fetch = sync._fetch
+    failures = {"logs/b.json"}
+
+    def flaky(key):
+        if key in failures:
+            failures.discard(key)
+            raise ConnectionError("reset by peer")
+        return fetch(key)
+
+    monkeypatch.setattr(sync, "_fetch", flaky)
+    assert sync.sync(force=True) == {"listed": 2, "fetched": 1, "removed": 0, "failed": 1}
+    assert [r["cpu_usage"] for r in sync.logs()] == [10]
+
+    assert sync.sync(force=True) == {"listed": 2, "fetched": 1, "removed": 0, "failed": 0}
+    assert sorted(r["cpu_usage"] for r in sync.logs()) == [10, 20]
+
+
+def test_listener_payloads_keep_aggregates_in_step(s3):
+    put(s3, "logs/a.json", [log(50, "api"), log(90, "db", ts="2026-10-18T11:00:00Z")])
+    put(s3, "logs/b.json", [log(10, "api", level="ERROR", ts="2026-10-18T12:00:00Z", message="boom")])
+    sync = S3LogSync(client=s3, max_age=0, cache_path=None)
+    sync.sync()
+
+    events = []
+    aggregates = CloudLogAggregates()
+    sync.subscribe(lambda removed, added: events.append((removed, added)))
+    sync.subscribe(aggregates.apply)
+    assert events[0][0] == {} and set(events[0][1]) == {"logs/a.json", "logs/b.json"}
+    assert aggregates.average_cpu() == pytest.approx(50.0)
+    assert aggregates.service_max_cpu() == {"api": 50, "db": 90}
+    assert aggregates.latest_error()["message"] == "boom"
+
+    # overwritten key: old records in `removed`, new ones in `added`
+    put(s3, "logs/a.json", [log(70, "api")])
+    s3.delete_object(Bucket=BUCKET, Key="logs/b.json")
+    sync.sync()
+    removed, added = events[-1]
+    assert set(removed) == {"logs/a.json", "logs/b.json"}
+    assert [r["cpu_usage"] for r in removed["logs/a.json"]] == [50, 90]
+    assert added == {"logs/a.json": [log(70, "api")]}
+    assert aggregates.average_cpu() == pytest.approx(70.0)
+    assert aggregates.service_max_cpu() == {"api": 70}
+    assert aggregates.latest_error() is None
+
+    # nothing changed: listeners are not called
+    sync.sync()
+    assert len(events) == 2
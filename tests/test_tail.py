@@ -0,0 +1,82 @@
+import os
+from utils.tail import FileTailer, TimeIndex, WatchedFile
+
+
+def _append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_tailer_returns_only_new_complete_lines(tmp_path):
+    path = tmp_path / "app.log"
+    tailer = FileTailer(str(path))
+    assert tailer.read_new() == []  # missing file
+
+    _append(path, "one\ntwo\nthr")
+    assert tailer.read_new() == ["one", "two"]
+    assert tailer.read_new() == []
+    _append(path, "ee\nfour\n")
+    assert tailer.read_new() == ["three", "four"]
+
+
+def test_tailer_drains_the_old_file_on_rotation(tmp_path):
+    path = tmp_path / "app.log"
+    _append(path, "a\n")
+    tailer = FileTailer(str(path))
+    assert tailer.read_new() == ["a"]
+
+    _append(path, "b\n")  # written just before rotation, not read yet
+    os.rename(path, tmp_path / "app.log.1")
+    _append(path, "c\n")
+
+    assert tailer.read_new() == ["b", "c"]
+    assert tailer.rotations == 1
+    _append(path, "d\n")
+    assert tailer.read_new() == ["d"]
+
+
+def test_tailer_rereads_a_file_truncated_in_place(tmp_path):
+    path = tmp_path / "app.log"
+    _append(path, "old line 1\nold line 2\n")
+    tailer = FileTailer(str(path))
+    assert tailer.read_new() == ["old line 1", "old line 2"]
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("new\n")
+    assert tailer.read_new() == ["new"]
+    assert tailer.rotations == 1
+
+
+def test_tailer_detects_truncate_and_rewrite_past_the_offset(tmp_path):
+    path = tmp_path / "app.log"
+    _append(path, "first\n")
+    tailer = FileTailer(str(path))
+    assert tailer.read_new() == ["first"]
+
+    # same inode, larger than before, different head: truncated and rewritten between polls
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("rewritten 1\nrewritten 2\n")
+    assert tailer.read_new() == ["rewritten 1", "rewritten 2"]
+    assert tailer.rotations == 1
+
+
+def test_watched_file_reports_changes_once(tmp_path):
+    path = tmp_path / "alerts.json"
+    watched = WatchedFile(str(path))
+    assert watched.changed() is False  # still missing
+    path.write_text("[]")
+    assert watched.changed() is True
+    assert watched.changed() is False
+    path.unlink()
+    assert watched.changed() is True
+
+
+def test_time_index_keeps_late_records_sorted():
+    index = TimeIndex()
+    index.extend([(10, "a"), (30, "c"), (20, "b"), (30, "c2"), (5, "z")])
+
+    assert len(index) == 5
+    assert index.bounds() == (5, 30)
+    assert index.range(10, 30) == ["a", "b", "c", "c2"]
+    assert index.range(10, 30, limit=2) == ["a", "b"]
+    assert index.range(31, 40) == []
@@ -0,0 +1,98 @@
+import random
+from utils.tail import TimeIndex
+from utils.window_memo import BucketMemo
+
+HOUR = 3600.0
+BASE = 1_735_689_600.0  # hour-aligned
+
+
+class Counting:
+    """compute() over a TimeIndex: (count, sum) partials, recording every call."""
+
+    def __init__(self, index):
+        self.index = index
+        self.calls = []
+
+    def __call__(self, lo, hi):
+        self.calls.append((lo, hi))
+        values = self.index.range(lo, hi)
+        return (len(values), sum(values))
+
+
+def _merge(a, b):
+    return (a[0] + b[0], a[1] + b[1])
+
+
+def _brute(records, lo, hi):
+    values = [v for ts, v in records if lo <= ts <= hi]
+    return (len(values), sum(values))
+
+
+def _setup(n=3000, seed=5):
+    rng = random.Random(seed)
+    records = sorted((BASE + rng.uniform(0, 48 * HOUR), rng.randint(1, 9)) for _ in range(n))
+    records += [(BASE + 5 * HOUR, 100), (BASE + 6 * HOUR - 1e-6, 1000)]  # on and just before edges
+    index = TimeIndex()
+    index.extend(records)
+    compute = Counting(index)
+    return records, index, compute, BucketMemo(compute, _merge, bucket_seconds=HOUR)
+
+
+def test_arbitrary_windows_match_brute_force():
+    records, _, _, memo = _setup()
+    rng = random.Random(9)
+    windows = [(BASE, BASE + 48 * HOUR), (BASE + 5 * HOUR, BASE + 6 * HOUR), (BASE + 5 * HOUR, BASE + 5 * HOUR),
+               (BASE + 5.5 * HOUR, BASE + 5.7 * HOUR)]
+    windows += [tuple(sorted(rng.uniform(BASE - HOUR, BASE + 49 * HOUR) for _ in range(2))) for _ in range(300)]
+    for lo, hi in windows:
+        assert memo.get(lo, hi) == _brute(records, lo, hi), (lo, hi)
+
+
+def test_closed_buckets_are_computed_once():
+    _, _, compute, memo = _setup()
+    memo.get(BASE + 0.5 * HOUR, BASE + 10.5 * HOUR)
+    assert memo.stats()["misses"] == 9  # hours 1..9 whole, edges computed directly
+
+    compute.calls.clear()
+    memo.get(BASE + 0.25 * HOUR, BASE + 10.75 * HOUR)
+    assert len(compute.calls) == 2  # only the two new edges
+    assert memo.stats()["hits"] == 9
+
+
+def test_invalidate_from_drops_only_buckets_at_or_after_the_timestamp():
+    records, index, compute, memo = _setup()
+    lo, hi = BASE, BASE + 24 * HOUR
+    memo.get(lo, hi)
+
+    # a late record lands in hour 20; hours before it stay cached
+    late = (BASE + 20.5 * HOUR, 7)
+    index.add(*late)
+    records.append(late)
+    memo.invalidate_from(late[0])
+    assert memo.stats()["invalidations"] == 4  # hours 20..23
+
+    compute.calls.clear()
+    assert memo.get(lo, hi) == _brute(records, lo, hi)
+    # hours 20..23 again, plus the inclusive right edge [hi, hi] that is never memoized
+    assert sorted(c[0] for c in compute.calls) == [BASE + h * HOUR for h in range(20, 25)]
+
+
+def test_partials_computed_during_an_invalidation_are_not_kept():
+    index = TimeIndex()
+    index.add(BASE + 10, 1)
+    memo = None
+
+    def compute(lo, hi):
+        values = index.range(lo, hi)
+        if lo == BASE and not racing:
+            # data arrives (and is announced) while this bucket is being computed
+            racing.append(True)
+            index.add(BASE + 20, 5)
+            memo.invalidate_from(BASE + 20)
+        return (len(values), sum(values))
+
+    racing = []
+    memo = BucketMemo(compute, _merge, bucket_seconds=HOUR)
+    assert memo.get(BASE, BASE + HOUR) == (1, 1)  # stale, but not memoized
+    assert memo.stats()["buckets"] == 0
+    assert memo.get(BASE, BASE + HOUR) == (2, 6)
@@ -1,10 +1,113 @@
 import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
 from utils.logger import logger
 
-async def gather_with_timeout(tasks, timeout: float):
-    """Run tasks concurrently with timeout handling."""
+# name -> zero-arg callable returning a fresh awaitable (a factory, so hedging can start a second attempt)
+CallFactories = Dict[str, Callable[[], Awaitable]]
+Timeouts = Union[float, Dict[str, float]]
+
+
+def _ok(name: str, result, elapsed: float, hedged: bool) -> Dict:
+    return {"agent": name, "ok": True, "data": {"message": result},
+            "elapsed": round(elapsed, 3), "hedged": hedged}
+
+
+def _failed(name: str, error: str, elapsed: float, timed_out: bool = False) -> Dict:
+    return {"agent": name, "ok": False, "data": {"error": error},
+            "elapsed": round(elapsed, 3), "timed_out": timed_out}
+
+
+async def iter_with_deadline(calls: CallFactories, timeout: Timeouts,
+                             hedge_after: Optional[float] = None,
+                             default_timeout: float = 5.0) -> AsyncIterator[Dict]:
+    """
+    Run calls concurrently and yield one result dict per call as soon as it is known.
+
+    timeout      per-call deadline in seconds (a float for all, or a name -> seconds dict;
+                 names missing from the dict use default_timeout)
+    hedge_after  if set, a call still running after this many seconds gets a second,
+                 concurrent attempt; whichever attempt finishes first wins
+
+    A call that misses its deadline is cancelled and yielded as
+    {"ok": False, "data": {"error": "timeout"}, "timed_out": True}; the others are unaffected.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadlines = {
+        name: started + (timeout.get(name, default_timeout) if isinstance(timeout, dict) else timeout)
+        for name in calls
+    }
+    attempts: Dict[str, List[asyncio.Task]] = {name: [asyncio.ensure_future(factory())]
+                                              for name, factory in calls.items()}
+    owner = {task: name for name, tasks in attempts.items() for task in tasks}
+    hedged = set()
+    hedge_tasks = set()
+
+    def finish(name: str):
+        for t in attempts.pop(name, []):
+            owner.pop(t, None)
+            t.cancel()
+
     try:
-        return await asyncio.wait_for(asyncio.gather(*tasks), timeout=timeout)
-    except asyncio.TimeoutError:
-        logger.warning("Timeout reached while gathering agent responses.")
-        return [{"agent": "unknown", "ok": False, "data": {"error": "timeout"}}]
+        while attempts:
+            now = loop.time()
+
+            # Deadlines first: a call past its deadline is reported as a timeout
+            for name in [n for n in attempts if deadlines[n] <= now]:
+                logger.warning(f"Agent {name} missed its {deadlines[name] - started:.1f}s deadline.")
+                finish(name)
+                yield _failed(name, "timeout", now - started, timed_out=True)
+            if not attempts:
+                break
+
+            # Hedge stragglers with a second attempt
+            if hedge_after is not None and now - started >= hedge_after:
+                for name in [n for n in attempts if n not in hedged]:
+                    hedged.add(name)
+                    task = asyncio.ensure_future(calls[name]())
+                    attempts[name].append(task)
+                    owner[task] = name
+                    hedge_tasks.add(task)
+                    logger.info(f"Hedging straggler agent {name}")
+
+            next_events = [deadlines[n] for n in attempts]
+            if hedge_after is not None and any(n not in hedged for n in attempts):
+                next_events.append(started + hedge_after)
+            wait_for = max(0.0, min(next_events) - loop.time())
+
+            done, _ = await asyncio.wait(list(owner), timeout=wait_for,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = owner.get(task)
+                if name is None:
+                    continue
+                elapsed = loop.time() - started
+                if task.cancelled():
+                    exc = asyncio.CancelledError()
+                else:
+                    exc = task.exception()
+                if exc is None:
+                    finish(name)
+                    yield _ok(name, task.result(), elapsed, task in hedge_tasks)
+                    continue
+                # This attempt failed; keep waiting if a sibling attempt is still running
+                attempts[name].remove(task)
+                owner.pop(task, None)
+                if not attempts[name]:
+                    attempts.pop(name)
+                    logger.error(f"Agent {name} failed: {exc!r}")
+                    yield _failed(name, str(exc) or type(exc).__name__, elapsed)
+    finally:
+        for name in list(attempts):
+            finish(name)
+
+
+async def gather_with_timeout(calls: CallFactories, timeout: Timeouts,
+                              hedge_after: Optional[float] = None,
+                              default_timeout: float = 5.0) -> List[Dict]:
+    """Collect iter_with_deadline() results, returned in the same order as ``calls``."""
+    results = {}
+    async for r in iter_with_deadline(calls, timeout, hedge_after=hedge_after,
+                                      default_timeout=default_timeout):
+        results[r["agent"]] = r
+    return [results[name] for name in calls]
@@ -0,0 +1,103 @@
+# utils/aws.py
+"""
+Shared AWS clients.
+
+boto3 clients are thread-safe but expensive to build (tens of ms, plus a fresh
+connection pool each), so every module gets them from here: one client per
+(service, endpoint, region), created lazily and reused by all threads.
+
+Configuration (env):
+    AWS_ENDPOINT_URL           default endpoint (LocalStack: http://localhost:4566)
+    AWS_REGION                 default region (us-east-1)
+    AWS_MAX_POOL_CONNECTIONS   HTTP connections per client (32)
+    AWS_MAX_ATTEMPTS           retry budget per call, first attempt included (3)
+    AWS_RETRY_MODE             standard | adaptive | legacy (standard)
+
+Credentials come from the usual boto3 chain; against a local endpoint with no
+credentials configured, LocalStack's test/test pair is used.
+"""
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_ENDPOINT = os.getenv("AWS_ENDPOINT_URL", "http://localhost:4566") or None
+DEFAULT_REGION = os.getenv("AWS_REGION", "us-east-1")
+MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "32"))
+MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "3"))
+RETRY_MODE = os.getenv("AWS_RETRY_MODE", "standard")
+
+_DEFAULT = object()
+ClientKey = Tuple[str, Optional[str], str]
+
+
+def _local(endpoint: Optional[str]) -> bool:
+    host = urlparse(endpoint).hostname if endpoint else None
+    return host in ("localhost", "127.0.0.1", "localstack")
+
+
+class AWSClientFactory:
+    def __init__(self, endpoint_url: Optional[str] = DEFAULT_ENDPOINT, region: str = DEFAULT_REGION,
+                 max_pool_connections: int = MAX_POOL_CONNECTIONS, max_attempts: int = MAX_ATTEMPTS,
+                 retry_mode: str = RETRY_MODE):
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.max_pool_connections = max_pool_connections
+        self.max_attempts = max_attempts
+        self.retry_mode = retry_mode
+        self._session = None
+        self._clients: Dict[ClientKey, Any] = {}
+        self._lock = threading.Lock()
+
+    def _credentials(self, endpoint: Optional[str]) -> Dict[str, str]:
+        if self._session.get_credentials() is None and _local(endpoint):
+            return {"aws_access_key_id": "test", "aws_secret_access_key": "test"}
+        return {}
+
+    def _create(self, service: str, endpoint: Optional[str], region: str):
+        import boto3
+        from botocore.config import Config
+
+        if self._session is None:
+            self._session = boto3.session.Session()
+        config = Config(max_pool_connections=self.max_pool_connections,
+                        retries={"max_attempts": self.max_attempts, "mode": self.retry_mode})
+        # sessions are not thread-safe: clients are only ever created under the factory lock
+        return self._session.client(service, endpoint_url=endpoint, region_name=region, config=config,
+                                    **self._credentials(endpoint))
+
+    def client(self, service: str, endpoint_url: Any = _DEFAULT, region: Optional[str] = None):
+        """Shared client for (service, endpoint, region)."""
+        endpoint = self.endpoint_url if endpoint_url is _DEFAULT else endpoint_url
+        key = (service, endpoint, region or self.region)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self._create(*key)
+        return client
+
+    def stats(self) -> Dict:
+        return {
+            "clients": [f"{s}@{e or 'aws'}/{r}" for s, e, r in self._clients],
+            "max_pool_connections": self.max_pool_connections,
+            "retries": {"max_attempts": self.max_attempts, "mode": self.retry_mode},
+        }
+
+
+_factory: Optional[AWSClientFactory] = None
+_factory_lock = threading.Lock()
+
+
+def get_aws_factory() -> AWSClientFactory:
+    global _factory
+    if _factory is None:
+        with _factory_lock:
+            if _factory is None:
+                _factory = AWSClientFactory()
+    return _factory
+
+
+def get_client(service: str, endpoint_url: Any = _DEFAULT, region: Optional[str] = None):
+    return get_aws_factory().client(service, endpoint_url=endpoint_url, region=region)
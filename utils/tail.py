@@ -0,0 +1,167 @@
+# utils/tail.py
+"""
+Tail helpers for append-only files that are rotated or truncated underneath us.
+"""
+import bisect
+import os
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+class FileTailer:
+    """
+    Returns the complete lines appended to ``path`` since the previous call.
+
+    State is (inode, byte offset, partial trailing line). When the inode changes
+    (rotation: the file was renamed away and a new one created) the rest of the
+    old file is drained through the still-open handle before switching to the new
+    file from offset 0. When the file was truncated in place (it shrank below our
+    offset, or its first bytes no longer match what we read) it is re-read from
+    the start.
+    """
+
+    HEAD_BYTES = 64
+
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self.rotations = 0
+        self._fh = None
+        self._partial = b""
+        self._head = b""
+
+    def _open(self) -> bool:
+        try:
+            self._fh = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.inode = os.fstat(self._fh.fileno()).st_ino
+        self._restart()
+        return True
+
+    def _restart(self):
+        self._fh.seek(0)
+        self.offset, self._partial, self._head = 0, b"", b""
+
+    def _read_head(self, n: int) -> bytes:
+        self._fh.seek(0)
+        head = self._fh.read(n)
+        self._fh.seek(self.offset)
+        return head
+
+    def _rewritten(self) -> bool:
+        return bool(self._head) and self._read_head(len(self._head)) != self._head
+
+    def _drain(self) -> List[str]:
+        data = self._partial + self._fh.read()
+        self.offset = self._fh.tell()
+        if len(self._head) < self.HEAD_BYTES and self.offset > len(self._head):
+            self._head = self._read_head(min(self.HEAD_BYTES, self.offset))
+        *complete, self._partial = data.split(b"\n")
+        return [ln.decode(self.encoding, errors="ignore").strip() for ln in complete if ln.strip()]
+
+    def read_new(self) -> List[str]:
+        if self._fh is None and not self._open():
+            return []
+        lines = []
+        if self._rewritten():
+            # truncated and rewritten past our offset since the last poll
+            self._restart()
+            self.rotations += 1
+        lines.extend(self._drain())
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return lines  # rotated away, new file not created yet: keep the old handle
+        if st.st_ino != self.inode:
+            # rotated: finish the old file (writes may have landed since the read above)
+            lines.extend(self._drain())
+            if self._partial.strip():
+                lines.append(self._partial.decode(self.encoding, errors="ignore").strip())
+            self.close()
+            self.rotations += 1
+            if self._open():
+                lines.extend(self._drain())
+        elif st.st_size < self.offset:
+            # truncated in place
+            self._restart()
+            self.rotations += 1
+            lines.extend(self._drain())
+        return lines
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class WatchedFile:
+    """For whole-document files (JSON arrays): reports when (inode, size, mtime) changed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sig: Optional[Tuple[int, int, int]] = None
+
+    def changed(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            sig = None
+        else:
+            sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if sig == self._sig:
+            return False
+        self._sig = sig
+        return True
+
+
+class TimeIndex:
+    """
+    Records kept sorted by timestamp (epoch seconds) in parallel lists, so a window
+    query is two bisects and a slice: O(log n + k). Appends in time order are O(1);
+    late records are insorted.
+    """
+
+    def __init__(self):
+        self._ts: List[float] = []
+        self._items: List[Any] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def add(self, ts: float, item: Any):
+        with self._lock:
+            if not self._ts or ts >= self._ts[-1]:
+                self._ts.append(ts)
+                self._items.append(item)
+            else:
+                i = bisect.bisect_right(self._ts, ts)
+                self._ts.insert(i, ts)
+                self._items.insert(i, item)
+
+    def extend(self, records: Iterable[Tuple[float, Any]]):
+        with self._lock:
+            for ts, item in records:
+                self.add(ts, item)
+
+    def replace(self, records: Iterable[Tuple[float, Any]]):
+        ordered = sorted(records, key=lambda r: r[0])
+        with self._lock:
+            self._ts = [ts for ts, _ in ordered]
+            self._items = [item for _, item in ordered]
+
+    def range(self, start: float, end: float, limit: Optional[int] = None) -> List[Any]:
+        """Items with start <= ts <= end, oldest first (at most ``limit``)."""
+        with self._lock:
+            lo = bisect.bisect_left(self._ts, start)
+            hi = bisect.bisect_right(self._ts, end)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return self._items[lo:hi]
+
+    def bounds(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            return (self._ts[0], self._ts[-1]) if self._ts else None
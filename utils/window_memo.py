@@ -0,0 +1,82 @@
+# utils/window_memo.py
+"""
+Memoization of composable window statistics over aligned time buckets.
+"""
+import math
+import threading
+from typing import Any, Callable, Dict
+
+
+class BucketMemo:
+    """
+    Answers compute(lo, hi) for any inclusive window [lo, hi] as
+
+        compute(left edge) + memo[bucket] + ... + memo[bucket] + compute(right edge)
+
+    where the buckets are the aligned ``bucket_seconds`` spans lying wholly inside
+    the window, folded in time order with ``merge``. A bucket's partial is computed
+    once and then kept; invalidate_from(ts) drops the buckets new data landed in,
+    which for append-only sources is only the open (current) bucket.
+
+    compute  (lo, hi) -> partial for records with lo <= ts <= hi
+    merge    (earlier, later) -> combined partial; must not mutate its arguments
+    """
+
+    def __init__(self, compute: Callable[[float, float], Any], merge: Callable[[Any, Any], Any],
+                 bucket_seconds: float = 3600.0):
+        self.compute = compute
+        self.merge = merge
+        self.bucket_seconds = bucket_seconds
+        self._buckets: Dict[float, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = 0
+
+    def _bucket(self, start: float) -> Any:
+        with self._lock:
+            if start in self._buckets:
+                self.hits += 1
+                return self._buckets[start]
+            generation = self._generation
+        partial = self.compute(start, math.nextafter(start + self.bucket_seconds, -math.inf))
+        with self._lock:
+            self.misses += 1
+            # data that arrived while computing may not be in ``partial``: use it, don't keep it
+            if generation == self._generation:
+                self._buckets[start] = partial
+        return partial
+
+    def get(self, lo: float, hi: float) -> Any:
+        size = self.bucket_seconds
+        first, last = math.ceil(lo / size) * size, math.floor(math.nextafter(hi, math.inf) / size) * size
+        if first >= last:
+            return self.compute(lo, hi)
+        result = self.compute(lo, math.nextafter(first, -math.inf)) if lo < first else None
+        start = first
+        while start < last:
+            partial = self._bucket(start)
+            result = partial if result is None else self.merge(result, partial)
+            start += size
+        if last <= hi:
+            result = self.merge(result, self.compute(last, hi))
+        return result
+
+    def invalidate_from(self, ts: float):
+        """Forget every bucket that may contain a record at or after ``ts``."""
+        floor = math.floor(ts / self.bucket_seconds) * self.bucket_seconds
+        with self._lock:
+            stale = [start for start in self._buckets if start >= floor]
+            for start in stale:
+                del self._buckets[start]
+            self.invalidations += len(stale)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict:
+        return {"buckets": len(self._buckets), "bucket_seconds": self.bucket_seconds,
+                "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
@@ -1,10 +1,45 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional
+
 from prefect import flow, task
+from prefect.task_runners import ThreadPoolTaskRunner
 from orchestrator.orchestrator_agent import get_orchestrator_agent
 
-@task
+BATCH_CONCURRENCY = int(os.getenv("FLOW_BATCH_CONCURRENCY", "8"))
+RESULT_CACHE_HOURS = float(os.getenv("FLOW_RESULT_CACHE_HOURS", "24"))
+
+# -------------------------
+# One agent per worker thread
+# -------------------------
+_local = threading.local()
+
+
+def _worker_agent():
+    """Build the ReAct agent once per task-runner thread (LLM client + initialize_agent are costly)."""
+    agent = getattr(_local, "agent", None)
+    if agent is None:
+        agent = _local.agent = get_orchestrator_agent()
+    return agent
+
+
+def _normalize(prompt: str) -> str:
+    return " ".join(prompt.split())
+
+
+def prompt_cache_key(context, parameters) -> str:
+    """Task results are cached by the hash of the whitespace-normalized prompt."""
+    return "orchestrator-prompt-" + hashlib.sha256(_normalize(parameters["prompt"]).encode("utf-8")).hexdigest()
+
+
+@task(cache_key_fn=prompt_cache_key, cache_expiration=timedelta(hours=RESULT_CACHE_HOURS), persist_result=True)
 def analyze_prompt(prompt: str):
-    agent = get_orchestrator_agent()
-    return agent.run(prompt)
+    return _worker_agent().run(prompt)
+
 
 @flow
 def orchestrator_flow(prompt: str):
@@ -13,5 +48,61 @@ def orchestrator_flow(prompt: str):
     print("✅ Agent Response:", response)
     return response
 
+
+# -------------------------
+# Batch flow
+# -------------------------
+def load_prompts(path: str, field: str = "body") -> List[str]:
+    """Prompts from a JSONL file (``field`` of each object, e.g. requests.jsonl) or a plain text file, one per line."""
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                prompts.append(line)
+                continue
+            value = obj.get(field) if isinstance(obj, dict) else obj
+            if isinstance(value, str) and value.strip():
+                prompts.append(value)
+    return prompts
+
+
+@flow(task_runner=ThreadPoolTaskRunner(max_workers=BATCH_CONCURRENCY))
+def orchestrator_batch_flow(prompts: List[str]):
+    """Fan the prompts out as concurrent tasks; answers come back in input order."""
+    # the first original prompt per normalized text is sent; normalization only dedupes (and keys the cache)
+    unique: Dict[str, str] = {}
+    for p in prompts:
+        unique.setdefault(_normalize(p), p)
+    print(f"🧠 Analyzing {len(prompts)} prompts ({len(unique)} unique)")
+    futures = {key: analyze_prompt.submit(p) for key, p in unique.items()}
+    answers = {key: future.result(raise_on_failure=False) for key, future in futures.items()}
+    results = [answers[_normalize(p)] for p in prompts]
+    failed = sum(isinstance(r, BaseException) for r in results)
+    print(f"✅ {len(results) - failed} answered, {failed} failed")
+    return results
+
+
+def run_batch(path: str, field: str = "body", concurrency: Optional[int] = None):
+    prompts = load_prompts(path, field)
+    batch_flow = orchestrator_batch_flow
+    if concurrency:
+        batch_flow = orchestrator_batch_flow.with_options(task_runner=ThreadPoolTaskRunner(max_workers=concurrency))
+    return batch_flow(prompts)
+
+
 if __name__ == "__main__":
-    orchestrator_flow("What is my CPU usage right now?")
+    parser = argparse.ArgumentParser(description="Run the orchestrator flow on one prompt or a batch file.")
+    parser.add_argument("prompt", nargs="?", default="What is my CPU usage right now?")
+    parser.add_argument("--batch", help="JSONL/text file of prompts, e.g. requests.jsonl")
+    parser.add_argument("--field", default="body", help="JSONL field holding the prompt")
+    parser.add_argument("--concurrency", type=int, default=None, help=f"parallel tasks (default {BATCH_CONCURRENCY})")
+    args = parser.parse_args()
+    if args.batch:
+        run_batch(args.batch, args.field, args.concurrency)
+    else:
+        orchestrator_flow(args.prompt)